@@ -7,6 +7,8 @@ This script finds all Mermaid code blocks in Markdown files and can:
 2. Validate syntax by attempting to render
 3. Replace them with image references
 4. List all diagrams with metadata
+5. Render them to images, incrementally re-rendering only changed diagrams
+6. Scan a whole docs tree and emit one JSONL record per diagram
 
 Usage:
     # Extract all diagrams to separate files
@@ -18,23 +20,53 @@ Usage:
     # Validate diagrams (requires mmdc installed)
     python extract_mermaid.py document.md --validate
 
+    # Fast structural lint only, without launching mmdc
+    python extract_mermaid.py document.md --validate --lint-only
+
+    # From asyncio code, with concurrent mmdc runs
+    results = await MermaidExtractor(Path('document.md')).avalidate_diagrams(jobs=4, timeout=20)
+
     # Replace diagrams with image references
     python extract_mermaid.py document.md --replace-with-images --image-format png
 
+    # Render diagram images, skipping diagrams unchanged since the last run
+    python extract_mermaid.py document.md --render-images --output-dir diagrams/ --incremental
+
+    # Keep rendering while editing: re-render changed diagrams on every save
+    python extract_mermaid.py docs/ --render-images -o diagrams/ --watch
+
+    # Scan a docs tree (directory or glob) and write one JSONL record per diagram
+    python extract_mermaid.py openspec/specs/ --jsonl diagrams.jsonl
+    python extract_mermaid.py ".docs/**/*.md" --jsonl - | python mermaid_to_image.py - out/ --jsonl
+
 Requirements:
     - For validation: mermaid-cli (npm install -g @mermaid-js/mermaid-cli)
 """
 
 import argparse
+import asyncio
+import glob
+import json
 import os
 import re
 import sys
 import subprocess
+import shutil
 import tempfile
 from pathlib import Path
-from typing import List, Tuple, Optional, Dict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 import hashlib
 
+from mermaid_cli import arun_mmdc, check_mmdc_installed, mmdc_command
+from mermaid_lint import MermaidLinter
+from mermaid_render_cache import RenderCache
+from resilient_diagram import detect_diagram_type
+
+
+def content_digest(content: str) -> str:
+    """Hex digest identifying a diagram by its source (surrounding whitespace ignored)."""
+    return hashlib.md5(content.strip().encode()).hexdigest()
+
 
 class MermaidDiagram:
     """Represents a single Mermaid diagram extracted from Markdown."""
@@ -43,7 +75,10 @@ class MermaidDiagram:
         self.content = content.strip()
         self.line_number = line_number
         self.index = index
-        self.hash = hashlib.md5(content.encode()).hexdigest()[:8]
+        self.digest = content_digest(self.content)
+        self.hash = self.digest[:8]
+        # DiagramType value; detection only looks at the header line
+        self.diagram_type = detect_diagram_type(self.content).value
 
     def get_filename(self, prefix: str = "diagram", extension: str = "mmd") -> str:
         """Generate a unique filename for this diagram."""
@@ -57,6 +92,111 @@ class MermaidDiagram:
         return first_line
 
 
+# Opening fence: ```mermaid with nothing but whitespace after it
+MERMAID_FENCE_OPEN = re.compile(r'```mermaid\s*$')
+FENCE = '```'
+
+
+def scan_mermaid_blocks(lines: Iterable[str]) -> Iterator[Tuple[str, int]]:
+    """
+    Stream-scan Markdown lines for ```mermaid fences.
+
+    Lines are consumed one at a time and line numbers are tracked as the
+    scan goes, so memory and time stay linear in the input size.
+
+    Args:
+        lines: Markdown lines, with or without line endings (e.g. an open file)
+
+    Yields:
+        Tuples of (raw diagram content, 1-based line number of the opening fence)
+    """
+    block: Optional[List[str]] = None
+    start_line = 0
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.endswith('\n'):
+            line += '\n'
+
+        if block is None:
+            if MERMAID_FENCE_OPEN.search(line):
+                block = []
+                start_line = line_number
+            continue
+
+        fence_at = line.find(FENCE)
+        if fence_at >= 0:
+            block.append(line[:fence_at])
+            yield ''.join(block), start_line
+            block = None
+        elif block or line.strip():
+            # Blank lines directly after the opening fence are not content
+            block.append(line)
+
+
+def dedupe_diagrams(diagrams: Iterable[MermaidDiagram]) -> Tuple[List[MermaidDiagram], List[int]]:
+    """
+    Collapse diagrams with identical source.
+
+    Returns:
+        Tuple of (unique diagrams in first-occurrence order, position in that
+        list of each input diagram)
+    """
+    positions: Dict[str, int] = {}
+    unique = []
+    slots = []
+    for diagram in diagrams:
+        slot = positions.get(diagram.digest)
+        if slot is None:
+            slot = positions[diagram.digest] = len(unique)
+            unique.append(diagram)
+        slots.append(slot)
+    return unique, slots
+
+
+def iter_markdown_files(patterns: Iterable[str]) -> Iterator[Path]:
+    """
+    Expand files, directories and glob patterns into Markdown files.
+
+    Directories are walked recursively for *.md files. Results are sorted
+    within each pattern and de-duplicated across patterns.
+    """
+    seen = set()
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            candidates = sorted(path.rglob('*.md'))
+        elif path.is_file():
+            candidates = [path]
+        else:
+            candidates = sorted(Path(p) for p in glob.glob(pattern, recursive=True))
+
+        for candidate in candidates:
+            resolved = candidate.resolve()
+            if candidate.is_file() and resolved not in seen:
+                seen.add(resolved)
+                yield candidate
+
+
+def scan_markdown_file(markdown_file: Path) -> Iterator[MermaidDiagram]:
+    """Yield diagrams from a Markdown file without loading it into memory."""
+    with open(markdown_file, encoding='utf-8') as f:
+        for index, (content, line_number) in enumerate(scan_mermaid_blocks(f), start=1):
+            yield MermaidDiagram(content, line_number, index)
+
+
+def diagram_record(markdown_file: Path, diagram: MermaidDiagram) -> Dict[str, Any]:
+    """JSONL record for one diagram (consumed by mermaid_to_image.py --jsonl)."""
+    return {
+        "file": markdown_file.as_posix(),
+        "index": diagram.index,
+        "line": diagram.line_number,
+        "hash": diagram.hash,
+        "type": diagram.diagram_type,
+        "first_line": diagram.get_first_line(),
+        "content": diagram.content,
+    }
+
+
 class MermaidExtractor:
     """Extract and process Mermaid diagrams from Markdown files."""
 
@@ -66,25 +206,28 @@ class MermaidExtractor:
         re.DOTALL | re.MULTILINE
     )
 
-    def __init__(self, markdown_file: Path):
+    def __init__(self, markdown_file: Path, cache: Optional[RenderCache] = None):
         self.markdown_file = markdown_file
+        self.cache = cache
         self.content = markdown_file.read_text(encoding='utf-8')
         self.diagrams: List[MermaidDiagram] = []
+        # First occurrence of each distinct diagram, keyed by content digest
+        self.by_digest: Dict[str, MermaidDiagram] = {}
         self._extract_diagrams()
 
     def _extract_diagrams(self):
         """Extract all Mermaid diagrams from the Markdown content."""
-        line_number = 1
-        for index, match in enumerate(self.MERMAID_PATTERN.finditer(self.content), start=1):
-            diagram_content = match.group(1)
-            # Count newlines before this match to get line number
-            lines_before = self.content[:match.start()].count('\n')
-            diagram = MermaidDiagram(diagram_content, lines_before + 1, index)
+        blocks = scan_mermaid_blocks(self.content.splitlines(keepends=True))
+        for index, (diagram_content, line_number) in enumerate(blocks, start=1):
+            diagram = MermaidDiagram(diagram_content, line_number, index)
             self.diagrams.append(diagram)
+            self.by_digest.setdefault(diagram.digest, diagram)
 
     def save_diagrams(self, output_dir: Path, prefix: str = "diagram") -> List[Path]:
         """
-        Save all diagrams to separate .mmd files.
+        Save each distinct diagram to its own .mmd file.
+
+        Repeated diagrams are written once, under their first occurrence.
 
         Args:
             output_dir: Directory to save diagram files
@@ -97,6 +240,10 @@ class MermaidExtractor:
         saved_files = []
 
         for diagram in self.diagrams:
+            original = self.by_digest[diagram.digest]
+            if original is not diagram:
+                print(f"  = Diagram #{diagram.index} duplicates #{original.index}, not saved again")
+                continue
             filename = diagram.get_filename(prefix=prefix, extension="mmd")
             output_path = output_dir / filename
             output_path.write_text(diagram.content, encoding='utf-8')
@@ -114,29 +261,75 @@ class MermaidExtractor:
         print(f"\nFound {len(self.diagrams)} Mermaid diagram(s) in {self.markdown_file}:\n")
         for diagram in self.diagrams:
             print(f"  #{diagram.index} (Line {diagram.line_number}):")
+            print(f"    Type: {diagram.diagram_type}")
             print(f"    First line: {diagram.get_first_line()}")
             print(f"    Hash: {diagram.hash}")
             print(f"    Lines: {len(diagram.content.splitlines())}")
             print()
 
-    def validate_diagrams(self) -> Dict[int, Optional[str]]:
+    def validate_diagrams(
+        self,
+        lint: bool = True,
+        lint_only: bool = False,
+        batch: bool = True,
+        timeout: float = 30
+    ) -> Dict[int, Optional[str]]:
         """
         Validate all diagrams by attempting to render them with mmdc.
 
+        Diagrams are first checked by the pure-Python lint (mermaid_lint.py).
+        Diagrams with lint errors fail immediately; the rest are rendered
+        together in a single mmdc run (see DiagramValidator).
+
+        Args:
+            lint: Run the fast lint before rendering
+            lint_only: Skip mmdc entirely and report lint results only
+            batch: Render all diagrams in one mmdc run instead of one per diagram
+            timeout: Seconds allowed per diagram render
+
         Returns:
             Dict mapping diagram index to error message (None if valid)
         """
-        if not self._check_mmdc_installed():
-            print("ERROR: mermaid-cli (mmdc) not found.", file=sys.stderr)
-            print("Install with: npm install -g @mermaid-js/mermaid-cli", file=sys.stderr)
-            sys.exit(1)
+        validator = DiagramValidator(
+            cache=self.cache, lint=lint, lint_only=lint_only, batch=batch, timeout=timeout
+        )
 
-        results = {}
         print(f"\nValidating {len(self.diagrams)} diagram(s)...\n")
+        return self._report_validation(validator.validate(self.diagrams))
 
-        for diagram in self.diagrams:
+    async def avalidate_diagrams(
+        self,
+        lint: bool = True,
+        lint_only: bool = False,
+        batch: bool = True,
+        timeout: float = 30,
+        jobs: Optional[int] = None
+    ) -> Dict[int, Optional[str]]:
+        """
+        Asynchronous validate_diagrams().
+
+        Args:
+            lint: Run the fast lint before rendering
+            lint_only: Skip mmdc entirely and report lint results only
+            batch: Render all diagrams in one mmdc run instead of one per diagram
+            timeout: Seconds allowed per diagram render
+            jobs: Maximum concurrent mmdc runs (default: CPU count)
+
+        Returns:
+            Dict mapping diagram index to error message (None if valid)
+        """
+        validator = DiagramValidator(
+            cache=self.cache, lint=lint, lint_only=lint_only, batch=batch, timeout=timeout, jobs=jobs
+        )
+
+        print(f"\nValidating {len(self.diagrams)} diagram(s)...\n")
+        return self._report_validation(await validator.avalidate(self.diagrams))
+
+    def _report_validation(self, outcomes: List[Tuple[Optional[str], list]]) -> Dict[int, Optional[str]]:
+        """Print validation outcomes and map diagram index to error message."""
+        results = {}
+        for diagram, (error, issues) in zip(self.diagrams, outcomes):
             print(f"  Validating diagram #{diagram.index}...", end=" ")
-            error = self._validate_single_diagram(diagram)
             results[diagram.index] = error
 
             if error:
@@ -145,6 +338,10 @@ class MermaidExtractor:
             else:
                 print(f"✅ OK")
 
+            for issue in issues:
+                if issue.level == 'warning':
+                    print(f"    Warning: {issue}")
+
         # Summary
         failed_count = sum(1 for err in results.values() if err)
         print(f"\nValidation complete: {len(self.diagrams) - failed_count}/{len(self.diagrams)} passed")
@@ -153,39 +350,14 @@ class MermaidExtractor:
 
     def _validate_single_diagram(self, diagram: MermaidDiagram) -> Optional[str]:
         """Validate a single diagram. Returns error message if invalid, None if valid."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            tmpdir_path = Path(tmpdir)
-            input_file = tmpdir_path / f"diagram-{diagram.index}.mmd"
-            output_file = tmpdir_path / f"diagram-{diagram.index}.svg"
-
-            # Write diagram to temp file
-            input_file.write_text(diagram.content, encoding='utf-8')
-
-            try:
-                result = subprocess.run(
-                    ['mmdc', '-i', str(input_file), '-o', str(output_file), '-b', 'transparent'],
-                    capture_output=True,
-                    text=True,
-                    timeout=30
-                )
-
-                if result.returncode != 0:
-                    return result.stderr.strip() or "Unknown rendering error"
-
-                if not output_file.exists() or output_file.stat().st_size == 0:
-                    return "Rendering produced no output"
-
-                return None  # Valid
-
-            except subprocess.TimeoutExpired:
-                return "Rendering timed out after 30 seconds"
-            except Exception as e:
-                return str(e)
+        return DiagramValidator(cache=self.cache).validate_single(diagram)
 
     def replace_with_images(self, image_format: str = "png", image_dir: str = "diagrams") -> str:
         """
         Replace Mermaid code blocks with image references.
 
+        Repeated diagrams all reference the image of their first occurrence.
+
         Args:
             image_format: Image format (png or svg)
             image_dir: Directory path for images (relative to markdown file)
@@ -194,29 +366,748 @@ class MermaidExtractor:
             Modified Markdown content
         """
         def replace_block(match):
-            diagram_content = match.group(1)
-            # Find which diagram this is
-            for diagram in self.diagrams:
-                if diagram.content == diagram_content.strip():
-                    filename = diagram.get_filename(extension=image_format)
-                    image_path = f"{image_dir}/{filename}"
-                    return f"![Diagram {diagram.index}]({image_path})"
-            return match.group(0)  # If not found, leave unchanged
+            diagram = self.by_digest.get(content_digest(match.group(1)))
+            if diagram is None:
+                return match.group(0)  # If not found, leave unchanged
+            filename = diagram.get_filename(extension=image_format)
+            image_path = f"{image_dir}/{filename}"
+            return f"![Diagram {diagram.index}]({image_path})"
 
         return self.MERMAID_PATTERN.sub(replace_block, self.content)
 
-    @staticmethod
-    def _check_mmdc_installed() -> bool:
-        """Check if mermaid-cli (mmdc) is installed."""
+    def render_images(
+        self,
+        output_dir: Path,
+        renderer_factory: Callable[[], Any],
+        image_format: str = "png",
+        prefix: str = "diagram",
+        previous_outputs: Optional[List[str]] = None,
+        rendered_images: Optional[Dict[str, Path]] = None
+    ) -> Tuple[List[Dict[str, Any]], int, int]:
+        """
+        Render every distinct diagram to an image in output_dir.
+
+        Image names embed the diagram index and content hash, so a diagram
+        whose image already exists (and was recorded by a previous run) is
+        unchanged and is not rendered again. Repeated diagrams share the
+        image of their first occurrence, matching replace_with_images().
+
+        Args:
+            output_dir: Directory for rendered images
+            renderer_factory: Returns a MermaidRenderer; only called if a
+                diagram needs rendering
+            image_format: png, svg, or pdf
+            prefix: Prefix for image filenames
+            previous_outputs: Image names recorded for this file by a previous
+                run (None renders every diagram)
+            rendered_images: Content digest -> image already produced for
+                another file; such diagrams are copied instead of rendered.
+                Updated with the images this call produces.
+
+        Returns:
+            Tuple of (manifest records, rendered count, skipped count)
+        """
+        output_dir.mkdir(parents=True, exist_ok=True)
+        known = set(previous_outputs or [])
+        shared = rendered_images if rendered_images is not None else {}
+        outputs: Dict[str, str] = {}
+        records = []
+        rendered = skipped = 0
+        renderer = None
+
+        for diagram in self.diagrams:
+            if self.by_digest[diagram.digest] is not diagram:
+                # Repeats reference the image of their first occurrence
+                if diagram.digest not in outputs:
+                    continue
+                filename = outputs[diagram.digest]
+                skipped += 1
+            else:
+                filename = diagram.get_filename(prefix=prefix, extension=image_format)
+                output_path = output_dir / filename
+                source = shared.get(diagram.digest)
+
+                if filename in known and output_path.exists():
+                    skipped += 1
+                elif source == output_path and output_path.exists():
+                    # Another file already produced this very image
+                    skipped += 1
+                elif source is not None and source.exists():
+                    print(f"  Reusing diagram #{diagram.index} -> {output_path} (same as {source.name})")
+                    shutil.copyfile(source, output_path)
+                    rendered += 1
+                else:
+                    if renderer is None:
+                        renderer = renderer_factory()
+                    print(f"  Rendering diagram #{diagram.index} -> {output_path}...", end=" ", flush=True)
+                    if renderer.render_from_string(diagram.content, output_path):
+                        print("✅")
+                        rendered += 1
+                    else:
+                        print("❌")
+                        continue
+
+                outputs[diagram.digest] = filename
+                shared.setdefault(diagram.digest, output_path)
+
+            records.append({
+                "index": diagram.index,
+                "line": diagram.line_number,
+                "hash": diagram.hash,
+                "output": filename,
+            })
+
+        return records, rendered, skipped
+
+
+class DiagramValidator:
+    """
+    Validate many diagrams with as few mmdc launches as possible.
+
+    Diagrams are linted first. Those without lint errors are packed as
+    fenced blocks into one Markdown file and rendered by a single mmdc run
+    (mermaid-cli renders every block of a Markdown input). If that run
+    fails, diagrams whose images were produced are valid, and the rest are
+    bisected into smaller batches until each error is attributed to a
+    single diagram.
+
+    Every method has an asyncio counterpart (avalidate, ...) that runs mmdc
+    as an asyncio subprocess, killed on timeout or cancellation.
+    """
+
+    BATCH_TIMEOUT_PER_DIAGRAM = 2
+
+    # Render from stdin to SVG on stdout
+    SINGLE_ARGS = ['-i', '-', '-o', '-', '-e', 'svg', '-b', 'transparent', '-q']
+
+    def __init__(
+        self,
+        cache: Optional[RenderCache] = None,
+        lint: bool = True,
+        lint_only: bool = False,
+        batch: bool = True,
+        timeout: float = 30,
+        jobs: Optional[int] = None
+    ):
+        """
+        Initialize validator.
+
+        Args:
+            cache: Render cache; a cached render proves a diagram valid
+            lint: Run the fast lint before rendering
+            lint_only: Skip mmdc entirely and report lint results only
+            batch: Render all diagrams in one mmdc run instead of one per diagram
+            timeout: Seconds allowed per diagram (a batch run gets this plus
+                BATCH_TIMEOUT_PER_DIAGRAM per diagram)
+            jobs: Maximum concurrent mmdc runs in avalidate (default: CPU count)
+        """
+        self.cache = cache
+        self.lint = lint or lint_only
+        self.lint_only = lint_only
+        self.batch = batch
+        self.timeout = timeout
+        self.jobs = jobs
+        self.mmdc_runs = 0
+
+    def validate(self, diagrams: List[MermaidDiagram]) -> List[Tuple[Optional[str], list]]:
+        """
+        Validate diagrams, possibly from several Markdown files.
+
+        Identical diagrams are checked once and share the outcome.
+
+        Args:
+            diagrams: Diagrams to validate
+
+        Returns:
+            (error message or None, lint issues) for each diagram, in order
+        """
+        diagrams, slots = dedupe_diagrams(diagrams)
+        errors, issues, pending = self._lint_all(diagrams)
+
+        if pending:
+            if self.batch:
+                self._validate_group(diagrams, pending, errors)
+            else:
+                for position in pending:
+                    errors[position] = self.validate_single(diagrams[position])
+
+        return [(errors[slot], issues[slot]) for slot in slots]
+
+    async def avalidate(self, diagrams: List[MermaidDiagram]) -> List[Tuple[Optional[str], list]]:
+        """Asynchronous validate(); independent mmdc runs proceed concurrently."""
+        diagrams, slots = dedupe_diagrams(diagrams)
+        errors, issues, pending = self._lint_all(diagrams)
+
+        if pending:
+            semaphore = asyncio.Semaphore(max(1, self.jobs or os.cpu_count() or 1))
+            if self.batch:
+                await self._avalidate_group(diagrams, pending, errors, semaphore)
+            else:
+                async def validate_one(position):
+                    async with semaphore:
+                        errors[position] = await self.avalidate_single(diagrams[position])
+
+                await asyncio.gather(*(validate_one(position) for position in pending))
+
+        return [(errors[slot], issues[slot]) for slot in slots]
+
+    def _lint_all(self, diagrams: List[MermaidDiagram]):
+        """
+        Lint diagrams and pick the ones that still need mmdc.
+
+        Returns:
+            Tuple of (errors, issues, positions pending an mmdc check)
+        """
+        errors: List[Optional[str]] = [None] * len(diagrams)
+        issues: List[list] = [[] for _ in diagrams]
+        pending = []
+
+        linter = MermaidLinter() if self.lint else None
+        for position, diagram in enumerate(diagrams):
+            if linter:
+                issues[position] = linter.lint(diagram.content)
+                if linter.has_errors(issues[position]):
+                    errors[position] = "; ".join(
+                        f"Lint {issue}" for issue in issues[position] if issue.level == 'error'
+                    )
+                    continue
+            if self.lint_only or self._is_cached(diagram):
+                continue
+            pending.append(position)
+
+        if pending and not check_mmdc_installed():
+            print("ERROR: mermaid-cli (mmdc) not found.", file=sys.stderr)
+            print("Install with: npm install -g @mermaid-js/mermaid-cli", file=sys.stderr)
+            sys.exit(1)
+
+        return errors, issues, pending
+
+    def validate_single(self, diagram: MermaidDiagram) -> Optional[str]:
+        """
+        Validate one diagram with its own mmdc run. Returns the error or None.
+
+        The source is piped to mmdc's stdin and the SVG read from its stdout,
+        so no temporary files are involved.
+        """
+        if self._is_cached(diagram):
+            return None
+
         try:
+            self.mmdc_runs += 1
             result = subprocess.run(
-                ['mmdc', '--version'],
+                mmdc_command() + self.SINGLE_ARGS,
+                input=diagram.content.encode('utf-8'),
                 capture_output=True,
-                timeout=5
+                timeout=self.timeout
             )
-            return result.returncode == 0
-        except (FileNotFoundError, subprocess.TimeoutExpired):
+            return self._single_result(diagram, result)
+
+        except subprocess.TimeoutExpired:
+            return f"Rendering timed out after {self.timeout:g} seconds"
+        except Exception as e:
+            return str(e)
+
+    async def avalidate_single(self, diagram: MermaidDiagram) -> Optional[str]:
+        """Asynchronous validate_single()."""
+        if self._is_cached(diagram):
+            return None
+
+        try:
+            self.mmdc_runs += 1
+            result = await arun_mmdc(
+                self.SINGLE_ARGS,
+                timeout=self.timeout,
+                input_data=diagram.content.encode('utf-8')
+            )
+            return self._single_result(diagram, result)
+
+        except subprocess.TimeoutExpired:
+            return f"Rendering timed out after {self.timeout:g} seconds"
+        except OSError as e:
+            return str(e)
+
+    def _single_result(self, diagram: MermaidDiagram, result: subprocess.CompletedProcess) -> Optional[str]:
+        if result.returncode != 0:
+            return result.stderr.decode('utf-8', 'replace').strip() or "Unknown rendering error"
+
+        if not result.stdout:
+            return "Rendering produced no output"
+
+        self._store(diagram, result.stdout)
+        return None  # Valid
+
+    def _validate_group(self, diagrams: List[MermaidDiagram], positions: List[int], errors: List[Optional[str]]):
+        """Validate a group in one mmdc run, bisecting on failure."""
+        if len(positions) == 1:
+            errors[positions[0]] = self.validate_single(diagrams[positions[0]])
+            return
+
+        rendered = self._render_markdown_batch([diagrams[p] for p in positions])
+        failed = [p for p, ok in zip(positions, rendered) if not ok]
+        if not failed:
+            return
+
+        middle = max(1, len(failed) // 2)
+        self._validate_group(diagrams, failed[:middle], errors)
+        self._validate_group(diagrams, failed[middle:], errors)
+
+    async def _avalidate_group(
+        self,
+        diagrams: List[MermaidDiagram],
+        positions: List[int],
+        errors: List[Optional[str]],
+        semaphore: asyncio.Semaphore
+    ):
+        """Asynchronous _validate_group(); both bisected halves run concurrently."""
+        if len(positions) == 1:
+            async with semaphore:
+                errors[positions[0]] = await self.avalidate_single(diagrams[positions[0]])
+            return
+
+        async with semaphore:
+            rendered = await self._arender_markdown_batch([diagrams[p] for p in positions])
+        failed = [p for p, ok in zip(positions, rendered) if not ok]
+        if not failed:
+            return
+
+        middle = max(1, len(failed) // 2)
+        await asyncio.gather(
+            self._avalidate_group(diagrams, failed[:middle], errors, semaphore),
+            self._avalidate_group(diagrams, failed[middle:], errors, semaphore)
+        )
+
+    def _render_markdown_batch(self, diagrams: List[MermaidDiagram]) -> List[bool]:
+        """
+        Render diagrams as fenced blocks of one Markdown file in a single mmdc run.
+
+        Returns:
+            For each diagram, True if its image was produced
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmpdir_path = Path(tmpdir)
+            args, timeout = self._batch_args(tmpdir_path, diagrams)
+
+            # A failed run still leaves the images of blocks that rendered
+            try:
+                self.mmdc_runs += 1
+                subprocess.run(
+                    mmdc_command() + args,
+                    capture_output=True,
+                    text=True,
+                    timeout=timeout
+                )
+            except (subprocess.TimeoutExpired, OSError):
+                pass
+
+            return self._batch_result(tmpdir_path, diagrams)
+
+    async def _arender_markdown_batch(self, diagrams: List[MermaidDiagram]) -> List[bool]:
+        """Asynchronous _render_markdown_batch()."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmpdir_path = Path(tmpdir)
+            args, timeout = self._batch_args(tmpdir_path, diagrams)
+
+            try:
+                self.mmdc_runs += 1
+                await arun_mmdc(args, timeout=timeout)
+            except (subprocess.TimeoutExpired, OSError):
+                pass
+
+            return self._batch_result(tmpdir_path, diagrams)
+
+    def _batch_args(self, tmpdir_path: Path, diagrams: List[MermaidDiagram]) -> Tuple[List[str], float]:
+        input_file = tmpdir_path / "batch.md"
+        output_file = tmpdir_path / "batch-out.md"
+
+        input_file.write_text(
+            ''.join(f"```mermaid\n{d.content}\n```\n\n" for d in diagrams),
+            encoding='utf-8'
+        )
+
+        timeout = self.timeout + self.BATCH_TIMEOUT_PER_DIAGRAM * len(diagrams)
+        return ['-i', str(input_file), '-o', str(output_file), '-b', 'transparent'], timeout
+
+    def _batch_result(self, tmpdir_path: Path, diagrams: List[MermaidDiagram]) -> List[bool]:
+        rendered = []
+        for number, diagram in enumerate(diagrams, start=1):
+            image = tmpdir_path / f"batch-out-{number}.svg"
+            ok = image.exists() and image.stat().st_size > 0
+            if ok:
+                self._store(diagram, image.read_bytes())
+            rendered.append(ok)
+
+        return rendered
+
+    def _cache_key(self, diagram: MermaidDiagram) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return self.cache.make_key(diagram.content, output_format='svg')
+
+    def _is_cached(self, diagram: MermaidDiagram) -> bool:
+        """A cached render of the same source proves the diagram is valid."""
+        key = self._cache_key(diagram)
+        return key is not None and self.cache.get(key) is not None
+
+    def _store(self, diagram: MermaidDiagram, data: bytes):
+        key = self._cache_key(diagram)
+        if key is not None:
+            self.cache.put(key, data)
+
+
+class RenderManifest:
+    """
+    Record of rendered diagrams kept in the output directory.
+
+    For each source Markdown file it stores the file's mtime and size, its
+    diagram count and one record per rendered diagram (index, line, content
+    hash, output image), so a re-run can skip untouched files without
+    parsing them and re-render only diagrams whose hash changed. Files with
+    failed diagrams are recorded without mtime and size, so the next run
+    retries them.
+    """
+
+    FILENAME = ".mermaid-manifest.json"
+    VERSION = 2
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = output_dir
+        self.path = output_dir / self.FILENAME
+        self.files: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding='utf-8'))
+                if data.get("version") == self.VERSION:
+                    self.files = data.get("files", {})
+            except (OSError, ValueError):
+                self.files = {}
+
+    def key(self, markdown_file: Path) -> str:
+        """Manifest key for a Markdown file (relative to the output dir)."""
+        return Path(os.path.relpath(markdown_file.resolve(), self.output_dir.resolve())).as_posix()
+
+    def is_unchanged(self, markdown_file: Path, image_format: str) -> bool:
+        """True if the file is untouched since the last run and all its images exist."""
+        entry = self.files.get(self.key(markdown_file))
+        if not entry or entry.get("format") != image_format:
+            return False
+        stat = markdown_file.stat()
+        if entry.get("mtime") != stat.st_mtime_ns or entry.get("size") != stat.st_size:
+            return False
+        diagrams = entry.get("diagrams", [])
+        # A diagram that failed last time has no record; retry the file
+        if entry.get("diagram_count") != len(diagrams):
             return False
+        return all((self.output_dir / d["output"]).exists() for d in diagrams)
+
+    def outputs(self, markdown_file: Path) -> List[str]:
+        """Image names recorded for a Markdown file by the previous run."""
+        entry = self.files.get(self.key(markdown_file), {})
+        return [d["output"] for d in entry.get("diagrams", [])]
+
+    def all_outputs(self) -> set:
+        """Image names referenced by any Markdown file in the manifest."""
+        return {d["output"] for entry in self.files.values() for d in entry.get("diagrams", [])}
+
+    def remove(self, markdown_file: Path) -> List[str]:
+        """Drop a deleted Markdown file; return its images no other file references."""
+        entry = self.files.pop(self.key(markdown_file), None)
+        if not entry:
+            return []
+        return sorted({d["output"] for d in entry.get("diagrams", [])} - self.all_outputs())
+
+    def update(
+        self,
+        markdown_file: Path,
+        image_format: str,
+        records: List[Dict[str, Any]],
+        diagram_count: int
+    ):
+        """
+        Replace the entry for a Markdown file after rendering it.
+
+        If fewer records than diagram_count were rendered (some failed), the
+        file's mtime and size are not recorded, so it is never "unchanged".
+        """
+        stat = markdown_file.stat()
+        complete = len(records) == diagram_count
+        self.files[self.key(markdown_file)] = {
+            "mtime": stat.st_mtime_ns if complete else None,
+            "size": stat.st_size if complete else None,
+            "format": image_format,
+            "diagram_count": diagram_count,
+            "diagrams": records,
+        }
+
+    def save(self):
+        """Write the manifest atomically."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        tmp_path.write_text(
+            json.dumps({"version": self.VERSION, "files": self.files}, indent=2, sort_keys=True),
+            encoding='utf-8'
+        )
+        os.replace(tmp_path, self.path)
+
+
+def render_incremental(
+    markdown_files: List[Path],
+    output_dir: Path,
+    renderer_factory: Callable[[], Any],
+    image_format: str = "png",
+    prefix: str = "diagram",
+    cache: Optional[RenderCache] = None,
+    incremental: bool = True
+) -> Tuple[int, int, int]:
+    """
+    Render diagrams of Markdown files to images, re-rendering only what changed.
+
+    Untouched Markdown files (same mtime, size and diagram count as
+    recorded in the manifest, with every diagram rendered) are skipped
+    without being parsed. In changed files only
+    diagrams whose content hash changed are rendered. Images recorded for
+    diagrams that no longer exist are deleted.
+
+    Args:
+        markdown_files: Markdown files to process
+        output_dir: Directory for rendered images and the manifest
+        renderer_factory: Returns a MermaidRenderer; only called if something
+            needs rendering
+        image_format: png, svg, or pdf
+        prefix: Prefix for image filenames
+        cache: Render cache passed to the extractor
+        incremental: If False, ignore the manifest and render everything
+
+    Returns:
+        Tuple of (rendered, skipped, failed) diagram counts
+    """
+    manifest = RenderManifest(output_dir)
+    renderers: List[Any] = []
+    rendered = skipped = failed = 0
+    # Images produced so far, so diagrams repeated across files render once
+    rendered_images: Dict[str, Path] = {}
+
+    def shared_renderer():
+        if not renderers:
+            renderers.append(renderer_factory())
+        return renderers[0]
+
+    for markdown_file in markdown_files:
+        if incremental and manifest.is_unchanged(markdown_file, image_format):
+            unchanged = len(manifest.outputs(markdown_file))
+            skipped += unchanged
+            print(f"  Unchanged: {markdown_file} ({unchanged} diagram(s))")
+            continue
+
+        extractor = MermaidExtractor(markdown_file, cache=cache)
+        previous = manifest.outputs(markdown_file) if incremental else []
+
+        print(f"  Processing: {markdown_file} ({len(extractor.diagrams)} diagram(s))")
+        records, file_rendered, file_skipped = extractor.render_images(
+            output_dir, shared_renderer, image_format=image_format,
+            prefix=prefix, previous_outputs=previous, rendered_images=rendered_images
+        )
+        rendered += file_rendered
+        skipped += file_skipped
+        failed += len(extractor.diagrams) - len(records)
+
+        # Garbage-collect images of diagrams that were edited or removed,
+        # unless another file still references an identical diagram
+        stale_names = set(manifest.outputs(markdown_file)) - {r["output"] for r in records}
+        manifest.update(markdown_file, image_format, records, len(extractor.diagrams))
+        if stale_names:
+            stale_names -= manifest.all_outputs()
+        for stale in sorted(stale_names):
+            stale_path = output_dir / stale
+            if stale_path.exists():
+                stale_path.unlink()
+                print(f"  Removed stale image: {stale_path}")
+
+    manifest.save()
+    return rendered, skipped, failed
+
+
+def watch_and_render(
+    watch_paths: List[Path],
+    list_files: Callable[[], List[Path]],
+    output_dir: Path,
+    renderer_factory: Callable[[], Any],
+    image_format: str = "png",
+    prefix: str = "diagram",
+    cache: Optional[RenderCache] = None,
+    debounce: float = 0.3,
+    poll: bool = False
+):
+    """
+    Render incrementally, then keep re-rendering as Markdown files are saved.
+
+    One renderer (and its render server) is created on first use and kept
+    warm for the whole session. After each debounced burst of saves only the
+    changed files are rescanned, and only diagrams whose hash changed are
+    rendered; images of deleted files are removed. Runs until Ctrl+C.
+
+    Args:
+        watch_paths: Directories or files to watch
+        list_files: Returns the Markdown files currently selected (re-evaluated
+            after each change, so new files matching a glob are picked up)
+        output_dir: Directory for rendered images and the manifest
+        renderer_factory: Returns a MermaidRenderer
+        image_format: png, svg, or pdf
+        prefix: Prefix for image filenames
+        cache: Render cache passed to the extractor
+        debounce: Seconds of quiet that end a burst of saves
+        poll: Poll for changes instead of using inotify
+    """
+    from mermaid_watch import FileWatcher, watch_loop
+
+    renderers: List[Any] = []
+
+    def warm_renderer():
+        if not renderers:
+            renderers.append(renderer_factory())
+        return renderers[0]
+
+    def render(markdown_files: List[Path]):
+        rendered, skipped, failed = render_incremental(
+            markdown_files, output_dir, warm_renderer,
+            image_format=image_format, prefix=prefix, cache=cache
+        )
+        print(f"✓ Rendered {rendered}, unchanged {skipped}, failed {failed}", flush=True)
+
+    def on_change(changed: List[Path]):
+        selected = {f.resolve() for f in list_files()}
+        deleted = [f for f in changed if not f.exists()]
+        if deleted:
+            manifest = RenderManifest(output_dir)
+            for markdown_file in deleted:
+                for stale in manifest.remove(markdown_file):
+                    stale_path = output_dir / stale
+                    if stale_path.exists():
+                        stale_path.unlink()
+                        print(f"  Removed stale image: {stale_path}")
+            manifest.save()
+        updated = [f for f in changed if f.exists() and f.resolve() in selected]
+        if updated:
+            render(updated)
+
+    # The watcher starts before the first pass so saves made during it are seen
+    watcher = FileWatcher(watch_paths, suffixes=('.md', '.markdown'), use_inotify=not poll)
+    render(list_files())
+    watch_loop(watcher, on_change, debounce)
+
+
+def watch_roots(pattern: str) -> List[Path]:
+    """Directory (or file) to watch for a file, directory or glob input."""
+    path = Path(pattern)
+    if path.exists():
+        return [path]
+    parts = []
+    for part in path.parts:
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return [Path(*parts) if parts else Path('.')]
+
+
+def write_jsonl(markdown_files: Iterable[Path], destination: str) -> int:
+    """
+    Stream one JSON record per diagram to destination ("-" for stdout).
+
+    Returns:
+        Number of diagrams written
+    """
+    out = sys.stdout if destination == '-' else open(destination, 'w', encoding='utf-8')
+    count = 0
+    try:
+        for markdown_file in markdown_files:
+            for diagram in scan_markdown_file(markdown_file):
+                out.write(json.dumps(diagram_record(markdown_file, diagram), ensure_ascii=False) + '\n')
+                count += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return count
+
+
+def validate_tree(markdown_files: List[Path], args: argparse.Namespace) -> int:
+    """Validate diagrams of many files together. Returns the process exit code."""
+    entries = [(f, d) for f in markdown_files for d in scan_markdown_file(f)]
+    validator = DiagramValidator(
+        cache=None if args.no_cache else RenderCache(args.cache_dir),
+        lint=not args.no_lint,
+        lint_only=args.lint_only,
+        batch=not args.no_batch,
+        timeout=args.timeout
+    )
+
+    print(f"Validating {len(entries)} diagram(s) in {len(markdown_files)} file(s)...\n")
+    outcomes = validator.validate([d for _, d in entries])
+
+    failed = 0
+    for (markdown_file, diagram), (error, issues) in zip(entries, outcomes):
+        location = f"{markdown_file}:{diagram.line_number} (#{diagram.index})"
+        if error:
+            failed += 1
+            print(f"  ❌ {location}")
+            print(f"    Error: {error}")
+        for issue in issues:
+            if issue.level == 'warning':
+                print(f"  ⚠️ {location}: {issue}")
+
+    print(f"\nValidation complete: {len(entries) - failed}/{len(entries)} passed "
+          f"({validator.mmdc_runs} mmdc run(s))")
+    return 1 if failed else 0
+
+
+def scan_tree(args: argparse.Namespace, pattern: str) -> int:
+    """Handle a directory or glob input. Returns the process exit code."""
+    markdown_files = list(iter_markdown_files([pattern]))
+    if not markdown_files and not args.watch:
+        print(f"No Markdown files found for: {pattern}", file=sys.stderr)
+        return 0
+
+    if args.render_images:
+        from mermaid_to_image import MermaidRenderer
+
+        cache = None if args.no_cache else RenderCache(args.cache_dir)
+        output_dir = args.output_dir or Path(args.image_dir)
+        if args.watch:
+            watch_and_render(
+                watch_roots(pattern),
+                lambda: list(iter_markdown_files([pattern])),
+                output_dir,
+                lambda: MermaidRenderer(cache=cache),
+                image_format=args.image_format,
+                prefix=args.prefix,
+                cache=cache,
+                debounce=args.debounce,
+                poll=args.poll
+            )
+            return 0
+
+        print(f"Rendering {len(markdown_files)} file(s) -> {output_dir}/")
+        rendered, skipped, failed = render_incremental(
+            markdown_files,
+            output_dir,
+            lambda: MermaidRenderer(cache=cache),
+            image_format=args.image_format,
+            prefix=args.prefix,
+            cache=cache,
+            incremental=args.incremental
+        )
+        print(f"\n✓ Rendered {rendered}, unchanged {skipped}, failed {failed}")
+        return 1 if failed else 0
+
+    if args.validate:
+        return validate_tree(markdown_files, args)
+
+    if args.list_only or args.replace_with_images or args.output_dir:
+        print("ERROR: Directory/glob input supports --jsonl, --validate and --render-images only",
+              file=sys.stderr)
+        return 1
+
+    count = write_jsonl(markdown_files, args.jsonl or '-')
+    print(f"✓ Found {count} diagram(s) in {len(markdown_files)} file(s)", file=sys.stderr)
+    return 0
 
 
 def main():
@@ -236,25 +1127,77 @@ Examples:
 
   # Replace with image references
   python extract_mermaid.py document.md --replace-with-images --image-format png
+
+  # Render images, re-rendering only diagrams changed since the last run
+  python extract_mermaid.py document.md --render-images -o diagrams/ --incremental
+
+  # Scan a docs tree and write one JSONL record per diagram
+  python extract_mermaid.py openspec/specs/ --jsonl diagrams.jsonl
+
+  # Validate every diagram of a docs tree with a single mmdc run
+  python extract_mermaid.py openspec/specs/ --validate
+  python extract_mermaid.py ".docs/**/*.md" --render-images -o diagrams/ --incremental
+
+  # Watch a docs tree and re-render diagrams as files are saved
+  python extract_mermaid.py docs/ --render-images -o diagrams/ --watch
         """
     )
 
-    parser.add_argument('markdown_file', type=Path, help='Input Markdown file')
+    parser.add_argument('markdown_file', type=Path,
+                        help='Input Markdown file, or a directory / glob pattern to scan')
     parser.add_argument('--output-dir', '-o', type=Path, help='Output directory for extracted diagrams')
     parser.add_argument('--prefix', default='diagram', help='Prefix for output filenames (default: diagram)')
     parser.add_argument('--list-only', '-l', action='store_true', help='List diagrams without extracting')
     parser.add_argument('--validate', '-v', action='store_true', help='Validate diagrams with mmdc')
+    parser.add_argument('--lint-only', action='store_true',
+                        help='With --validate, run only the fast structural lint (no mmdc)')
+    parser.add_argument('--no-lint', action='store_true',
+                        help='With --validate, send every diagram to mmdc without linting first')
+    parser.add_argument('--no-batch', action='store_true',
+                        help='With --validate, run one mmdc process per diagram instead of one per batch')
+    parser.add_argument('--timeout', type=float, default=30,
+                        help='With --validate, seconds allowed per diagram render (default: 30)')
     parser.add_argument('--replace-with-images', '-r', action='store_true',
                         help='Replace Mermaid blocks with image references')
     parser.add_argument('--image-format', choices=['png', 'svg'], default='png',
-                        help='Image format for replacement (default: png)')
+                        help='Image format for replacement and rendering (default: png)')
     parser.add_argument('--image-dir', default='diagrams',
                         help='Image directory path for references (default: diagrams)')
     parser.add_argument('--output-markdown', type=Path,
                         help='Output file for modified markdown (with --replace-with-images)')
+    parser.add_argument('--render-images', action='store_true',
+                        help='Render diagrams to images in --output-dir (default: --image-dir)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='With --render-images, skip unchanged files and diagrams using the '
+                             'manifest in the output directory, and remove stale images')
+    parser.add_argument('--watch', action='store_true',
+                        help='With --render-images, keep running and re-render changed diagrams '
+                             'whenever a Markdown file is saved (implies --incremental)')
+    parser.add_argument('--debounce', type=float, default=0.3,
+                        help='With --watch, seconds of quiet that end a burst of saves (default: 0.3)')
+    parser.add_argument('--poll', action='store_true',
+                        help='With --watch, poll for changes instead of using inotify')
+    parser.add_argument('--jsonl', metavar='FILE',
+                        help='Write one JSON record per diagram to FILE ("-" for stdout); '
+                             'default output when scanning a directory or glob')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Re-validate every diagram instead of trusting cached renders')
+    parser.add_argument('--cache-dir', type=Path,
+                        help='Render cache directory (default: $MERMAID_CACHE_DIR or user cache dir)')
 
     args = parser.parse_args()
 
+    if args.watch and not args.render_images:
+        parser.error('--watch requires --render-images')
+
+    pattern = str(args.markdown_file)
+    if args.markdown_file.is_dir() or (not args.markdown_file.exists() and glob.has_magic(pattern)):
+        sys.exit(scan_tree(args, pattern))
+
+    if args.jsonl:
+        write_jsonl([args.markdown_file], args.jsonl)
+        sys.exit(0)
+
     # Validate input file
     if not args.markdown_file.exists():
         print(f"ERROR: File not found: {args.markdown_file}", file=sys.stderr)
@@ -264,9 +1207,42 @@ Examples:
         print(f"ERROR: Not a file: {args.markdown_file}", file=sys.stderr)
         sys.exit(1)
 
+    cache = None if args.no_cache else RenderCache(args.cache_dir)
+
+    if args.render_images:
+        from mermaid_to_image import MermaidRenderer
+
+        output_dir = args.output_dir or (args.markdown_file.parent / args.image_dir)
+        if args.watch:
+            watch_and_render(
+                [args.markdown_file],
+                lambda: [args.markdown_file] if args.markdown_file.exists() else [],
+                output_dir,
+                lambda: MermaidRenderer(cache=cache),
+                image_format=args.image_format,
+                prefix=args.prefix,
+                cache=cache,
+                debounce=args.debounce,
+                poll=args.poll
+            )
+            sys.exit(0)
+
+        print(f"Rendering: {args.markdown_file} -> {output_dir}/")
+        rendered, skipped, failed = render_incremental(
+            [args.markdown_file],
+            output_dir,
+            lambda: MermaidRenderer(cache=cache),
+            image_format=args.image_format,
+            prefix=args.prefix,
+            cache=cache,
+            incremental=args.incremental
+        )
+        print(f"\n✓ Rendered {rendered}, unchanged {skipped}, failed {failed}")
+        sys.exit(1 if failed else 0)
+
     # Extract diagrams
     print(f"Processing: {args.markdown_file}")
-    extractor = MermaidExtractor(args.markdown_file)
+    extractor = MermaidExtractor(args.markdown_file, cache=cache)
 
     if not extractor.diagrams:
         print("No Mermaid diagrams found.")
@@ -277,7 +1253,12 @@ Examples:
         extractor.list_diagrams()
 
     elif args.validate:
-        results = extractor.validate_diagrams()
+        results = extractor.validate_diagrams(
+            lint=not args.no_lint,
+            lint_only=args.lint_only,
+            batch=not args.no_batch,
+            timeout=args.timeout
+        )
         # Exit with error if any validation failed
         if any(results.values()):
             sys.exit(1)
@@ -0,0 +1,536 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Mermaid scripts on a synthetic diagram corpus.
+
+Generates N Markdown files with M diagrams each (mixed diagram types, sizes
+from a handful up to thousands of nodes) in a temporary directory and times
+the pure-Python paths plus rendering through a stub mmdc that only simulates
+latency, so no Node.js installation is needed:
+
+- extract:          MermaidExtractor over every Markdown file
+- detect_type:      detect_diagram_type per diagram (after checking it agrees
+                    with the original per-pattern loop on the corpus and on
+                    DETECT_TYPE_EDGE_CASES; a mismatch fails the run)
+- lint:             MermaidLinter.lint per diagram
+- complexity:       estimate_complexity per diagram
+- troubleshooting_load:   parsing troubleshooting.md into its search index
+- troubleshooting_search: TroubleshootingParser.search per error message
+- render:           MermaidRenderer.render_bytes per sampled diagram
+- validate_batch:   DiagramValidator over the whole corpus (batched mmdc runs)
+
+Results are written as JSON so regressions can be tracked over time.
+
+Usage:
+    # Default corpus (20 files x 10 diagrams), JSON on stdout, progress on stderr
+    python mermaid_benchmark.py
+
+    # Larger corpus, results to a file
+    python mermaid_benchmark.py --files 100 --diagrams 20 --max-nodes 5000 -o results.json
+
+    # Fail (exit 1) if any stage got more than 20% slower than a baseline
+    python mermaid_benchmark.py -o current.json --baseline results.json --threshold 1.2
+
+Requirements:
+    - Python 3.7+ (stdlib only, no external dependencies)
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List
+
+
+RESULTS_VERSION = 1
+
+# Stub mmdc: sleeps for MERMAID_BENCH_LATENCY_MS, then writes a small SVG for
+# a .mmd/stdin input or one SVG per block of a Markdown input
+STUB_MMDC = '''#!{python}
+import os, re, sys, time
+args = sys.argv[1:]
+if '--version' in args:
+    print('0.0.0-benchmark-stub')
+    sys.exit(0)
+time.sleep(float(os.environ.get('MERMAID_BENCH_LATENCY_MS', '50')) / 1000)
+source = args[args.index('-i') + 1]
+output = args[args.index('-o') + 1]
+code = sys.stdin.read() if source == '-' else open(source, encoding='utf-8').read()
+svg = '<svg xmlns="http://www.w3.org/2000/svg"><!-- %d bytes --></svg>'
+if output == '-':
+    sys.stdout.write(svg % len(code))
+elif output.endswith('.md'):
+    blocks = re.findall(r'```mermaid\\n(.*?)```', code, re.S)
+    for number, block in enumerate(blocks, start=1):
+        with open('%s-%d.svg' % (output[:-3], number), 'w') as f:
+            f.write(svg % len(block))
+    with open(output, 'w') as f:
+        f.write(code)
+else:
+    with open(output, 'w') as f:
+        f.write(svg % len(code))
+'''
+
+# Error messages as mmdc reports them, used as troubleshooting queries
+SAMPLE_ERRORS = [
+    "Error: Parse error on line {line}:\n...A --> end\n----------------^\nExpecting 'AMP', 'COLON', got 'end'",
+    "Error: Parse error on line {line}:\n...Alice->>Bob Hello\n---------------^\nExpecting 'TXT', got 'NEWLINE'",
+    "Error: Lexical error on line {line}. Unrecognized text.\n...A[Label (with) parens]",
+    "Error: Parse error on line {line}:\nflowchart TD A-->B\n-------------^\nExpecting 'SEMI', 'NEWLINE', 'SPACE', got 'ALPHA'",
+    "Error: Parse error on line {line}:\n...  A -> B\n---------^\nExpecting 'LINK', got 'MINUS'",
+    "Error: Parse error on line {line}:\n...subgraph One\n  A-->B\nExpecting 'end', got 'EOF'",
+    "UnknownDiagramError: No diagram type detected matching given configuration for text: graphh TD",
+    "Error: Parse error on line {line}:\n...class default\n-------^\nExpecting 'ALPHA', got 'DEFAULT'",
+]
+
+
+def _flowchart(rng: random.Random, nodes: int) -> str:
+    lines = [f"flowchart {rng.choice(['TD', 'LR'])}"]
+    for i in range(1, nodes):
+        parent = rng.randrange(i)
+        label = f'["Step {i} (check)"]' if i % 7 == 0 else f"[Step {i}]"
+        arrow = rng.choice(['-->', '-.->', '==>'])
+        lines.append(f"    N{parent} {arrow} N{i}{label}")
+        if i % 50 == 0:
+            lines.append(f"    subgraph G{i}")
+            lines.append(f"        N{i} --> N{i}b[Detail {i}]")
+            lines.append("    end")
+    return '\n'.join(lines)
+
+
+def _sequence(rng: random.Random, nodes: int) -> str:
+    participants = [f"P{i}" for i in range(min(nodes, 20) or 1)]
+    lines = ["sequenceDiagram"] + [f"    participant {p}" for p in participants]
+    for i in range(nodes):
+        a, b = rng.choice(participants), rng.choice(participants)
+        lines.append(f"    {a}{rng.choice(['->>', '-->>', '-)'])}{b}: message {i}")
+        if i % 40 == 39:
+            lines.extend(["    alt retry", f"        {b}->>{a}: retry {i}", "    end"])
+    return '\n'.join(lines)
+
+
+def _class(rng: random.Random, nodes: int) -> str:
+    lines = ["classDiagram"]
+    for i in range(nodes):
+        lines.append(f"    class C{i} {{\n        +int field{i}\n        +method{i}() bool\n    }}")
+        if i:
+            lines.append(f"    C{rng.randrange(i)} {rng.choice(['<|--', '*--', 'o--', '-->'])} C{i}")
+    return '\n'.join(lines)
+
+
+def _state(rng: random.Random, nodes: int) -> str:
+    lines = ["stateDiagram-v2", "    [*] --> S0"]
+    for i in range(1, nodes):
+        lines.append(f"    S{rng.randrange(i)} --> S{i}: event{i}")
+    lines.append(f"    S{nodes - 1} --> [*]")
+    return '\n'.join(lines)
+
+
+def _er(rng: random.Random, nodes: int) -> str:
+    lines = ["erDiagram"]
+    for i in range(nodes):
+        lines.append(f"    E{i} {{\n        int id PK\n        string name{i}\n    }}")
+        if i:
+            lines.append(f"    E{rng.randrange(i)} ||--o{{ E{i} : has")
+    return '\n'.join(lines)
+
+
+def _gantt(rng: random.Random, nodes: int) -> str:
+    lines = ["gantt", "    title Plan", "    dateFormat YYYY-MM-DD"]
+    for i in range(nodes):
+        if i % 10 == 0:
+            lines.append(f"    section Phase {i // 10}")
+        lines.append(f"    Task {i} :t{i}, 2024-01-{1 + i % 28:02d}, {rng.randint(1, 9)}d")
+    return '\n'.join(lines)
+
+
+def _pie(rng: random.Random, nodes: int) -> str:
+    lines = ["pie title Share"]
+    lines.extend(f'    "Slice {i}" : {rng.randint(1, 100)}' for i in range(min(nodes, 50)))
+    return '\n'.join(lines)
+
+
+def _mindmap(rng: random.Random, nodes: int) -> str:
+    lines = ["mindmap", "  root((Topic))"]
+    for i in range(1, nodes):
+        lines.append("  " + "  " * (1 + i % 4) + f"Idea {i}")
+    return '\n'.join(lines)
+
+
+def _timeline(rng: random.Random, nodes: int) -> str:
+    lines = ["timeline", "    title History"]
+    lines.extend(f"    {2000 + i} : Event {i}" for i in range(nodes))
+    return '\n'.join(lines)
+
+
+def _journey(rng: random.Random, nodes: int) -> str:
+    lines = ["journey", "    title User journey"]
+    for i in range(nodes):
+        if i % 8 == 0:
+            lines.append(f"    section Stage {i // 8}")
+        lines.append(f"      Step {i}: {rng.randint(1, 5)}: User")
+    return '\n'.join(lines)
+
+
+# Diagram generators and their share of the corpus
+GENERATORS = {
+    'flowchart': (_flowchart, 5),
+    'sequence': (_sequence, 3),
+    'class': (_class, 2),
+    'state': (_state, 2),
+    'er': (_er, 1),
+    'gantt': (_gantt, 1),
+    'pie': (_pie, 1),
+    'mindmap': (_mindmap, 1),
+    'timeline': (_timeline, 1),
+    'journey': (_journey, 1),
+}
+
+
+def generate_corpus(
+    root: Path,
+    files: int,
+    diagrams: int,
+    max_nodes: int,
+    seed: int
+) -> Dict[str, Any]:
+    """
+    Write a synthetic Markdown corpus under root.
+
+    Node counts are log-uniform between 3 and max_nodes, so most diagrams are
+    small while a few are very large, as in real documentation.
+
+    Returns:
+        Corpus statistics (files, diagrams, bytes, nodes, types)
+    """
+    rng = random.Random(seed)
+    names = list(GENERATORS)
+    weights = [GENERATORS[name][1] for name in names]
+    low, high = math.log(3), math.log(max(3, max_nodes))
+    types: Dict[str, int] = {}
+    total_bytes = total_nodes = 0
+
+    for file_number in range(files):
+        sections = [f"# Document {file_number}\n"]
+        for diagram_number in range(diagrams):
+            kind = rng.choices(names, weights)[0]
+            nodes = int(math.exp(rng.uniform(low, high)))
+            code = GENERATORS[kind][0](rng, nodes)
+            sections.append(
+                f"## Diagram {diagram_number}\n\nSome prose about the diagram.\n\n"
+                f"```mermaid\n{code}\n```\n"
+            )
+            types[kind] = types.get(kind, 0) + 1
+            total_nodes += nodes
+
+        path = root / f"doc-{file_number:04d}.md"
+        path.write_text('\n'.join(sections), encoding='utf-8')
+        total_bytes += path.stat().st_size
+
+    return {
+        "files": files,
+        "diagrams": files * diagrams,
+        "bytes": total_bytes,
+        "nodes": total_nodes,
+        "types": dict(sorted(types.items())),
+    }
+
+
+def install_stub_mmdc(bin_dir: Path, latency_ms: float):
+    """Put a latency-simulating mmdc first on PATH for this process and its children."""
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    stub = bin_dir / 'mmdc'
+    stub.write_text(STUB_MMDC.format(python=sys.executable), encoding='utf-8')
+    stub.chmod(0o755)
+    os.environ['PATH'] = f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}"
+    os.environ['MERMAID_BENCH_LATENCY_MS'] = str(latency_ms)
+
+
+def summarize(samples_ms: List[float], wall_ms: float) -> Dict[str, Any]:
+    """Statistics for one stage run: per-item samples and the stage wall time."""
+    ordered = sorted(samples_ms)
+    return {
+        "count": len(ordered),
+        "wall_ms": round(wall_ms, 3),
+        "mean_ms": round(statistics.mean(ordered), 4) if ordered else 0.0,
+        "p50_ms": round(ordered[len(ordered) // 2], 4) if ordered else 0.0,
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4) if ordered else 0.0,
+        "max_ms": round(ordered[-1], 4) if ordered else 0.0,
+    }
+
+
+def time_each(items: Iterable[Any], action: Callable[[Any], Any]) -> Dict[str, Any]:
+    """Run action on every item, timing each call and the whole loop."""
+    samples = []
+    started = time.perf_counter()
+    for item in items:
+        item_started = time.perf_counter()
+        action(item)
+        samples.append((time.perf_counter() - item_started) * 1000)
+    return summarize(samples, (time.perf_counter() - started) * 1000)
+
+
+def best_of(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Keep the fastest repetition of a stage (least disturbed by noise)."""
+    best = dict(min(runs, key=lambda run: run["wall_ms"]))
+    best["repeats"] = len(runs)
+    best["median_wall_ms"] = round(statistics.median(run["wall_ms"] for run in runs), 3)
+    return best
+
+
+# The per-pattern loop detect_diagram_type replaced, kept as the reference
+# its single precompiled match must agree with
+REFERENCE_TYPE_PATTERNS = {
+    'flowchart': [r'^flowchart\s+(TB|TD|BT|RL|LR)', r'^graph\s+(TB|TD|BT|RL|LR)'],
+    'sequence': [r'^sequenceDiagram'],
+    'class': [r'^classDiagram'],
+    'state': [r'^stateDiagram(-v2)?'],
+    'er': [r'^erDiagram'],
+    'gantt': [r'^gantt'],
+    'pie': [r'^pie'],
+    'mindmap': [r'^mindmap'],
+    'timeline': [r'^timeline'],
+    'quadrant': [r'^quadrantChart'],
+    'requirement': [r'^requirementDiagram'],
+    'journey': [r'^journey'],
+    'c4': [r'^C4Context', r'^C4Container', r'^C4Component', r'^C4Deployment'],
+}
+
+# Headers where a single match could drift from the reference: separators
+# and line breaks, comments, case, prefixes, unusual whitespace
+DETECT_TYPE_EDGE_CASES = [
+    '', '\n\n', '%% only a comment', '  %% comment\n\n  graph TD\nA-->B',
+    'graph\nTD\nA-->B', 'flowchart\n  LR', 'graph \nTD', 'graph\r\nTD', 'graph \r\n TD',
+    'graph\tTD', 'graph\x0bTD', 'graph\x0cLR', 'graph\rTD', 'graph\u00a0TD', 'graph\u2003LR',
+    '\u00a0graph TD', '\x1cgraph TD', '\x85pie', 'graphTD', 'GRAPH td', 'flowchart TB;A-->B',
+    'flowchart-elk TD', 'pie title Pets', 'piechart', 'c4container', 'C4Dynamic',
+    'stateDiagram-v2', 'statediagram', 'sequenceDiagram\n  A->>B: hi', 'journeyman',
+    '\r\ngantt', '%%{init: {}}%%\nerDiagram', 'x\ngraph TD', '  \t  \n\tmindmap',
+]
+
+
+def reference_detect_type(mermaid_code: str) -> str:
+    """Diagram type value as computed by the original per-pattern loop."""
+    first_line = ""
+    for line in mermaid_code.strip().split('\n'):
+        stripped = line.strip()
+        if stripped and not stripped.startswith('%%'):
+            first_line = stripped
+            break
+    for diagram_type, patterns in REFERENCE_TYPE_PATTERNS.items():
+        for pattern in patterns:
+            if re.match(pattern, first_line, re.IGNORECASE):
+                return diagram_type
+    return 'unknown'
+
+
+def detect_type_mismatches(codes: Iterable[str]) -> List[str]:
+    """Inputs on which detect_diagram_type disagrees with the reference loop."""
+    from resilient_diagram import detect_diagram_type
+
+    mismatches = []
+    for code in codes:
+        expected = reference_detect_type(code)
+        actual = detect_diagram_type(code).value
+        if actual != expected:
+            mismatches.append(f"{code[:40]!r}: {actual} != {expected}")
+    return mismatches
+
+
+def run_benchmark(args: argparse.Namespace, workdir: Path, log) -> Dict[str, Any]:
+    """Generate the corpus, run every stage and return the results document."""
+    corpus_dir = workdir / 'corpus'
+    corpus_dir.mkdir()
+    print(f"Generating corpus: {args.files} file(s) x {args.diagrams} diagram(s), "
+          f"up to {args.max_nodes} nodes...", file=log)
+    corpus = generate_corpus(corpus_dir, args.files, args.diagrams, args.max_nodes, args.seed)
+
+    # Isolate caches and use the stub mmdc; the render server needs Node
+    os.environ['MERMAID_CACHE_DIR'] = str(workdir / 'cache' / 'renders')
+    os.environ['MERMAID_NO_SERVER'] = '1'
+    install_stub_mmdc(workdir / 'bin', args.latency_ms)
+
+    from extract_mermaid import DiagramValidator, MermaidExtractor
+    from mermaid_complexity import estimate_complexity
+    from mermaid_lint import MermaidLinter
+    from mermaid_to_image import MermaidRenderer
+    from resilient_diagram import ResilientDiagramGenerator, TroubleshootingParser, detect_diagram_type
+
+    markdown_files = sorted(corpus_dir.glob('*.md'))
+    diagrams = [d for f in markdown_files for d in MermaidExtractor(f).diagrams]
+    generator = ResilientDiagramGenerator()
+    guide = generator.troubleshooting_path
+    linter = MermaidLinter(generator)
+    rng = random.Random(args.seed)
+    queries = [
+        (rng.choice(SAMPLE_ERRORS).format(line=rng.randint(1, 200)), rng.choice(diagrams))
+        for _ in range(args.queries)
+    ]
+    sample = diagrams[:args.render_sample]
+    renderer = MermaidRenderer(use_server=False, cache=None, timeout=args.timeout)
+
+    def load_guide(_):
+        # Cold parse: no in-process memo and no persisted index
+        TroubleshootingParser._memo.clear()
+        TroubleshootingParser(guide)
+
+    def search(query):
+        message, diagram = query
+        generator.troubleshooting.search(message, detect_diagram_type(diagram.content))
+
+    def validate_all(_):
+        DiagramValidator(cache=None, lint=False, timeout=args.timeout).validate(diagrams)
+
+    stages: Dict[str, Callable[[], Dict[str, Any]]] = {
+        'extract': lambda: time_each(markdown_files, MermaidExtractor),
+        'detect_type': lambda: time_each(diagrams, lambda d: detect_diagram_type(d.content)),
+        'lint': lambda: time_each(diagrams, lambda d: linter.lint(d.content)),
+        'complexity': lambda: time_each(
+            diagrams, lambda d: estimate_complexity(d.content, d.diagram_type)
+        ),
+        'troubleshooting_load': lambda: time_each([None], load_guide),
+        'troubleshooting_search': lambda: time_each(queries, search),
+        'render': lambda: time_each(sample, lambda d: renderer.render_bytes(d.content, 'svg')),
+        'validate_batch': lambda: time_each([None], validate_all),
+    }
+    if not guide:
+        print("⚠️  troubleshooting.md not found, skipping troubleshooting stages", file=log)
+        del stages['troubleshooting_load'], stages['troubleshooting_search']
+
+    selected = args.stages.split(',') if args.stages else list(stages)
+    results = {}
+    parity_mismatches = []
+    if 'detect_type' in selected:
+        print("  Checking detect_type against the reference loop...", end=" ", flush=True, file=log)
+        parity_mismatches = detect_type_mismatches(
+            DETECT_TYPE_EDGE_CASES + [d.content for d in diagrams]
+        )
+        print(f"{'❌' if parity_mismatches else '✓'} {len(parity_mismatches)} mismatch(es)", file=log)
+    no_index_cache = os.environ.get('MERMAID_NO_INDEX_CACHE')
+    os.environ['MERMAID_NO_INDEX_CACHE'] = '1'
+    try:
+        for name in selected:
+            if name not in stages:
+                continue
+            print(f"  Timing {name}...", end=" ", flush=True, file=log)
+            results[name] = best_of([stages[name]() for _ in range(args.repeat)])
+            print(f"✓ {results[name]['wall_ms']:.1f} ms", file=log)
+    finally:
+        if no_index_cache is None:
+            os.environ.pop('MERMAID_NO_INDEX_CACHE', None)
+
+    return {
+        "version": RESULTS_VERSION,
+        "timestamp": round(time.time(), 3),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "files": args.files,
+            "diagrams": args.diagrams,
+            "max_nodes": args.max_nodes,
+            "seed": args.seed,
+            "latency_ms": args.latency_ms,
+            "repeat": args.repeat,
+            "queries": args.queries,
+            "render_sample": len(sample),
+        },
+        "corpus": corpus,
+        "stages": results,
+        "detect_type_mismatches": parity_mismatches,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Compare stage wall times with a baseline results document.
+
+    Returns:
+        Descriptions of stages slower than baseline * threshold
+    """
+    regressions = []
+    for name, stage in results["stages"].items():
+        previous = baseline.get("stages", {}).get(name)
+        if not previous or not previous.get("wall_ms"):
+            continue
+        ratio = stage["wall_ms"] / previous["wall_ms"]
+        if ratio > threshold:
+            regressions.append(
+                f"{name}: {stage['wall_ms']:.1f} ms vs {previous['wall_ms']:.1f} ms ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the Mermaid scripts on a synthetic corpus (stub mmdc, no Node needed)'
+    )
+    parser.add_argument('--files', type=int, default=20, help='Markdown files to generate (default: 20)')
+    parser.add_argument('--diagrams', type=int, default=10, help='Diagrams per file (default: 10)')
+    parser.add_argument('--max-nodes', type=int, default=2000,
+                        help='Largest diagram size in nodes (default: 2000)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for the corpus (default: 42)')
+    parser.add_argument('--latency-ms', type=float, default=50,
+                        help='Simulated mmdc latency per run in milliseconds (default: 50)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Repetitions per stage; the fastest is reported (default: 3)')
+    parser.add_argument('--queries', type=int, default=200,
+                        help='Troubleshooting searches to time (default: 200)')
+    parser.add_argument('--render-sample', type=int, default=20,
+                        help='Diagrams rendered one by one in the render stage (default: 20)')
+    parser.add_argument('--timeout', type=float, default=60, help='Seconds allowed per render (default: 60)')
+    parser.add_argument('--stages', help='Comma-separated stages to run (default: all)')
+    parser.add_argument('--output', '-o', default='-', help='Results JSON file ("-" for stdout, the default)')
+    parser.add_argument('--baseline', type=Path, help='Previous results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='With --baseline, fail if a stage is slower than baseline x this (default: 1.25)')
+    args = parser.parse_args()
+
+    if args.files < 1 or args.diagrams < 1 or args.repeat < 1:
+        print("ERROR: --files, --diagrams and --repeat must be at least 1", file=sys.stderr)
+        sys.exit(1)
+
+    baseline = None
+    if args.baseline:
+        try:
+            baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            print(f"ERROR: Cannot read baseline: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    # Keep stdout clean for the JSON when it goes there
+    log = sys.stderr if args.output == '-' else sys.stdout
+    with tempfile.TemporaryDirectory(prefix='mermaid-bench-') as tmpdir:
+        results = run_benchmark(args, Path(tmpdir), log)
+
+    document = json.dumps(results, indent=2)
+    if args.output == '-':
+        print(document)
+    else:
+        Path(args.output).write_text(document + '\n', encoding='utf-8')
+        print(f"\n✓ Results written to {args.output}", file=log)
+
+    if results["detect_type_mismatches"]:
+        print("\n❌ detect_diagram_type disagrees with the reference loop:", file=log)
+        for mismatch in results["detect_type_mismatches"]:
+            print(f"  - {mismatch}", file=log)
+        sys.exit(1)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} stage(s) regressed:", file=log)
+            for regression in regressions:
+                print(f"  - {regression}", file=log)
+            sys.exit(1)
+        print(f"\n✅ No stage slower than {args.threshold:g}x the baseline", file=log)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Locate mermaid-cli (mmdc) once and remember it.
+
+Probing `mmdc --version` starts Node and can take around a second on a cold
+install, so the scripts resolve mmdc through this module instead: the result
+is memoized in-process and persisted in a small cache file, keyed on PATH and
+the binary's mtime, so later invocations skip the probe entirely.
+
+Usage:
+    from mermaid_cli import check_mmdc_installed, mmdc_command
+
+    if check_mmdc_installed():
+        subprocess.run(mmdc_command() + ['-i', 'in.mmd', '-o', 'out.png'])
+
+    # From asyncio code (the child is killed on timeout or cancellation)
+    result = await arun_mmdc(['-i', 'in.mmd', '-o', 'out.png'], timeout=60)
+
+    # Show what was resolved
+    python mermaid_cli.py [--refresh]
+
+Environment:
+    MERMAID_CACHE_DIR  Render cache directory; the probe cache lives beside it
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import List, Optional
+
+from mermaid_render_cache import default_cache_dir
+
+
+PROBE_VERSION = 1
+
+IMAGE_FORMATS = ('png', 'svg', 'pdf')
+
+
+@dataclass
+class MmdcInfo:
+    """A resolved mmdc executable."""
+    path: str
+    version: str
+
+
+_resolved: dict = {}
+_lock = threading.Lock()
+
+
+def probe_cache_path() -> Path:
+    """Return the file the probe result is persisted in."""
+    return default_cache_dir().parent / 'mmdc-probe.json'
+
+
+def resolve_mmdc(refresh: bool = False) -> Optional[MmdcInfo]:
+    """
+    Locate mmdc and its version, probing it only when something changed.
+
+    Args:
+        refresh: Ignore cached results and run `mmdc --version` again
+
+    Returns:
+        MmdcInfo, or None if mmdc is not installed or does not run
+    """
+    search_path = os.environ.get('PATH', '')
+    with _lock:
+        if not refresh and search_path in _resolved:
+            return _resolved[search_path]
+
+        path = shutil.which('mmdc')
+        info = None
+        if path:
+            key = _probe_key(search_path, path)
+            info = None if refresh else _read_probe(key)
+            if info is None:
+                info = _probe(path)
+                _write_probe(key, info)
+            elif not info.version:
+                # Cached negative result: mmdc exists but does not run
+                info = None
+
+        _resolved[search_path] = info
+        return info
+
+
+def check_mmdc_installed() -> bool:
+    """Check if mermaid-cli (mmdc) is installed."""
+    return resolve_mmdc() is not None
+
+
+def mmdc_command() -> List[str]:
+    """Return the command prefix that runs mmdc (its resolved path if known)."""
+    info = resolve_mmdc()
+    return [info.path] if info else ['mmdc']
+
+
+def parse_formats(value: str) -> List[str]:
+    """
+    Parse a comma-separated image format list such as "png,svg".
+
+    Usable as an argparse type. Duplicates are dropped, order is kept.
+
+    Raises:
+        argparse.ArgumentTypeError: If a format is not png, svg or pdf
+    """
+    formats = []
+    for name in value.split(','):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in IMAGE_FORMATS:
+            raise argparse.ArgumentTypeError(
+                f"invalid format '{name}' (choose from {', '.join(IMAGE_FORMATS)})"
+            )
+        if name not in formats:
+            formats.append(name)
+    if not formats:
+        raise argparse.ArgumentTypeError("no image format given")
+    return formats
+
+
+async def arun_mmdc(
+    args: List[str],
+    timeout: Optional[float] = 60,
+    input_data: Optional[bytes] = None
+) -> subprocess.CompletedProcess:
+    """
+    Run mmdc from asyncio code.
+
+    The child process is killed if the timeout expires or the awaiting task
+    is cancelled, so abandoned renders do not keep a browser running.
+
+    Args:
+        args: mmdc arguments (without the executable)
+        timeout: Seconds to wait for mmdc (None waits forever)
+        input_data: Bytes piped to mmdc's stdin
+
+    Returns:
+        CompletedProcess with stdout/stderr as bytes
+
+    Raises:
+        subprocess.TimeoutExpired: If mmdc did not finish in time
+        OSError: If mmdc could not be started
+    """
+    cmd = mmdc_command() + list(args)
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.PIPE if input_data is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(input_data), timeout)
+    except asyncio.TimeoutError:
+        await _kill(process)
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    except asyncio.CancelledError:
+        await _kill(process)
+        raise
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+
+async def _kill(process: 'asyncio.subprocess.Process'):
+    if process.returncode is None:
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+        await process.wait()
+
+
+def _probe_key(search_path: str, path: str) -> dict:
+    try:
+        mtime_ns = os.stat(os.path.realpath(path)).st_mtime_ns
+    except OSError:
+        mtime_ns = None
+    return {'version': PROBE_VERSION, 'PATH': search_path, 'path': path, 'mtime_ns': mtime_ns}
+
+
+def _probe(path: str) -> MmdcInfo:
+    """Run `mmdc --version`; an empty version means the probe failed."""
+    try:
+        result = subprocess.run(
+            [path, '--version'],
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return MmdcInfo(path=path, version='')
+    if result.returncode != 0:
+        return MmdcInfo(path=path, version='')
+    return MmdcInfo(path=path, version=result.stdout.strip() or 'unknown')
+
+
+def _read_probe(key: dict) -> Optional[MmdcInfo]:
+    try:
+        data = json.loads(probe_cache_path().read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get('key') != key:
+        return None
+    info = data.get('info') or {}
+    return MmdcInfo(path=info.get('path', key['path']), version=info.get('version', ''))
+
+
+def _write_probe(key: dict, info: MmdcInfo):
+    cache_path = probe_cache_path()
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=cache_path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'key': key, 'info': asdict(info)}, f)
+        os.replace(tmp_name, cache_path)
+    except OSError:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Locate mermaid-cli (mmdc) and cache the result')
+    parser.add_argument('--refresh', action='store_true', help='Probe mmdc again, ignoring the cache')
+    args = parser.parse_args()
+
+    info = resolve_mmdc(refresh=args.refresh)
+    if not info:
+        print("ERROR: mermaid-cli (mmdc) not found.", file=sys.stderr)
+        print("Install with: npm install -g @mermaid-js/mermaid-cli", file=sys.stderr)
+        sys.exit(1)
+    print(f"✅ mmdc {info.version}: {info.path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,548 @@
+#!/usr/bin/env python3
+"""
+Estimate Mermaid diagram complexity before rendering.
+
+Large generated diagrams (thousands of flowchart nodes) exceed Mermaid's
+default maxTextSize/maxEdges limits, run past fixed render timeouts, or
+exhaust Chromium's memory. This module counts nodes and edges from the
+source in pure Python so renders can be sized up front:
+- render_limits() picks an adaptive timeout and raised maxTextSize/maxEdges
+- split_flowchart() cuts oversized flowcharts into one partial diagram per
+  top-level subgraph plus an index diagram linking the subgraphs
+
+Usage:
+    # Show the estimate and the limits a render would use
+    python mermaid_complexity.py diagram.mmd
+
+    # JSON output, reading from stdin
+    cat diagram.mmd | python mermaid_complexity.py - --json
+
+    # Write the subgraph partials and the index of an oversized flowchart
+    python mermaid_complexity.py huge.mmd --split parts/
+
+    # From Python
+    complexity = estimate_complexity(code, "flowchart")
+    limits = render_limits(complexity, base_timeout=60)
+
+Requirements:
+    - Python 3.7+ (stdlib only, no external dependencies)
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import sys
+import tempfile
+from dataclasses import dataclass, asdict, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from mermaid_render_cache import default_cache_dir
+
+
+# Mermaid's own defaults; diagrams beyond them fail with
+# "Maximum text size in diagram exceeded" / "Edge limit exceeded"
+DEFAULT_MAX_TEXT_SIZE = 50000
+DEFAULT_MAX_EDGES = 500
+
+# Elements (nodes + edges) one base timeout covers; larger diagrams get
+# proportionally more time, up to MAX_TIMEOUT_FACTOR base timeouts
+TIMEOUT_ELEMENTS = 250
+MAX_TIMEOUT_FACTOR = 10
+
+# Flowcharts beyond any of these are rendered per subgraph when possible
+CHUNK_MAX_NODES = 500
+CHUNK_MAX_EDGES = 800
+CHUNK_MAX_TEXT_SIZE = 100000
+
+COMMENT_PATTERN = re.compile(r'^\s*%%')
+QUOTED_PATTERN = re.compile(r'"[^"]*"')
+LABEL_PATTERN = re.compile(r'\[[^\]]*\]|\([^)]*\)|\{[^}]*\}|>[^\]]*\]')
+EDGE_LABEL_PATTERN = re.compile(r'\|[^|]*\|')
+EDGE_TEXT_PATTERN = re.compile(r'(?<![-=.])(--|==|-\.)\s+[^-=.>|][^>]*?\s*(-->|==>|-\.->|---|===|-\.-)')
+EDGE_SPLIT_PATTERN = re.compile(r'\s*(?:[<ox]?(?:-{2,}|={2,}|-\.+-)[>ox]?|~{3,})\s*')
+CLASS_SHORTHAND_PATTERN = re.compile(r':::[\w-]+')
+NODE_ID_PATTERN = re.compile(r'^([A-Za-z0-9_][\w.-]*)$')
+FLOWCHART_SKIP_PATTERN = re.compile(r'^(?:classDef|class|style|linkStyle|click|direction)\b(?!\s*[-=.&])')
+SUBGRAPH_PATTERN = re.compile(r'^subgraph\b\s*(.*?)\s*;?$')
+SUBGRAPH_ID_PATTERN = re.compile(r'^([\w.-]+)\s*(\[.*\])?$')
+END_PATTERN = re.compile(r'^end\s*;?$')
+
+SEQUENCE_MESSAGE_PATTERN = re.compile(
+    r'^([^:]+?)\s*(?:-->>|->>|--x|-x|--\)|-\)|-->|->|<<-->>|<<->>)\s*[+-]?([^:]+?)\s*:'
+)
+SEQUENCE_DECLARATION_PATTERN = re.compile(r'^(?:participant|actor)\s+(\S+)')
+CLASS_RELATION_PATTERN = re.compile(
+    r'^([\w.-]+)\s*(?:"[^"]*"\s*)?(?:<\|--|--\|>|\*--|--\*|o--|--o|-->|<--|\.\.\|>|<\|\.\.|\.\.>|<\.\.|--|\.\.)'
+    r'\s*(?:"[^"]*"\s*)?([\w.-]+)'
+)
+CLASS_DECLARATION_PATTERN = re.compile(r'^class\s+([\w.-]+)')
+STATE_TRANSITION_PATTERN = re.compile(r'^(\[\*\]|[\w.-]+)\s*-->\s*(\[\*\]|[\w.-]+)')
+ER_RELATION_PATTERN = re.compile(r'^([\w-]+)\s+[|}o][|o]?(?:--|\.\.)[|o][|{o]?\s+([\w-]+)')
+
+# Diagram types whose edges are "A <relation> B" lines
+RELATION_PATTERNS = {
+    'class': CLASS_RELATION_PATTERN,
+    'state': STATE_TRANSITION_PATTERN,
+    'er': ER_RELATION_PATTERN,
+}
+
+
+@dataclass
+class DiagramComplexity:
+    """Size of a diagram as measured from its source."""
+    diagram_type: str
+    nodes: int
+    edges: int
+    subgraphs: int
+    text_size: int
+    lines: int
+
+    @property
+    def elements(self) -> int:
+        return self.nodes + self.edges
+
+    @property
+    def oversized(self) -> bool:
+        """True if the diagram should be rendered in chunks when possible."""
+        return (
+            self.nodes > CHUNK_MAX_NODES
+            or self.edges > CHUNK_MAX_EDGES
+            or self.text_size > CHUNK_MAX_TEXT_SIZE
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class RenderLimits:
+    """Timeout and Mermaid limits sized for one diagram."""
+    timeout: float
+    max_text_size: int = DEFAULT_MAX_TEXT_SIZE
+    max_edges: int = DEFAULT_MAX_EDGES
+
+    @property
+    def raised(self) -> bool:
+        """True if the diagram needs limits above Mermaid's defaults."""
+        return self.max_text_size > DEFAULT_MAX_TEXT_SIZE or self.max_edges > DEFAULT_MAX_EDGES
+
+    def mermaid_config(self) -> Dict[str, int]:
+        """Mermaid config keys for these limits (as for mmdc -c)."""
+        return {'maxTextSize': self.max_text_size, 'maxEdges': self.max_edges}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class DiagramPart:
+    """One subgraph of a split flowchart, as a standalone diagram."""
+    name: str
+    title: str
+    code: str
+    nodes: List[str] = field(default_factory=list)
+
+
+def _content_lines(mermaid_code: str) -> List[str]:
+    """Stripped, non-empty, non-comment lines; the first one is the header."""
+    return [
+        line.strip() for line in mermaid_code.splitlines()
+        if line.strip() and not COMMENT_PATTERN.match(line)
+    ]
+
+
+def _flowchart_hops(statement: str) -> List[List[str]]:
+    """
+    Split a flowchart statement into its node groups.
+
+    "A & B --> C -->|label| D" gives [['A', 'B'], ['C'], ['D']]: one edge
+    connects every node of a group with every node of the next group.
+    Statements that are not links give [].
+    """
+    text = QUOTED_PATTERN.sub('', statement)
+    text = EDGE_TEXT_PATTERN.sub(r'\2', text)
+    text = EDGE_LABEL_PATTERN.sub('', text)
+    text = LABEL_PATTERN.sub('', text)
+    text = CLASS_SHORTHAND_PATTERN.sub('', text)
+
+    groups = []
+    for segment in EDGE_SPLIT_PATTERN.split(text):
+        ids = [part.strip() for part in segment.split('&')]
+        ids = [node_id for node_id in ids if NODE_ID_PATTERN.match(node_id)]
+        if not ids:
+            break
+        groups.append(ids)
+    return groups if len(groups) > 1 else []
+
+
+def _flowchart_statements(line: str) -> List[str]:
+    """Split a line on ';' outside quotes and labels."""
+    if ';' not in line:
+        return [line]
+    statements, depth, quoted, start = [], 0, False, 0
+    for i, char in enumerate(line):
+        if char == '"':
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif char in '[({':
+            depth += 1
+        elif char in '])}' and depth:
+            depth -= 1
+        elif char == ';' and not depth:
+            statements.append(line[start:i].strip())
+            start = i + 1
+    statements.append(line[start:].strip())
+    return [statement for statement in statements if statement]
+
+
+def _subgraph_id(spec: str) -> Tuple[str, str]:
+    """Return (id, title) for the text after "subgraph"."""
+    match = SUBGRAPH_ID_PATTERN.match(spec)
+    if match:
+        title = match.group(2)[1:-1].strip().strip('"') if match.group(2) else match.group(1)
+        return match.group(1), title
+    title = spec.strip('"')
+    return re.sub(r'\W+', '_', title).strip('_') or 'subgraph', title
+
+
+def estimate_complexity(mermaid_code: str, diagram_type: str) -> DiagramComplexity:
+    """
+    Count nodes and edges in Mermaid source without rendering it.
+
+    Flowchart, sequence, class, state and ER diagrams are parsed for their
+    nodes (participants, classes, states, entities) and edges (links,
+    messages, relations); other types count one node per statement.
+
+    Args:
+        mermaid_code: Mermaid diagram code
+        diagram_type: DiagramType value from detect_diagram_type()
+
+    Returns:
+        DiagramComplexity
+    """
+    lines = _content_lines(mermaid_code)
+    body = lines[1:]
+    nodes: Set[str] = set()
+    edges = 0
+    subgraphs = 0
+
+    if diagram_type == 'flowchart':
+        for line in body:
+            for statement in _flowchart_statements(line):
+                if SUBGRAPH_PATTERN.match(statement):
+                    subgraphs += 1
+                    continue
+                if END_PATTERN.match(statement) or FLOWCHART_SKIP_PATTERN.match(statement):
+                    continue
+                groups = _flowchart_hops(statement)
+                if not groups:
+                    node_id = _flowchart_node(statement)
+                    if node_id:
+                        nodes.add(node_id)
+                    continue
+                for group in groups:
+                    nodes.update(group)
+                for left, right in zip(groups, groups[1:]):
+                    edges += len(left) * len(right)
+
+    elif diagram_type == 'sequence':
+        for line in body:
+            match = SEQUENCE_MESSAGE_PATTERN.match(line)
+            if match:
+                nodes.update((match.group(1).strip(), match.group(2).strip()))
+                edges += 1
+                continue
+            match = SEQUENCE_DECLARATION_PATTERN.match(line)
+            if match:
+                nodes.add(match.group(1))
+
+    elif diagram_type in RELATION_PATTERNS:
+        pattern = RELATION_PATTERNS[diagram_type]
+        for line in body:
+            match = pattern.match(line)
+            if match:
+                nodes.update((match.group(1), match.group(2)))
+                edges += 1
+                continue
+            match = CLASS_DECLARATION_PATTERN.match(line) if diagram_type == 'class' else None
+            if match:
+                nodes.add(match.group(1))
+            elif diagram_type == 'state' and line.startswith('state ') and line.endswith('{'):
+                subgraphs += 1
+
+    else:
+        nodes.update(str(i) for i, line in enumerate(body) if not END_PATTERN.match(line))
+
+    return DiagramComplexity(
+        diagram_type=diagram_type,
+        nodes=len(nodes),
+        edges=edges,
+        subgraphs=subgraphs,
+        text_size=len(mermaid_code),
+        lines=len(lines)
+    )
+
+
+def _flowchart_node(statement: str) -> Optional[str]:
+    """Return the node ID a standalone node definition declares."""
+    text = CLASS_SHORTHAND_PATTERN.sub('', LABEL_PATTERN.sub('', QUOTED_PATTERN.sub('', statement))).strip()
+    return text if NODE_ID_PATTERN.match(text) else None
+
+
+def _headroom(value: int, default: int) -> int:
+    """Limit that leaves 50% headroom above value, never below Mermaid's default."""
+    if value * 5 <= default * 4:
+        return default
+    return max(default, int(math.ceil(value * 1.5 / 1000.0)) * 1000)
+
+
+def render_limits(complexity: DiagramComplexity, base_timeout: float = 60) -> RenderLimits:
+    """
+    Size the render timeout and Mermaid limits for a diagram.
+
+    Diagrams up to TIMEOUT_ELEMENTS nodes plus edges keep base_timeout;
+    larger ones get proportionally more, capped at MAX_TIMEOUT_FACTOR times
+    the base. maxTextSize and maxEdges are raised with 50% headroom once a
+    diagram comes within 80% of Mermaid's defaults.
+
+    Args:
+        complexity: Result of estimate_complexity()
+        base_timeout: Seconds allowed for an ordinary diagram
+
+    Returns:
+        RenderLimits
+    """
+    factor = min(MAX_TIMEOUT_FACTOR, max(1.0, complexity.elements / TIMEOUT_ELEMENTS))
+    return RenderLimits(
+        timeout=round(base_timeout * factor, 1),
+        max_text_size=_headroom(complexity.text_size, DEFAULT_MAX_TEXT_SIZE),
+        max_edges=_headroom(complexity.edges, DEFAULT_MAX_EDGES)
+    )
+
+
+def limits_config_file(limits: RenderLimits) -> Optional[Path]:
+    """
+    Return a Mermaid config file carrying raised limits (for mmdc -c).
+
+    Files live beside the render cache and are named after their limits, so
+    they are written once and the render cache keys stay stable.
+
+    Returns:
+        Path to the config file, or None if the limits are Mermaid's defaults
+        or the file could not be written
+    """
+    if not limits.raised:
+        return None
+    config_path = default_cache_dir().parent / f"limits-{limits.max_text_size}-{limits.max_edges}.json"
+    if config_path.exists():
+        return config_path
+    try:
+        config_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=config_path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(limits.mermaid_config(), f)
+        os.replace(tmp_name, config_path)
+    except OSError:
+        return None
+    return config_path
+
+
+def split_flowchart(mermaid_code: str) -> Optional[Tuple[str, List[DiagramPart]]]:
+    """
+    Split a flowchart into one diagram per top-level subgraph plus an index.
+
+    Each part keeps its subgraph block, the top-level links between its own
+    nodes, the class definitions and the styles of its nodes. Links between
+    subgraphs (and top-level nodes) go to the index diagram, where every
+    subgraph is collapsed to a single node.
+
+    Args:
+        mermaid_code: Flowchart source
+
+    Returns:
+        (index code, parts), or None if there are fewer than two top-level
+        subgraphs to split on
+    """
+    lines = _content_lines(mermaid_code)
+    if not lines:
+        return None
+    directives = [line for line in mermaid_code.splitlines() if line.strip().startswith('%%{')]
+    header = lines[0]
+
+    blocks: List[Tuple[str, str, List[str]]] = []
+    shared: List[str] = []     # classDef lines, copied into every diagram
+    top_level: List[str] = []  # statements outside any subgraph
+    owner: Dict[str, str] = {}
+    depth = 0
+    for line in lines[1:]:
+        for statement in _flowchart_statements(line):
+            match = SUBGRAPH_PATTERN.match(statement)
+            if depth == 0 and match:
+                sg_id, title = _subgraph_id(match.group(1))
+                blocks.append((sg_id, title, [statement]))
+                owner.setdefault(sg_id, sg_id)
+                depth = 1
+                continue
+            if depth:
+                blocks[-1][2].append(statement)
+                if match:
+                    depth += 1
+                elif END_PATTERN.match(statement):
+                    depth -= 1
+                elif not FLOWCHART_SKIP_PATTERN.match(statement):
+                    sg_id = blocks[-1][0]
+                    groups = _flowchart_hops(statement)
+                    node_ids = [n for group in groups for n in group] or [_flowchart_node(statement)]
+                    for node_id in filter(None, node_ids):
+                        owner.setdefault(node_id, sg_id)
+                continue
+            if statement.startswith('classDef'):
+                shared.append(statement)
+            elif not END_PATTERN.match(statement):
+                top_level.append(statement)
+
+    if len(blocks) < 2:
+        return None
+
+    part_lines: Dict[str, List[str]] = {sg_id: list(block) for sg_id, _, block in blocks}
+    index_lines: List[str] = []
+    index_links: List[Tuple[str, str]] = []
+    explicit_links: Set[Tuple[str, str]] = set()  # Pairs already linked in index_lines
+
+    for statement in top_level:
+        if FLOWCHART_SKIP_PATTERN.match(statement):
+            if statement.startswith('linkStyle'):
+                continue  # Link indexes change when links move between diagrams
+            # style/class/click name their nodes in the second token; a class
+            # statement spanning subgraphs is split per diagram
+            tokens = statement.split()
+            targets_by_owner: Dict[Optional[str], List[str]] = {}
+            for target in (tokens[1].split(',') if len(tokens) > 1 else []):
+                targets_by_owner.setdefault(owner.get(target), []).append(target)
+            for target_owner, targets in targets_by_owner.items():
+                line = ' '.join([tokens[0], ','.join(targets)] + tokens[2:])
+                (part_lines[target_owner] if target_owner in part_lines else index_lines).append(line)
+            continue
+
+        groups = _flowchart_hops(statement)
+        if not groups:
+            node_id = _flowchart_node(statement)
+            if node_id in owner and owner[node_id] != node_id:
+                part_lines[owner[node_id]].append(statement)
+            else:
+                index_lines.append(statement)
+            continue
+
+        statement_nodes = [n for group in groups for n in group]
+        statement_owners = {owner.get(n, n) for n in statement_nodes}
+        if len(statement_owners) == 1 and statement_owners <= set(part_lines):
+            part_lines[statement_owners.pop()].append(statement)
+            continue
+        if all(owner.get(n, n) == n for n in statement_nodes):
+            # Only top-level nodes and whole subgraphs: keep labels and arrows
+            index_lines.append(statement)
+            explicit_links.update(
+                (a, b) for left, right in zip(groups, groups[1:]) for a in left for b in right
+            )
+            continue
+
+        for left, right in zip(groups, groups[1:]):
+            for a in left:
+                for b in right:
+                    a_owner, b_owner = owner.get(a, a), owner.get(b, b)
+                    if a_owner == b_owner and a_owner in part_lines:
+                        part_lines[a_owner].append(f"{a} --> {b}")
+                    elif a_owner != b_owner and (a_owner, b_owner) not in index_links:
+                        index_links.append((a_owner, b_owner))
+
+    prefix = directives + [header] + ['    ' + line for line in shared]
+    parts = []
+    for sg_id, title, _ in blocks:
+        part_nodes = sorted(node for node, node_owner in owner.items() if node_owner == sg_id and node != sg_id)
+        body = ['    ' + line for line in part_lines[sg_id]]
+        parts.append(DiagramPart(
+            name=re.sub(r'\W+', '_', sg_id).strip('_').lower() or 'subgraph',
+            title=title,
+            code='\n'.join(prefix + body) + '\n',
+            nodes=part_nodes
+        ))
+
+    index = list(prefix)
+    for part, (sg_id, title, _) in zip(parts, blocks):
+        label = f"{title} ({len(part.nodes)} nodes)".replace('"', "'")
+        index.append(f'    {sg_id}["{label}"]')
+    index.extend('    ' + line for line in index_lines)
+    # Collapsed node links repeating an explicit subgraph link are dropped
+    index.extend(f"    {a} --> {b}" for a, b in index_links if (a, b) not in explicit_links)
+    return '\n'.join(index) + '\n', parts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Estimate Mermaid diagram complexity before rendering')
+    parser.add_argument('input', help='.mmd file, or - for stdin')
+    parser.add_argument('--timeout', type=float, default=60,
+                        help='Base render timeout in seconds to scale (default: 60)')
+    parser.add_argument('--split', type=Path, metavar='DIR',
+                        help='Write the subgraph partials and index of a flowchart to DIR')
+    parser.add_argument('--json', '-j', action='store_true', help='Output as JSON')
+    args = parser.parse_args()
+
+    if args.input == '-':
+        mermaid_code = sys.stdin.read()
+    else:
+        try:
+            mermaid_code = Path(args.input).read_text(encoding='utf-8')
+        except OSError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    from resilient_diagram import detect_diagram_type
+    diagram_type = detect_diagram_type(mermaid_code).value
+
+    complexity = estimate_complexity(mermaid_code, diagram_type)
+    limits = render_limits(complexity, args.timeout)
+
+    written = []
+    if args.split:
+        split = split_flowchart(mermaid_code) if diagram_type == 'flowchart' else None
+        if split is None:
+            print("ERROR: Only flowcharts with two or more top-level subgraphs can be split", file=sys.stderr)
+            sys.exit(1)
+        index_code, parts = split
+        args.split.mkdir(parents=True, exist_ok=True)
+        for num, part in enumerate(parts, 1):
+            path = args.split / f"part{num:02d}_{part.name}.mmd"
+            path.write_text(part.code, encoding='utf-8')
+            written.append(path)
+        index_path = args.split / 'index.mmd'
+        index_path.write_text(index_code, encoding='utf-8')
+        written.append(index_path)
+
+    if args.json:
+        print(json.dumps({
+            'complexity': complexity.to_dict(),
+            'oversized': complexity.oversized,
+            'limits': limits.to_dict(),
+            'files': [str(path) for path in written]
+        }, indent=2))
+        return
+
+    print(f"Type:       {complexity.diagram_type}")
+    print(f"Nodes:      {complexity.nodes}")
+    print(f"Edges:      {complexity.edges}")
+    print(f"Subgraphs:  {complexity.subgraphs}")
+    print(f"Text size:  {complexity.text_size}")
+    print(f"Timeout:    {limits.timeout:g}s")
+    print(f"Limits:     maxTextSize={limits.max_text_size} maxEdges={limits.max_edges}")
+    if complexity.oversized:
+        print("⚠️  Oversized: rendered per subgraph when possible")
+    for path in written:
+        print(f"✅ {path}")
+
+
+if __name__ == '__main__':
+    main()
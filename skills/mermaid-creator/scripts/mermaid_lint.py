@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Fast structural lint for Mermaid diagrams.
+
+Catches the common failures documented in references/guides/troubleshooting.md
+in pure Python, without spawning mmdc:
+- Unknown diagram header
+- Diagram direction on the same line as nodes
+- Unbalanced quotes and brackets in flowchart lines
+- Reserved words (e.g. "end") used as node IDs
+- Wrong flowchart arrows and sequence messages without a colon
+- Blocks (subgraph, alt, loop, ...) missing their closing "end"
+
+Each issue references the troubleshooting entry it comes from. Issues are
+either errors (the diagram will certainly fail to render) or warnings
+(likely problems that still need a definitive check with mmdc).
+
+Usage:
+    # Lint a .mmd file
+    python mermaid_lint.py diagram.mmd
+
+    # Lint from stdin with JSON output
+    cat diagram.mmd | python mermaid_lint.py - --json
+
+Requirements:
+    - Python 3.7+ (stdlib only, no external dependencies)
+"""
+
+import argparse
+import json
+import re
+import sys
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from resilient_diagram import DiagramType, ResilientDiagramGenerator, TroubleshootingMatch
+
+
+# Valid Mermaid headers that DiagramType does not distinguish; diagrams using
+# them are not linted further.
+OTHER_HEADER_PATTERN = re.compile(
+    r'^(?:graph|flowchart|gitGraph|zenuml|kanban|C4Dynamic|'
+    r'(?:sankey|xychart|block|packet|architecture|radar|treemap)(?:-beta)?)\b'
+)
+
+DIRECTION_ON_HEADER_PATTERN = re.compile(r'^(?:flowchart|graph)\s+(?:TB|TD|BT|RL|LR)\s+[^;\s]')
+
+# Flowchart statements that are not node/edge definitions (a keyword followed
+# by an arrow or '&' is a reserved word misused as a node ID)
+FLOWCHART_STATEMENT_PATTERN = re.compile(
+    r'^(?:classDef|class|style|linkStyle|click|direction|subgraph|end)\b(?!\s*[-=.&])'
+)
+
+QUOTED_PATTERN = re.compile(r'"[^"]*"')
+UNQUOTED_LABEL_QUOTE_PATTERN = re.compile(r'[\[({][^"\[\](){}][^\[\](){}]*"')
+EDGE_LABEL_PATTERN = re.compile(r'\|[^|]*\|')
+EDGE_SPLIT_PATTERN = re.compile(r'\s*(?:[<ox]?(?:-{2,}|={2,}|-\.+-)[>ox]?|(?<![-.=])->)\s*')
+NODE_ID_PATTERN = re.compile(r'^\s*([A-Za-z_][\w-]*)')
+SHORT_ARROW_PATTERN = re.compile(r'(?<![-.=<])->(?!>)')
+SINGLE_DASH_PATTERN = re.compile(r'\w\s+-\s+\w')
+
+SEQUENCE_BLOCK_PATTERN = re.compile(r'^(?:alt|opt|loop|par|rect|break|critical|box)\b')
+SEQUENCE_MESSAGE_PATTERN = re.compile(
+    r'^([^:]+?)\s*(-->>|->>|--x|-x|--\)|-\)|-->|->)\s*[+-]?([^:]+)$'
+)
+SEQUENCE_DECLARATION_PATTERN = re.compile(r'^(participant|actor)(?=[A-Za-z0-9_])')
+
+END_PATTERN = re.compile(r'^end\s*;?$')
+
+BRACKET_PAIRS = {'[': ']', '(': ')', '{': '}'}
+CLOSING_BRACKETS = {v: k for k, v in BRACKET_PAIRS.items()}
+
+# Troubleshooting entry titles each rule refers to
+RULE_TITLES = {
+    'reserved-word': 'Reserved Words as Identifiers',
+    'special-characters': 'Unescaped Special Characters',
+    'end-node': 'Reserved Word "end"',
+    'arrow-syntax': 'Arrow/Link Syntax',
+    'bracket-syntax': 'Node Bracket Syntax',
+    'direction-line': 'Direction on Same Line',
+    'missing-colon': 'Missing Colon',
+    'participant-space': 'Missing Space in Participant',
+    'missing-end': 'Missing "end"',
+}
+
+DEFAULT_RESERVED_WORDS = ['default', 'style', 'class', 'end', 'subgraph', 'click', 'call', 'graph']
+
+
+@dataclass
+class LintIssue:
+    """A single lint finding."""
+    rule: str
+    level: str
+    line: int
+    message: str
+    error_number: Optional[int] = None
+    title: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    def __str__(self) -> str:
+        text = f"line {self.line}: {self.message}"
+        if self.error_number:
+            text += f" (troubleshooting Error {self.error_number}: {self.title})"
+        return text
+
+
+class MermaidLinter:
+    """Structural Mermaid lint driven by the troubleshooting guide."""
+
+    def __init__(self, generator: Optional[ResilientDiagramGenerator] = None):
+        """
+        Initialize linter.
+
+        Args:
+            generator: Generator providing diagram type detection and the
+                parsed troubleshooting guide (created if not provided)
+        """
+        self.generator = generator or ResilientDiagramGenerator()
+        troubleshooting = self.generator.troubleshooting
+        self.reserved_words = set(
+            (troubleshooting.reserved_words if troubleshooting else None) or DEFAULT_RESERVED_WORDS
+        )
+        self._entries: Dict[str, TroubleshootingMatch] = {}
+        if troubleshooting:
+            for rule, title in RULE_TITLES.items():
+                for entry in troubleshooting.entries:
+                    if title.lower() in entry.title.lower():
+                        self._entries[rule] = entry
+                        break
+
+    def lint(self, mermaid_code: str) -> List[LintIssue]:
+        """
+        Lint Mermaid code.
+
+        Args:
+            mermaid_code: Raw Mermaid diagram code
+
+        Returns:
+            Issues ordered by line; empty if nothing was found
+        """
+        lines = mermaid_code.split('\n')
+        body_start = self._skip_front_matter(lines)
+
+        header_index = None
+        for i in range(body_start, len(lines)):
+            stripped = lines[i].strip()
+            if stripped and not stripped.startswith('%%'):
+                header_index = i
+                break
+
+        if header_index is None:
+            return [LintIssue('empty', 'error', 1, "Diagram has no content")]
+
+        issues: List[LintIssue] = []
+        header = lines[header_index].strip()
+        # Compare by value: the generator may come from resilient_diagram run as __main__
+        diagram_type = DiagramType(self.generator.detect_diagram_type(header).value)
+
+        if diagram_type == DiagramType.UNKNOWN:
+            if not OTHER_HEADER_PATTERN.match(header):
+                first_word = header.split()[0] if header.split() else header
+                issues.append(LintIssue(
+                    'unknown-header', 'error', header_index + 1,
+                    f"Unknown diagram type '{first_word}'"
+                ))
+            return issues
+
+        body = [(i + 1, lines[i].strip()) for i in range(header_index + 1, len(lines))]
+        body = [(n, text) for n, text in body if text and not text.startswith('%%')]
+
+        if diagram_type == DiagramType.FLOWCHART:
+            if DIRECTION_ON_HEADER_PATTERN.match(header):
+                issues.append(self._issue(
+                    'direction-line', 'error', header_index + 1,
+                    "Diagram direction must be on its own line"
+                ))
+            issues.extend(self._lint_flowchart(body))
+        elif diagram_type == DiagramType.SEQUENCE:
+            issues.extend(self._lint_sequence(body))
+
+        return sorted(issues, key=lambda issue: issue.line)
+
+    def has_errors(self, issues: List[LintIssue]) -> bool:
+        """True if any issue is certain to make the render fail."""
+        return any(issue.level == 'error' for issue in issues)
+
+    def _lint_flowchart(self, body) -> List[LintIssue]:
+        issues = []
+        open_blocks = 0
+        last_block_line = 0
+
+        for line_number, text in body:
+            if text.startswith('subgraph'):
+                open_blocks += 1
+                last_block_line = line_number
+                continue
+            if END_PATTERN.match(text):
+                open_blocks -= 1
+                continue
+            if FLOWCHART_STATEMENT_PATTERN.match(text):
+                continue
+
+            if text.count('"') % 2:
+                issues.append(self._issue(
+                    'special-characters', 'error', line_number,
+                    "Unbalanced double quote; wrap labels in quotes or use #quot;"
+                ))
+                continue
+
+            if UNQUOTED_LABEL_QUOTE_PATTERN.search(text):
+                issues.append(self._issue(
+                    'special-characters', 'warning', line_number,
+                    "Double quote inside an unquoted label; use #quot; or quote the whole label"
+                ))
+
+            skeleton, bracket_issue = self._strip_brackets(
+                EDGE_LABEL_PATTERN.sub('', QUOTED_PATTERN.sub('""', text))
+            )
+            if bracket_issue:
+                level, message = bracket_issue
+                issues.append(self._issue('bracket-syntax', level, line_number, message))
+                continue
+
+            if SHORT_ARROW_PATTERN.search(skeleton):
+                issues.append(self._issue(
+                    'arrow-syntax', 'warning', line_number,
+                    "'->' is not a flowchart arrow; use '-->'"
+                ))
+            elif SINGLE_DASH_PATTERN.search(skeleton):
+                issues.append(self._issue(
+                    'arrow-syntax', 'warning', line_number,
+                    "Single dash between nodes; use '-->' or '---'"
+                ))
+
+            segments = EDGE_SPLIT_PATTERN.split(skeleton)
+            if len(segments) < 2:
+                continue
+            for segment in segments:
+                for node in segment.split('&'):
+                    match = NODE_ID_PATTERN.match(node)
+                    if not match:
+                        continue
+                    node_id = match.group(1)
+                    if node_id == 'end':
+                        issues.append(self._issue(
+                            'end-node', 'error', line_number,
+                            "'end' is reserved and cannot be a node ID; use 'End' or quote it"
+                        ))
+                    elif node_id in self.reserved_words:
+                        issues.append(self._issue(
+                            'reserved-word', 'warning', line_number,
+                            f"Reserved word '{node_id}' used as a node ID; wrap it in quotes"
+                        ))
+
+        if open_blocks > 0:
+            issues.append(self._issue(
+                'missing-end', 'error', last_block_line,
+                f"{open_blocks} subgraph block(s) missing closing 'end'"
+            ))
+        return issues
+
+    def _lint_sequence(self, body) -> List[LintIssue]:
+        issues = []
+        open_blocks = 0
+        last_block_line = 0
+
+        for line_number, text in body:
+            if SEQUENCE_BLOCK_PATTERN.match(text):
+                open_blocks += 1
+                last_block_line = line_number
+                continue
+            if END_PATTERN.match(text):
+                open_blocks -= 1
+                continue
+
+            if SEQUENCE_DECLARATION_PATTERN.match(text):
+                issues.append(self._issue(
+                    'participant-space', 'error', line_number,
+                    "Missing space after participant/actor keyword"
+                ))
+                continue
+
+            match = SEQUENCE_MESSAGE_PATTERN.match(text)
+            if match and len(match.group(3).split()) > 1:
+                issues.append(self._issue(
+                    'missing-colon', 'error', line_number,
+                    "Message text must follow a colon (A->>B: text)"
+                ))
+
+        if open_blocks > 0:
+            issues.append(self._issue(
+                'missing-end', 'error', last_block_line,
+                f"{open_blocks} alt/opt/loop/par block(s) missing closing 'end'"
+            ))
+        return issues
+
+    @staticmethod
+    def _strip_brackets(text: str):
+        """
+        Check bracket balance and drop bracketed label text.
+
+        Returns:
+            Tuple of (text outside brackets, (level, message) or None)
+        """
+        stack: List[str] = []
+        skeleton = []
+        previous = ''
+        for char in text:
+            if char == '>' and not stack and (previous.isalnum() or previous == '_'):
+                # Asymmetric node shape: id>label]
+                stack.append('>')
+            elif char in BRACKET_PAIRS:
+                if not stack:
+                    skeleton.append(char)
+                elif previous not in BRACKET_PAIRS:
+                    # Shapes nest openers directly ([[ ]], [( )], (( )));
+                    # a bracket later in an unquoted label is a syntax error
+                    return ''.join(skeleton), ('warning', f"Unquoted '{char}' inside node label; wrap the label in quotes")
+                stack.append(char)
+            elif char in CLOSING_BRACKETS:
+                if not stack:
+                    return ''.join(skeleton), ('error', f"Unexpected '{char}' without matching opening bracket")
+                opener = stack.pop()
+                expected = ']' if opener == '>' else BRACKET_PAIRS[opener]
+                if char != expected:
+                    return ''.join(skeleton), ('error', f"Mismatched brackets: '{opener}' closed by '{char}'")
+                if not stack:
+                    skeleton.append(char)
+            elif not stack:
+                skeleton.append(char)
+            previous = char
+
+        if stack:
+            return ''.join(skeleton), ('error', f"Unclosed '{stack[-1]}' bracket")
+        return ''.join(skeleton), None
+
+    @staticmethod
+    def _skip_front_matter(lines: List[str]) -> int:
+        """Return the index of the first line after YAML front matter."""
+        first = next((i for i, line in enumerate(lines) if line.strip()), None)
+        if first is None or lines[first].strip() != '---':
+            return 0
+        for i in range(first + 1, len(lines)):
+            if lines[i].strip() == '---':
+                return i + 1
+        return 0
+
+    def _issue(self, rule: str, level: str, line: int, message: str) -> LintIssue:
+        entry = self._entries.get(rule)
+        return LintIssue(
+            rule=rule,
+            level=level,
+            line=line,
+            message=message,
+            error_number=entry.error_number if entry else None,
+            title=entry.title if entry else None
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Fast structural lint for Mermaid diagrams (no mmdc required)',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Lint a diagram file
+  python mermaid_lint.py diagram.mmd
+
+  # Lint from stdin with JSON output
+  cat diagram.mmd | python mermaid_lint.py - --json
+
+Exit code is 1 if any error-level issue is found.
+        """
+    )
+    parser.add_argument('input', type=str, help='Input .mmd file or "-" for stdin')
+    parser.add_argument('--json', '-j', action='store_true', help='Output issues as JSON')
+    parser.add_argument('--troubleshooting', type=Path,
+                        help='Path to troubleshooting.md (auto-detected if not specified)')
+
+    args = parser.parse_args()
+
+    if args.input == '-':
+        mermaid_code = sys.stdin.read()
+    else:
+        input_path = Path(args.input)
+        if not input_path.is_file():
+            print(f"ERROR: File not found: {input_path}", file=sys.stderr)
+            sys.exit(1)
+        mermaid_code = input_path.read_text(encoding='utf-8')
+
+    linter = MermaidLinter(ResilientDiagramGenerator(troubleshooting_path=args.troubleshooting))
+    issues = linter.lint(mermaid_code)
+
+    if args.json:
+        print(json.dumps([issue.to_dict() for issue in issues], indent=2))
+    elif not issues:
+        print("✅ No issues found")
+    else:
+        for issue in issues:
+            marker = "❌" if issue.level == 'error' else "⚠️"
+            print(f"{marker} {issue}")
+
+    sys.exit(1 if linter.has_errors(issues) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Content-addressed on-disk cache for rendered Mermaid diagrams.
+
+Rendered bytes are stored under a key derived from the normalized diagram
+source plus every option that affects the output (theme, background, size,
+scale, format and config-file contents). Re-rendering an unchanged diagram
+becomes a file copy instead of a browser launch.
+
+The cache is size-bounded: when it grows past max_bytes the least recently
+used entries are evicted (recency is tracked with file mtimes, which are
+bumped on every hit).
+
+Usage:
+    from mermaid_render_cache import RenderCache
+
+    cache = RenderCache()
+    key = cache.make_key(code, output_format='png', theme='default')
+    data = cache.get(key)
+    if data is None:
+        data = render(code)
+        cache.put(key, data)
+
+Environment:
+    MERMAID_CACHE_DIR  Default cache directory (otherwise the user cache dir)
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def default_cache_dir() -> Path:
+    """Return the default cache directory for rendered diagrams."""
+    if os.environ.get('MERMAID_CACHE_DIR'):
+        return Path(os.environ['MERMAID_CACHE_DIR'])
+    base = os.environ.get('XDG_CACHE_HOME') or os.environ.get('LOCALAPPDATA')
+    base_path = Path(base) if base else Path.home() / '.cache'
+    return base_path / 'mermaid-creator' / 'renders'
+
+
+def normalize_source(mermaid_code: str) -> str:
+    """Normalize diagram source so whitespace-only edits share a cache entry."""
+    lines = mermaid_code.strip().replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines)
+
+
+class RenderCache:
+    """Size-bounded LRU cache of rendered diagram bytes, keyed by content hash."""
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initialize render cache.
+
+        Args:
+            cache_dir: Cache directory (default: default_cache_dir())
+            max_bytes: Evict least recently used entries above this size
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Separate from _lock so lookups never wait on an eviction scan;
+        # batch renders call get() from worker threads
+        self._stats_lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+
+    @staticmethod
+    def make_key(
+        mermaid_code: str,
+        output_format: str = 'png',
+        theme: str = 'default',
+        background: str = 'transparent',
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        scale: int = 1,
+        config_file: Optional[Path] = None
+    ) -> str:
+        """
+        Build the cache key for a diagram and its render options.
+
+        Args:
+            mermaid_code: Mermaid diagram syntax
+            output_format: png, svg, or pdf
+            theme: Mermaid theme
+            background: Background color
+            width: Output width in pixels
+            height: Output height in pixels
+            scale: Scale factor
+            config_file: Mermaid config file (its contents are hashed)
+
+        Returns:
+            Hex digest identifying the rendered output
+        """
+        config_bytes = b''
+        if config_file and Path(config_file).exists():
+            config_bytes = Path(config_file).read_bytes()
+
+        options = json.dumps({
+            'format': output_format,
+            'theme': theme,
+            'background': background,
+            'width': width,
+            'height': height,
+            'scale': scale,
+            'config': hashlib.sha256(config_bytes).hexdigest(),
+        }, sort_keys=True)
+
+        digest = hashlib.sha256()
+        digest.update(normalize_source(mermaid_code).encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(options.encode('utf-8'))
+        return f"{digest.hexdigest()}.{output_format}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Return cached bytes for key, or None on a miss.
+
+        A hit refreshes the entry's position in the LRU order.
+        """
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            with self._stats_lock:
+                self.misses += 1
+            return None
+        with self._stats_lock:
+            self.hits += 1
+        return data
+
+    def get_to_file(self, key: str, output_path: Path) -> bool:
+        """Copy a cached entry to output_path. Returns True on a hit."""
+        data = self.get(key)
+        if not data:
+            return False
+        output_path.write_bytes(data)
+        return True
+
+    def put(self, key: str, data: bytes):
+        """Store rendered bytes under key, evicting old entries if needed."""
+        if not data:
+            return
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            previous = path.stat().st_size if path.exists() else 0
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_name, path)
+        except OSError:
+            return
+
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += len(data) - previous
+        self._evict_if_needed()
+
+    def put_file(self, key: str, output_path: Path):
+        """Store the contents of a rendered file under key."""
+        try:
+            self.put(key, output_path.read_bytes())
+        except OSError:
+            pass
+
+    def stats(self) -> Tuple[int, int]:
+        """Return (hits, misses) for this cache instance."""
+        with self._stats_lock:
+            return self.hits, self.misses
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key
+
+    def _entries(self):
+        if not self.cache_dir.exists():
+            return []
+        entries = []
+        for path in self.cache_dir.glob('*/*'):
+            if path.suffix == '.tmp':
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict_if_needed(self):
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._entries())
+            if self._total_bytes <= self.max_bytes:
+                return
+
+            # Oldest first; evict down to 90% to avoid evicting on every put
+            target = int(self.max_bytes * 0.9)
+            for _, size, path in sorted(self._entries(), key=lambda e: e[0]):
+                if self._total_bytes <= target:
+                    break
+                try:
+                    path.unlink()
+                    self._total_bytes -= size
+                except OSError:
+                    pass
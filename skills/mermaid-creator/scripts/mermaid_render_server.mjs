@@ -0,0 +1,181 @@
+#!/usr/bin/env node
+/**
+ * Persistent Mermaid render backend.
+ *
+ * Launches one headless Chromium through the puppeteer instance bundled with
+ * mermaid-cli and keeps it warm. Requests arrive as JSON lines on stdin and
+ * rendered bytes are returned as base64 JSON lines on stdout, so the Python
+ * scripts can render hundreds of diagrams without cold-starting Node and a
+ * browser for each one.
+ *
+ * Protocol (one JSON object per line):
+ *   -> {"id": 1, "code": "flowchart TD; A-->B", "format": "png",
+ *       "theme": "default", "background": "transparent",
+ *       "width": 800, "height": 600, "scale": 1, "config": {}}
+ *   <- {"id": 1, "ok": true, "data": "<base64>"}
+ *   <- {"id": 1, "ok": false, "error": "Parse error on line 1: ..."}
+ *
+ * Several formats from one render: send "formats" instead of "format". The
+ * diagram is laid out once as SVG and PNG/PDF are exported from that SVG in
+ * a single page, instead of re-running Mermaid for every format:
+ *   -> {"id": 2, "code": "...", "formats": ["png", "svg"], ...}
+ *   <- {"id": 2, "ok": true, "data": {"png": "<base64>", "svg": "<base64>"}}
+ *
+ * A single {"ready": true} line is written once the browser is up.
+ *
+ * Environment:
+ *   MERMAID_CLI_DIR       Directory of the @mermaid-js/mermaid-cli package (required)
+ *   MERMAID_SERVER_PAGES  Maximum concurrent pages (default: 4)
+ */
+
+import { createInterface } from 'node:readline';
+import { createRequire } from 'node:module';
+import { pathToFileURL } from 'node:url';
+import path from 'node:path';
+
+const cliDir = process.env.MERMAID_CLI_DIR;
+const maxPages = Math.max(1, parseInt(process.env.MERMAID_SERVER_PAGES || '4', 10) || 4);
+
+function reply(message) {
+  process.stdout.write(JSON.stringify(message) + '\n');
+}
+
+async function loadModules() {
+  if (!cliDir) {
+    throw new Error('MERMAID_CLI_DIR is not set');
+  }
+  const { renderMermaid } = await import(pathToFileURL(path.join(cliDir, 'src', 'index.js')).href);
+  const requireFromCli = createRequire(path.join(cliDir, 'package.json'));
+  const puppeteerModule = requireFromCli('puppeteer');
+  const puppeteer = puppeteerModule.default || puppeteerModule;
+  return { renderMermaid, puppeteer };
+}
+
+async function main() {
+  let modules;
+  let browser;
+  try {
+    modules = await loadModules();
+    browser = await modules.puppeteer.launch({ headless: true });
+  } catch (err) {
+    reply({ ready: false, error: String(err && err.message ? err.message : err) });
+    process.exit(1);
+  }
+
+  let active = 0;
+  const waiting = [];
+
+  // Export PNG/PDF from an already rendered SVG without running Mermaid again
+  async function exportFromSvg(svg, formats, viewport, background) {
+    const page = await browser.newPage();
+    try {
+      await page.setViewport(viewport);
+      await page.setContent(
+        '<!DOCTYPE html><html><head><style>' +
+        `html, body { margin: 0; padding: 0; background: ${background}; }` +
+        `</style></head><body>${svg}</body></html>`
+      );
+      const clip = await page.$eval('svg', (element) => {
+        const rect = element.getBoundingClientRect();
+        return {
+          x: Math.floor(rect.left),
+          y: Math.floor(rect.top),
+          width: Math.ceil(rect.width),
+          height: Math.ceil(rect.height),
+        };
+      });
+      const images = {};
+      for (const format of formats) {
+        if (format === 'png') {
+          images.png = await page.screenshot({ clip, omitBackground: background === 'transparent' });
+        } else if (format === 'pdf') {
+          images.pdf = await page.pdf({
+            width: `${clip.width}px`,
+            height: `${clip.height}px`,
+            printBackground: background !== 'transparent',
+            pageRanges: '1',
+          });
+        }
+      }
+      return images;
+    } finally {
+      await page.close();
+    }
+  }
+
+  async function handle(request) {
+    const viewport = {
+      width: request.width || 800,
+      height: request.height || 600,
+      deviceScaleFactor: request.scale || 1,
+    };
+    const background = request.background || 'transparent';
+    const options = {
+      viewport,
+      backgroundColor: background,
+      mermaidConfig: Object.assign({ theme: request.theme || 'default' }, request.config || {}),
+      pdfFit: true,
+    };
+    try {
+      if (Array.isArray(request.formats)) {
+        const { data: svg } = await modules.renderMermaid(browser, request.code, 'svg', options);
+        const others = request.formats.filter((format) => format !== 'svg');
+        const images = others.length
+          ? await exportFromSvg(Buffer.from(svg).toString('utf8'), others, viewport, background)
+          : {};
+        if (request.formats.includes('svg')) {
+          images.svg = svg;
+        }
+        const data = {};
+        for (const [format, bytes] of Object.entries(images)) {
+          data[format] = Buffer.from(bytes).toString('base64');
+        }
+        reply({ id: request.id, ok: true, data });
+        return;
+      }
+
+      const { data } = await modules.renderMermaid(browser, request.code, request.format || 'png', options);
+      reply({ id: request.id, ok: true, data: Buffer.from(data).toString('base64') });
+    } catch (err) {
+      reply({ id: request.id, ok: false, error: String(err && err.message ? err.message : err) });
+    }
+  }
+
+  function schedule(request) {
+    if (active >= maxPages) {
+      waiting.push(request);
+      return;
+    }
+    active += 1;
+    handle(request).finally(() => {
+      active -= 1;
+      const next = waiting.shift();
+      if (next) {
+        schedule(next);
+      }
+    });
+  }
+
+  const lines = createInterface({ input: process.stdin });
+  lines.on('line', (line) => {
+    if (!line.trim()) {
+      return;
+    }
+    let request;
+    try {
+      request = JSON.parse(line);
+    } catch (err) {
+      reply({ id: null, ok: false, error: `Invalid request: ${err.message}` });
+      return;
+    }
+    schedule(request);
+  });
+  lines.on('close', async () => {
+    await browser.close().catch(() => {});
+    process.exit(0);
+  });
+
+  reply({ ready: true });
+}
+
+main();
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Persistent Mermaid render backend.
+
+Starting mmdc cold-starts Node and a headless Chromium for every diagram,
+which costs several seconds per render. This module keeps a single Node
+process (mermaid_render_server.mjs) alive with a warm browser and sends it
+diagrams over a pipe, returning the rendered bytes.
+
+The backend is optional: callers use get_shared_server(), which returns None
+when Node or mermaid-cli cannot be located, and fall back to running mmdc.
+
+Usage:
+    from mermaid_render_server import get_shared_server
+
+    server = get_shared_server()
+    if server:
+        png_bytes = server.render("flowchart TD; A-->B", output_format="png")
+
+        # One render, several formats
+        images = server.render_formats("flowchart TD; A-->B", ["png", "svg"])
+
+Requirements:
+    - Node.js
+    - mermaid-cli: npm install -g @mermaid-js/mermaid-cli
+"""
+
+import atexit
+import base64
+import itertools
+import json
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+SERVER_SCRIPT = Path(__file__).with_name('mermaid_render_server.mjs')
+MERMAID_CLI_PACKAGE = '@mermaid-js/mermaid-cli'
+
+
+class RenderServerError(Exception):
+    """Raised when the render backend cannot produce a diagram."""
+
+
+class RenderServerUnavailable(RenderServerError):
+    """Raised when the backend process is not running or has died."""
+
+
+def find_mermaid_cli_dir() -> Optional[Path]:
+    """
+    Locate the installed @mermaid-js/mermaid-cli package directory.
+
+    Follows the mmdc executable back to its package (global npm installs
+    symlink mmdc into the package), falling back to `npm root -g`.
+
+    Returns:
+        Package directory, or None if it cannot be found
+    """
+    mmdc = shutil.which('mmdc')
+    if mmdc:
+        for parent in Path(os.path.realpath(mmdc)).parents:
+            if _is_mermaid_cli_dir(parent):
+                return parent
+        # Windows .cmd shims live next to node_modules
+        candidate = Path(mmdc).parent / 'node_modules' / '@mermaid-js' / 'mermaid-cli'
+        if _is_mermaid_cli_dir(candidate):
+            return candidate
+
+    npm = shutil.which('npm')
+    if npm:
+        try:
+            result = subprocess.run(
+                [npm, 'root', '-g'],
+                capture_output=True,
+                text=True,
+                timeout=10
+            )
+            candidate = Path(result.stdout.strip()) / '@mermaid-js' / 'mermaid-cli'
+            if result.returncode == 0 and _is_mermaid_cli_dir(candidate):
+                return candidate
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+
+    return None
+
+
+def _is_mermaid_cli_dir(path: Path) -> bool:
+    package_json = path / 'package.json'
+    if not package_json.is_file():
+        return False
+    try:
+        return json.loads(package_json.read_text(encoding='utf-8')).get('name') == MERMAID_CLI_PACKAGE
+    except (OSError, ValueError):
+        return False
+
+
+class RenderServer:
+    """Client for a long-lived Node process that renders Mermaid diagrams."""
+
+    def __init__(
+        self,
+        mermaid_cli_dir: Path,
+        node: str = 'node',
+        max_pages: int = 4,
+        startup_timeout: float = 30
+    ):
+        """
+        Initialize render server client (the process starts on start()).
+
+        Args:
+            mermaid_cli_dir: Directory of the installed mermaid-cli package
+            node: Node.js executable
+            max_pages: Maximum diagrams rendered concurrently by the browser
+            startup_timeout: Seconds to wait for the browser to launch
+        """
+        self.mermaid_cli_dir = mermaid_cli_dir
+        self.node = node
+        self.max_pages = max_pages
+        self.startup_timeout = startup_timeout
+        self._process: Optional[subprocess.Popen] = None
+        self._ready: 'queue.Queue[Dict[str, Any]]' = queue.Queue()
+        self._pending: Dict[int, 'queue.Queue[Dict[str, Any]]'] = {}
+        self._pending_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    @property
+    def running(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def start(self) -> bool:
+        """
+        Launch the backend and wait until the browser is ready.
+
+        Returns:
+            True if the backend is ready, False otherwise
+        """
+        if self.running:
+            return True
+
+        env = dict(os.environ)
+        env['MERMAID_CLI_DIR'] = str(self.mermaid_cli_dir)
+        env['MERMAID_SERVER_PAGES'] = str(self.max_pages)
+
+        try:
+            self._process = subprocess.Popen(
+                [self.node, str(SERVER_SCRIPT)],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                env=env,
+                text=True,
+                encoding='utf-8',
+                bufsize=1
+            )
+        except OSError:
+            self._process = None
+            return False
+
+        threading.Thread(target=self._read_responses, daemon=True).start()
+
+        try:
+            status = self._ready.get(timeout=self.startup_timeout)
+        except queue.Empty:
+            status = {'ready': False, 'error': 'startup timed out'}
+
+        if not status.get('ready'):
+            self.close()
+            return False
+        return True
+
+    def render(
+        self,
+        mermaid_code: str,
+        output_format: str = 'png',
+        theme: str = 'default',
+        background: str = 'transparent',
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        scale: int = 1,
+        config: Optional[Dict[str, Any]] = None,
+        timeout: float = 60
+    ) -> bytes:
+        """
+        Render Mermaid code and return the image bytes.
+
+        Args:
+            mermaid_code: Mermaid diagram syntax
+            output_format: png, svg, or pdf
+            theme: Mermaid theme
+            background: Background color
+            width: Viewport width in pixels
+            height: Viewport height in pixels
+            scale: Device scale factor
+            config: Parsed Mermaid config (contents of a -c config file)
+            timeout: Seconds to wait for the rendered diagram
+
+        Returns:
+            Rendered image bytes
+
+        Raises:
+            RenderServerUnavailable: If the backend is not running or died
+            RenderServerError: If the diagram failed to render
+        """
+        response = self._request({
+            'code': mermaid_code,
+            'format': output_format,
+            'theme': theme,
+            'background': background,
+            'width': width,
+            'height': height,
+            'scale': scale,
+            'config': config or {},
+        }, timeout)
+        return base64.b64decode(response.get('data', ''))
+
+    def render_formats(
+        self,
+        mermaid_code: str,
+        output_formats: List[str],
+        theme: str = 'default',
+        background: str = 'transparent',
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        scale: int = 1,
+        config: Optional[Dict[str, Any]] = None,
+        timeout: float = 60
+    ) -> Dict[str, bytes]:
+        """
+        Render Mermaid code once and export it in several formats.
+
+        The diagram is laid out a single time; PNG and PDF are produced from
+        the rendered SVG in the same browser page.
+
+        Args:
+            mermaid_code: Mermaid diagram syntax
+            output_formats: Formats to export (png, svg, pdf)
+            (other arguments as for render())
+
+        Returns:
+            Dict mapping each requested format to its image bytes
+
+        Raises:
+            RenderServerUnavailable: If the backend is not running or died
+            RenderServerError: If the diagram failed to render
+        """
+        response = self._request({
+            'code': mermaid_code,
+            'formats': list(output_formats),
+            'theme': theme,
+            'background': background,
+            'width': width,
+            'height': height,
+            'scale': scale,
+            'config': config or {},
+        }, timeout)
+
+        data = response.get('data')
+        if not isinstance(data, dict):
+            # A backend predating multi-format requests ignores "formats"
+            raise RenderServerUnavailable("Render server does not support multiple formats")
+        images = {fmt: base64.b64decode(data.get(fmt, '')) for fmt in output_formats}
+        missing = [fmt for fmt, image in images.items() if not image]
+        if missing:
+            raise RenderServerError(f"Render server produced no {', '.join(missing)} output")
+        return images
+
+    def _request(self, request: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """Send one request and wait for its successful response."""
+        if not self.running:
+            raise RenderServerUnavailable("Render server is not running")
+
+        request_id = next(self._ids)
+        request = dict(request, id=request_id)
+        response_queue: 'queue.Queue[Dict[str, Any]]' = queue.Queue(maxsize=1)
+
+        with self._pending_lock:
+            self._pending[request_id] = response_queue
+
+        try:
+            try:
+                with self._write_lock:
+                    self._process.stdin.write(json.dumps(request) + '\n')
+                    self._process.stdin.flush()
+            except (OSError, ValueError, AttributeError) as e:
+                raise RenderServerUnavailable(f"Render server pipe closed: {e}")
+
+            try:
+                response = response_queue.get(timeout=timeout)
+            except queue.Empty:
+                raise RenderServerError(f"Rendering timed out after {timeout:g} seconds")
+        finally:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+
+        if response.get('dead'):
+            raise RenderServerUnavailable("Render server exited unexpectedly")
+        if not response.get('ok'):
+            raise RenderServerError(response.get('error') or "Unknown rendering error")
+
+        return response
+
+    def close(self):
+        """Stop the backend process."""
+        process, self._process = self._process, None
+        if process is None:
+            return
+        try:
+            if process.stdin:
+                process.stdin.close()
+            process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+
+    def _read_responses(self):
+        """Dispatch response lines to waiting callers (runs on a daemon thread)."""
+        process = self._process
+        for line in process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+
+            if 'ready' in message:
+                self._ready.put(message)
+                continue
+
+            with self._pending_lock:
+                response_queue = self._pending.get(message.get('id'))
+            if response_queue is not None:
+                response_queue.put(message)
+
+        # Process exited: release startup and every outstanding request
+        self._ready.put({'ready': False, 'error': 'render server exited'})
+        with self._pending_lock:
+            for response_queue in self._pending.values():
+                try:
+                    response_queue.put_nowait({'dead': True})
+                except queue.Full:
+                    pass
+
+    def __enter__(self) -> 'RenderServer':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_shared_server: Optional[RenderServer] = None
+_shared_lock = threading.Lock()
+_shared_failed = False
+
+
+def get_shared_server() -> Optional[RenderServer]:
+    """
+    Return the process-wide render server, starting it on first use.
+
+    Set MERMAID_NO_SERVER=1 to disable the backend entirely.
+
+    Returns:
+        A running RenderServer, or None if the backend is unavailable
+    """
+    global _shared_server, _shared_failed
+
+    if os.environ.get('MERMAID_NO_SERVER'):
+        return None
+
+    with _shared_lock:
+        if _shared_server is not None and _shared_server.running:
+            return _shared_server
+        if _shared_failed:
+            return None
+
+        node = shutil.which('node')
+        cli_dir = find_mermaid_cli_dir() if node else None
+        if not node or not cli_dir or not SERVER_SCRIPT.exists():
+            _shared_failed = True
+            return None
+
+        server = RenderServer(cli_dir, node=node, max_pages=max(1, os.cpu_count() or 1))
+        if not server.start():
+            print("WARNING: Render server failed to start, falling back to mmdc", file=sys.stderr)
+            _shared_failed = True
+            return None
+
+        _shared_server = server
+        atexit.register(server.close)
+        return server
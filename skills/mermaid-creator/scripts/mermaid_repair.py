@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Mechanical repairs for common Mermaid syntax errors.
+
+Applies the rewrites documented in references/guides/troubleshooting.md
+without human input:
+- Move nodes off the diagram header line (direction on same line)
+- Rename reserved words used as flowchart node IDs (end -> End)
+- Normalize wrong flowchart arrows (-> and single dash -> -->)
+- Quote node labels containing special characters or brackets
+- Add the missing colon / space in sequence messages and declarations
+- Close blocks (subgraph, alt, loop, ...) missing their "end"
+
+Repairs are selected from lint issues and troubleshooting matches, so only
+rewrites relevant to the actual failure are applied.
+
+Usage:
+    # Repair a .mmd file in place
+    python mermaid_repair.py diagram.mmd
+
+    # Repair stdin and print the result
+    cat diagram.mmd | python mermaid_repair.py -
+
+Requirements:
+    - Python 3.7+ (stdlib only, no external dependencies)
+"""
+
+import argparse
+import re
+import sys
+from pathlib import Path
+from typing import Iterable, List, Optional, Set, Tuple
+
+from mermaid_lint import (
+    DIRECTION_ON_HEADER_PATTERN,
+    EDGE_LABEL_PATTERN,
+    EDGE_SPLIT_PATTERN,
+    END_PATTERN,
+    FLOWCHART_STATEMENT_PATTERN,
+    NODE_ID_PATTERN,
+    QUOTED_PATTERN,
+    RULE_TITLES,
+    SEQUENCE_BLOCK_PATTERN,
+    SEQUENCE_DECLARATION_PATTERN,
+    SEQUENCE_MESSAGE_PATTERN,
+    LintIssue,
+    MermaidLinter,
+)
+from resilient_diagram import DiagramType, TroubleshootingMatch
+
+
+# Rules this module can repair, in the order they are applied
+REPAIRABLE_RULES = [
+    'direction-line',
+    'arrow-syntax',
+    'end-node',
+    'reserved-word',
+    'special-characters',
+    'bracket-syntax',
+    'participant-space',
+    'missing-colon',
+    'missing-end',
+]
+
+# Node shapes (opener -> closer), longest openers first
+NODE_SHAPES = [
+    ('(((', ')))'), ('((', '))'), ('([', '])'), ('[[', ']]'), ('[(', ')]'),
+    ('{{', '}}'), ('[', ']'), ('(', ')'), ('{', '}'), ('>', ']'),
+]
+
+# Edge operators and "&" between nodes (kept when splitting a line)
+NODE_SEPARATOR_PATTERN = re.compile(
+    r'(\s*(?:[<ox]?(?:-{2,}|={2,}|-\.+-)[>ox]?|(?<![-.=])->)\s*(?:\|[^|]*\|\s*)?|\s*&\s*)'
+)
+NODE_PATTERN = re.compile(r'^(\s*[A-Za-z_][\w-]*)(.*?)(\s*(?::::[\w-]+)?\s*;?\s*)$')
+LABEL_SPECIAL_CHARS = set('()[]{}"<>#:;&|')
+SHORT_ARROW_FIX_PATTERN = re.compile(r'(?<![-.=<])->(?!>)')
+SINGLE_DASH_FIX_PATTERN = re.compile(r'(\w)\s+-\s+(\w)')
+PROTECTED_PATTERN = re.compile(r'"[^"]*"|\|[^|]*\||\[[^\]]*\]|\([^)]*\)|\{[^}]*\}')
+
+# Flowchart statements whose arguments are node IDs
+NODE_REFERENCE_STATEMENTS = ('class ', 'style ', 'click ')
+
+
+class MermaidRepairer:
+    """Apply troubleshooting-guide rewrites to broken Mermaid code."""
+
+    def __init__(self, linter: Optional[MermaidLinter] = None):
+        """
+        Initialize repairer.
+
+        Args:
+            linter: Linter used to locate issues (created if not provided)
+        """
+        self.linter = linter or MermaidLinter()
+        self.generator = self.linter.generator
+
+    def rules_for(
+        self,
+        issues: Iterable[LintIssue] = (),
+        matches: Iterable[TroubleshootingMatch] = ()
+    ) -> Set[str]:
+        """
+        Select repair rules from lint issues and troubleshooting matches.
+
+        Args:
+            issues: Lint issues for the diagram
+            matches: Top troubleshooting matches for the render error
+
+        Returns:
+            Names of repairable rules
+        """
+        rules = {issue.rule for issue in issues if issue.rule in REPAIRABLE_RULES}
+        for match in matches:
+            for rule, title in RULE_TITLES.items():
+                if rule in REPAIRABLE_RULES and title.lower() in match.title.lower():
+                    rules.add(rule)
+        return rules
+
+    def repair(self, mermaid_code: str, rules: Optional[Set[str]] = None) -> Tuple[str, List[str]]:
+        """
+        Apply repairs to Mermaid code.
+
+        Args:
+            mermaid_code: Raw Mermaid diagram code
+            rules: Rules to repair (default: every repairable rule)
+
+        Returns:
+            Tuple of (repaired code, descriptions of applied fixes)
+        """
+        rules = set(REPAIRABLE_RULES) if rules is None else rules
+        lines = mermaid_code.split('\n')
+        header_index = self._header_index(lines)
+        if header_index is None:
+            return mermaid_code, []
+
+        # Compare by value: the generator may come from resilient_diagram run as __main__
+        diagram_type = DiagramType(self.generator.detect_diagram_type(lines[header_index].strip()).value)
+        fixes: List[str] = []
+
+        for rule in REPAIRABLE_RULES:
+            if rule not in rules:
+                continue
+            repair = getattr(self, '_repair_' + rule.replace('-', '_'))
+            lines, fix = repair(lines, header_index, diagram_type)
+            if fix:
+                fixes.append(fix)
+
+        return '\n'.join(lines), fixes
+
+    def _header_index(self, lines: List[str]) -> Optional[int]:
+        start = MermaidLinter._skip_front_matter(lines)
+        for i in range(start, len(lines)):
+            stripped = lines[i].strip()
+            if stripped and not stripped.startswith('%%'):
+                return i
+        return None
+
+    @staticmethod
+    def _body(lines: List[str], header_index: int) -> Iterable[int]:
+        """Indices of body lines that hold statements."""
+        for i in range(header_index + 1, len(lines)):
+            stripped = lines[i].strip()
+            if stripped and not stripped.startswith('%%'):
+                yield i
+
+    @staticmethod
+    def _indent(lines: List[str], header_index: int) -> str:
+        for line in lines[header_index + 1:]:
+            if line.strip():
+                return line[:len(line) - len(line.lstrip())] or '    '
+        return '    '
+
+    @staticmethod
+    def _map_unprotected(text: str, transform) -> str:
+        """Apply transform to text outside quotes, edge labels and node labels."""
+        result = []
+        position = 0
+        for match in PROTECTED_PATTERN.finditer(text):
+            result.append(transform(text[position:match.start()]))
+            result.append(match.group(0))
+            position = match.end()
+        result.append(transform(text[position:]))
+        return ''.join(result)
+
+    # Flowchart repairs
+
+    def _repair_direction_line(self, lines, header_index, diagram_type):
+        header = lines[header_index]
+        match = DIRECTION_ON_HEADER_PATTERN.match(header.strip())
+        if diagram_type != DiagramType.FLOWCHART or not match:
+            return lines, None
+        stripped = header.strip()
+        words = stripped.split(None, 2)
+        lines = list(lines)
+        lines[header_index:header_index + 1] = [
+            header[:len(header) - len(header.lstrip())] + f"{words[0]} {words[1]}",
+            self._indent(lines, header_index) + words[2],
+        ]
+        return lines, "Moved diagram content off the direction line"
+
+    def _repair_arrow_syntax(self, lines, header_index, diagram_type):
+        if diagram_type != DiagramType.FLOWCHART:
+            return lines, None
+
+        def fix(text):
+            text = SHORT_ARROW_FIX_PATTERN.sub('-->', text)
+            return SINGLE_DASH_FIX_PATTERN.sub(r'\1 --> \2', text)
+
+        lines = list(lines)
+        changed = False
+        for i in self._body(lines, header_index):
+            if FLOWCHART_STATEMENT_PATTERN.match(lines[i].strip()):
+                continue
+            fixed = self._map_unprotected(lines[i], fix)
+            if fixed != lines[i]:
+                lines[i] = fixed
+                changed = True
+        return lines, "Replaced invalid arrows with '-->'" if changed else None
+
+    def _repair_end_node(self, lines, header_index, diagram_type):
+        return self._rename_reserved_ids(lines, header_index, diagram_type, {'end'})
+
+    def _repair_reserved_word(self, lines, header_index, diagram_type):
+        words = set(self.linter.reserved_words) - {'end'}
+        return self._rename_reserved_ids(lines, header_index, diagram_type, words)
+
+    def _rename_reserved_ids(self, lines, header_index, diagram_type, words):
+        if diagram_type != DiagramType.FLOWCHART:
+            return lines, None
+
+        node_ids = set()
+        for i in self._body(lines, header_index):
+            text = lines[i].strip()
+            if FLOWCHART_STATEMENT_PATTERN.match(text):
+                continue
+            skeleton, _ = MermaidLinter._strip_brackets(
+                EDGE_LABEL_PATTERN.sub('', QUOTED_PATTERN.sub('""', text))
+            )
+            for segment in EDGE_SPLIT_PATTERN.split(skeleton):
+                for node in segment.split('&'):
+                    match = NODE_ID_PATTERN.match(node)
+                    if match:
+                        node_ids.add(match.group(1))
+
+        renames = {}
+        for word in sorted(node_ids & words):
+            new_id = word[:1].upper() + word[1:]
+            if new_id == word:
+                continue
+            while new_id in node_ids or new_id in renames.values():
+                new_id += '_'
+            renames[word] = new_id
+        if not renames:
+            return lines, None
+
+        id_pattern = re.compile(r'(?<![\w-])(' + '|'.join(map(re.escape, renames)) + r')(?![\w-])')
+
+        def rename(text):
+            return id_pattern.sub(lambda m: renames[m.group(1)], text)
+
+        lines = list(lines)
+        for i in self._body(lines, header_index):
+            text = lines[i].strip()
+            if END_PATTERN.match(text) or text.startswith(('subgraph', 'classDef', 'linkStyle')):
+                continue
+            if text.startswith(NODE_REFERENCE_STATEMENTS):
+                keyword, _, rest = lines[i].partition(text.split()[0])
+                lines[i] = keyword + text.split()[0] + self._map_unprotected(rest, rename)
+            elif not FLOWCHART_STATEMENT_PATTERN.match(text):
+                lines[i] = self._map_unprotected(lines[i], rename)
+
+        renamed = ', '.join(f"'{old}' -> '{new}'" for old, new in renames.items())
+        return lines, f"Renamed reserved node IDs: {renamed}"
+
+    def _repair_special_characters(self, lines, header_index, diagram_type):
+        if diagram_type != DiagramType.FLOWCHART:
+            return lines, None
+
+        lines = list(lines)
+        changed = False
+        for i in self._body(lines, header_index):
+            if FLOWCHART_STATEMENT_PATTERN.match(lines[i].strip()):
+                continue
+            parts = NODE_SEPARATOR_PATTERN.split(lines[i])
+            for j in range(0, len(parts), 2):
+                quoted = self._quote_node_label(parts[j])
+                if quoted != parts[j]:
+                    parts[j] = quoted
+                    changed = True
+            lines[i] = ''.join(parts)
+        return lines, "Quoted node labels containing special characters" if changed else None
+
+    # Unbalanced brackets inside a label are fixed by the same quoting
+    _repair_bracket_syntax = _repair_special_characters
+
+    @staticmethod
+    def _quote_node_label(node: str) -> str:
+        match = NODE_PATTERN.match(node)
+        if not match:
+            return node
+        node_id, shape, suffix = match.groups()
+        for opener, closer in NODE_SHAPES:
+            if not (shape.startswith(opener) and shape.endswith(closer)):
+                continue
+            label = shape[len(opener):len(shape) - len(closer)]
+            if not label or (label.startswith('"') and label.endswith('"') and len(label) > 1):
+                return node
+            if not LABEL_SPECIAL_CHARS & set(label):
+                return node
+            return f'{node_id}{opener}"{label.replace(chr(34), "#quot;")}"{closer}{suffix}'
+        return node
+
+    # Sequence repairs
+
+    def _repair_participant_space(self, lines, header_index, diagram_type):
+        if diagram_type != DiagramType.SEQUENCE:
+            return lines, None
+        lines = list(lines)
+        changed = False
+        for i in self._body(lines, header_index):
+            indent = lines[i][:len(lines[i]) - len(lines[i].lstrip())]
+            fixed = SEQUENCE_DECLARATION_PATTERN.sub(r'\1 ', lines[i].strip())
+            if fixed != lines[i].strip():
+                lines[i] = indent + fixed
+                changed = True
+        return lines, "Added space after participant/actor keyword" if changed else None
+
+    def _repair_missing_colon(self, lines, header_index, diagram_type):
+        if diagram_type != DiagramType.SEQUENCE:
+            return lines, None
+        lines = list(lines)
+        changed = False
+        for i in self._body(lines, header_index):
+            text = lines[i].strip()
+            match = SEQUENCE_MESSAGE_PATTERN.match(text)
+            if not match or len(match.group(3).split()) < 2:
+                continue
+            target, message = match.group(3).split(None, 1)
+            indent = lines[i][:len(lines[i]) - len(lines[i].lstrip())]
+            lines[i] = indent + text[:match.start(3)] + f"{target}: {message}"
+            changed = True
+        return lines, "Added missing colon before message text" if changed else None
+
+    # Shared repairs
+
+    def _repair_missing_end(self, lines, header_index, diagram_type):
+        if diagram_type == DiagramType.FLOWCHART:
+            opens = lambda text: text.startswith('subgraph')
+        elif diagram_type == DiagramType.SEQUENCE:
+            opens = SEQUENCE_BLOCK_PATTERN.match
+        else:
+            return lines, None
+
+        open_blocks = 0
+        for i in self._body(lines, header_index):
+            text = lines[i].strip()
+            if opens(text):
+                open_blocks += 1
+            elif END_PATTERN.match(text):
+                open_blocks -= 1
+        if open_blocks <= 0:
+            return lines, None
+
+        lines = list(lines)
+        while lines and not lines[-1].strip():
+            lines.pop()
+        lines.extend([self._indent(lines, header_index) + 'end'] * open_blocks)
+        return lines, f"Closed {open_blocks} block(s) missing 'end'"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Apply mechanical troubleshooting-guide repairs to a Mermaid diagram',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Repair a diagram file in place
+  python mermaid_repair.py diagram.mmd
+
+  # Repair stdin, print the result
+  cat diagram.mmd | python mermaid_repair.py -
+
+Only rules reported by the linter are repaired unless --all is given.
+        """
+    )
+    parser.add_argument('input', type=str, help='Input .mmd file or "-" for stdin')
+    parser.add_argument('--output', '-o', type=Path,
+                        help='Write repaired code here (default: in place, stdout for stdin)')
+    parser.add_argument('--all', '-a', action='store_true',
+                        help='Apply every repair, not only those for lint issues')
+
+    args = parser.parse_args()
+
+    if args.input == '-':
+        mermaid_code = sys.stdin.read()
+    else:
+        input_path = Path(args.input)
+        if not input_path.is_file():
+            print(f"ERROR: File not found: {input_path}", file=sys.stderr)
+            sys.exit(1)
+        mermaid_code = input_path.read_text(encoding='utf-8')
+
+    repairer = MermaidRepairer()
+    rules = None if args.all else repairer.rules_for(repairer.linter.lint(mermaid_code))
+    repaired, fixes = repairer.repair(mermaid_code, rules)
+
+    for fix in fixes:
+        print(f"✓ {fix}", file=sys.stderr)
+    if not fixes:
+        print("No repairs applied", file=sys.stderr)
+
+    if args.output:
+        args.output.write_text(repaired, encoding='utf-8')
+    elif args.input == '-':
+        sys.stdout.write(repaired)
+    elif fixes:
+        Path(args.input).write_text(repaired, encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
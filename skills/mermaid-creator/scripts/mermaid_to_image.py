@@ -15,20 +15,66 @@ Usage:
     # Batch convert all .mmd files in directory
     python mermaid_to_image.py diagrams/ output/ --format png --recursive
 
+    # PNG for READMEs and SVG for the site from one render per diagram
+    python mermaid_to_image.py diagram.mmd output.png --format png,svg
+
+    # Batch convert with at most 4 concurrent renders
+    python mermaid_to_image.py diagrams/ output/ --jobs 4
+
+    # Render diagram records from extract_mermaid.py --jsonl (file or "-" for stdin)
+    python extract_mermaid.py docs/ --jsonl - | python mermaid_to_image.py - output/ --jsonl
+
     # Convert from stdin
     echo "graph TD; A-->B" | python mermaid_to_image.py - output.png
 
+    # Pipe through without files (image bytes on stdout)
+    echo "graph TD; A-->B" | python mermaid_to_image.py - - --format svg > output.svg
+
+    # Bypass the render cache (unchanged diagrams are normally reused)
+    python mermaid_to_image.py diagram.mmd output.png --no-cache
+
+    # Force one mmdc process per diagram (skip the persistent render server)
+    python mermaid_to_image.py diagrams/ output/ --no-server
+
+    # Re-render diagrams as they are saved (one long-lived process, warm renderer)
+    python mermaid_to_image.py diagrams/ output/ --format png,svg --watch
+
+    # Allow slow diagrams more time (seconds per diagram, default 60)
+    python mermaid_to_image.py diagrams/ output/ --timeout 120
+
+    # From Python: get image bytes directly (no temp files)
+    svg = MermaidRenderer().render_bytes("graph TD; A-->B", "svg")
+
+    # From asyncio code: render concurrently, cancellation kills mmdc
+    results = await MermaidRenderer().arender_many(
+        [(Path('a.mmd'), Path('a.png')), ('graph TD; A-->B', Path('b.png'))], jobs=4)
+
+When Node.js is available, diagrams are rendered through a persistent render
+server (mermaid_render_server.py) that keeps one headless browser warm across
+diagrams. Otherwise each diagram is rendered by a separate mmdc process.
+
+Rendered output is cached on disk (mermaid_render_cache.py), keyed by the
+diagram source and render options, so unchanged diagrams are not re-rendered.
+
 Requirements:
     - mermaid-cli: npm install -g @mermaid-js/mermaid-cli
 """
 
 import argparse
+import asyncio
+import hashlib
+import json
 import os
 import subprocess
 import sys
-import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Optional, List
+from typing import Callable, Dict, Iterable, Optional, List, Tuple, Union
+
+from mermaid_cli import arun_mmdc, check_mmdc_installed, mmdc_command, parse_formats
+from mermaid_render_cache import RenderCache
+from mermaid_render_server import RenderServerError, RenderServerUnavailable, get_shared_server
 
 
 class MermaidRenderer:
@@ -44,7 +90,10 @@ class MermaidRenderer:
         width: Optional[int] = None,
         height: Optional[int] = None,
         scale: int = 1,
-        config_file: Optional[Path] = None
+        config_file: Optional[Path] = None,
+        use_server: bool = True,
+        cache: Optional[RenderCache] = None,
+        timeout: float = 60
     ):
         """
         Initialize Mermaid renderer.
@@ -56,8 +105,11 @@ class MermaidRenderer:
             height: Output height in pixels
             scale: Scale factor (1-3)
             config_file: Path to custom Mermaid config file
+            use_server: Render through the persistent render server when available
+            cache: Render cache to reuse output of unchanged diagrams (None disables)
+            timeout: Default seconds allowed per render (overridable per call)
         """
-        if not self._check_mmdc_installed():
+        if not check_mmdc_installed():
             print("ERROR: mermaid-cli (mmdc) not found.", file=sys.stderr)
             print("Install with: npm install -g @mermaid-js/mermaid-cli", file=sys.stderr)
             sys.exit(1)
@@ -68,106 +120,457 @@ class MermaidRenderer:
         self.height = height
         self.scale = max(1, min(3, scale))
         self.config_file = config_file
+        self.use_server = use_server
+        self.cache = cache
+        self.timeout = timeout
+        self._config_data = self._load_config(config_file)
 
-    def render(self, input_path: Path, output_path: Path) -> bool:
+    def render(self, input_path: Path, output_path: Path, timeout: Optional[float] = None) -> bool:
         """
         Render a Mermaid diagram to an image.
 
         Args:
             input_path: Path to .mmd file or '-' for stdin
             output_path: Path to output image file
+            timeout: Seconds allowed for the render (default: the renderer's timeout)
 
         Returns:
             True if successful, False otherwise
         """
-        # Build mmdc command
-        cmd = ['mmdc', '-i', str(input_path), '-o', str(output_path)]
+        timeout = self.timeout if timeout is None else timeout
+        if self.cache is None and self._get_server() is None:
+            return self._render_with_mmdc(input_path, output_path, timeout)
+
+        try:
+            mermaid_code = Path(input_path).read_text(encoding='utf-8')
+        except OSError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return False
+
+        return self._render_code(mermaid_code, output_path, timeout)
+
+    def _render_code(self, mermaid_code: str, output_path: Path, timeout: float) -> bool:
+        """Render diagram source to output_path via render_bytes()."""
+        data = self.render_bytes(mermaid_code, self._format_for(output_path), timeout)
+        if data is None:
+            return False
+        output_path.write_bytes(data)
+        return True
+
+    def render_bytes(
+        self,
+        mermaid_code: str,
+        output_format: str = 'svg',
+        timeout: Optional[float] = None
+    ) -> Optional[bytes]:
+        """
+        Render Mermaid code and return the image bytes without touching disk.
+
+        The render cache and the persistent render server are used when
+        available; otherwise mmdc reads the diagram from stdin and writes the
+        image to stdout (mermaid-cli 10+), so no temporary files are created.
+
+        Args:
+            mermaid_code: Mermaid diagram syntax as string
+            output_format: png, svg, or pdf
+            timeout: Seconds allowed for the render (default: the renderer's timeout)
+
+        Returns:
+            Rendered image bytes, or None if rendering failed
+        """
+        timeout = self.timeout if timeout is None else timeout
+        output_format = output_format if output_format in self.VALID_FORMATS else 'png'
+
+        cache_key = self._cache_key(mermaid_code, output_format)
+        if cache_key is not None:
+            data = self.cache.get(cache_key)
+            if data:
+                return data
+
+        data = self._render_uncached(mermaid_code, output_format, timeout)
+        if data is None:
+            return None
+        if cache_key is not None:
+            self.cache.put(cache_key, data)
+        return data
+
+    def render_formats(
+        self,
+        mermaid_code: str,
+        output_formats: List[str],
+        timeout: Optional[float] = None
+    ) -> Dict[str, bytes]:
+        """
+        Render Mermaid code once and return the image bytes for each format.
+
+        With the render server the diagram is laid out a single time and
+        every format is exported from the same page. Formats found in the
+        render cache are not rendered again. Without the server mmdc can
+        only export one format per run, so it runs once per missing format.
+
+        Args:
+            mermaid_code: Mermaid diagram syntax as string
+            output_formats: Formats to produce (png, svg, pdf)
+            timeout: Seconds allowed per render (default: the renderer's timeout)
+
+        Returns:
+            Dict mapping each format that rendered to its image bytes
+        """
+        timeout = self.timeout if timeout is None else timeout
+        formats = [f for f in dict.fromkeys(output_formats) if f in self.VALID_FORMATS]
+
+        images: Dict[str, bytes] = {}
+        cache_keys = {fmt: self._cache_key(mermaid_code, fmt) for fmt in formats}
+        for fmt, cache_key in cache_keys.items():
+            data = self.cache.get(cache_key) if cache_key is not None else None
+            if data:
+                images[fmt] = data
+
+        missing = [fmt for fmt in formats if fmt not in images]
+        rendered = None
+        server = self._get_server() if len(missing) > 1 else None
+        if server is not None:
+            rendered = self._render_formats_with_server(server, mermaid_code, missing, timeout)
+
+        if rendered is None:
+            rendered = {}
+            for fmt in missing:
+                data = self._render_uncached(mermaid_code, fmt, timeout)
+                if data is None:
+                    break  # An invalid diagram fails in every format
+                rendered[fmt] = data
+
+        for fmt, data in rendered.items():
+            images[fmt] = data
+            if cache_keys[fmt] is not None:
+                self.cache.put(cache_keys[fmt], data)
+        return images
+
+    def render_to_files(
+        self,
+        source: Union[Path, str],
+        output_paths: List[Path],
+        timeout: Optional[float] = None
+    ) -> bool:
+        """
+        Render a diagram once and write it to several files.
+
+        Each file's format comes from its extension, so one call can write
+        PNG and SVG (and copies of the same image) from a single render.
+
+        Args:
+            source: Path to a .mmd file, or Mermaid code as str
+            output_paths: Image files to write
+            timeout: Seconds allowed per render (default: the renderer's timeout)
+
+        Returns:
+            True if every file was written
+        """
+        if isinstance(source, Path):
+            try:
+                source = source.read_text(encoding='utf-8')
+            except OSError as e:
+                print(f"ERROR: {e}", file=sys.stderr)
+                return False
+
+        formats = [self._format_for(path) for path in output_paths]
+        images = self.render_formats(source, formats, timeout)
+        for path, fmt in zip(output_paths, formats):
+            if fmt not in images:
+                return False
+            path.write_bytes(images[fmt])
+        return True
+
+    def _render_uncached(self, mermaid_code: str, output_format: str, timeout: float) -> Optional[bytes]:
+        """Render one format with the render server, falling back to piping through mmdc."""
+        data = None
+        server = self._get_server()
+        if server is not None:
+            data = self._render_with_server(server, mermaid_code, output_format, timeout)
+
+        if data is None:
+            data = self._render_with_mmdc_pipe(mermaid_code, output_format, timeout)
+
+        return data or None
+
+    def _mmdc_args(
+        self,
+        input_path: Union[Path, str],
+        output_path: Union[Path, str],
+        output_format: Optional[str] = None
+    ) -> List[str]:
+        """
+        Build the mmdc arguments (without the executable) for a render.
+
+        An input or output of '-' means stdin or stdout; output_format is then
+        required since mmdc cannot infer it from a file extension.
+        """
+        args = ['-i', str(input_path), '-o', str(output_path)]
+        if output_format:
+            args.extend(['-e', output_format])
+        if str(output_path) == '-':
+            args.append('-q')
 
         # Add options
-        cmd.extend(['-t', self.theme])
-        cmd.extend(['-b', self.background])
+        args.extend(['-t', self.theme])
+        args.extend(['-b', self.background])
 
         if self.width:
-            cmd.extend(['-w', str(self.width)])
+            args.extend(['-w', str(self.width)])
 
         if self.height:
-            cmd.extend(['-H', str(self.height)])
+            args.extend(['-H', str(self.height)])
 
         if self.scale != 1:
-            cmd.extend(['-s', str(self.scale)])
+            args.extend(['-s', str(self.scale)])
 
         if self.config_file and self.config_file.exists():
-            cmd.extend(['-c', str(self.config_file)])
+            args.extend(['-c', str(self.config_file)])
+
+        return args
+
+    def _render_with_mmdc_pipe(self, mermaid_code: str, output_format: str, timeout: float) -> Optional[bytes]:
+        """Render with a dedicated mmdc process, piping source in and the image out."""
+        try:
+            result = subprocess.run(
+                mmdc_command() + self._mmdc_args('-', '-', output_format),
+                input=mermaid_code.encode('utf-8'),
+                capture_output=True,
+                timeout=timeout
+            )
+        except subprocess.TimeoutExpired:
+            print(f"ERROR: Rendering timed out after {timeout:g} seconds", file=sys.stderr)
+            return None
+        except OSError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return None
+
+        return self._check_pipe_output(result)
+
+    @staticmethod
+    def _check_pipe_output(result: subprocess.CompletedProcess) -> Optional[bytes]:
+        """Return the image mmdc wrote to stdout, or None if it failed."""
+        if result.returncode != 0:
+            print(f"ERROR: mmdc failed: {result.stderr.decode('utf-8', 'replace')}", file=sys.stderr)
+            return None
+
+        if not result.stdout:
+            print("ERROR: mmdc produced no output", file=sys.stderr)
+            return None
+
+        return result.stdout
 
+    def _render_with_mmdc(self, input_path: Path, output_path: Path, timeout: float) -> bool:
+        """Render a diagram file with a dedicated mmdc process."""
         try:
             result = subprocess.run(
-                cmd,
+                mmdc_command() + self._mmdc_args(input_path, output_path),
                 capture_output=True,
                 text=True,
-                timeout=60
+                timeout=timeout
             )
 
             if result.returncode != 0:
                 print(f"ERROR: mmdc failed: {result.stderr}", file=sys.stderr)
                 return False
 
-            if not output_path.exists():
-                print(f"ERROR: Output file not created: {output_path}", file=sys.stderr)
-                return False
-
-            if output_path.stat().st_size == 0:
-                print(f"ERROR: Output file is empty: {output_path}", file=sys.stderr)
-                return False
-
-            return True
+            return self._check_output(output_path)
 
         except subprocess.TimeoutExpired:
-            print(f"ERROR: Rendering timed out after 60 seconds", file=sys.stderr)
+            print(f"ERROR: Rendering timed out after {timeout:g} seconds", file=sys.stderr)
             return False
 
         except Exception as e:
             print(f"ERROR: {e}", file=sys.stderr)
             return False
 
-    def render_from_string(self, mermaid_code: str, output_path: Path) -> bool:
+    @staticmethod
+    def _check_output(output_path: Path) -> bool:
+        """Check that mmdc produced a non-empty output file."""
+        if not output_path.exists():
+            print(f"ERROR: Output file not created: {output_path}", file=sys.stderr)
+            return False
+
+        if output_path.stat().st_size == 0:
+            print(f"ERROR: Output file is empty: {output_path}", file=sys.stderr)
+            return False
+
+        return True
+
+    def render_from_string(
+        self,
+        mermaid_code: str,
+        output_path: Path,
+        timeout: Optional[float] = None
+    ) -> bool:
         """
         Render Mermaid code string to an image.
 
         Args:
             mermaid_code: Mermaid diagram syntax as string
             output_path: Path to output image file
+            timeout: Seconds allowed for the render (default: the renderer's timeout)
 
         Returns:
             True if successful, False otherwise
         """
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.mmd', delete=False) as f:
-            f.write(mermaid_code)
-            temp_input = Path(f.name)
+        timeout = self.timeout if timeout is None else timeout
+        return self._render_code(mermaid_code, output_path, timeout)
+
+    async def arender(
+        self,
+        input_path: Path,
+        output_path: Path,
+        timeout: Optional[float] = None
+    ) -> bool:
+        """
+        Asynchronously render a Mermaid diagram file to an image.
+
+        mmdc runs as an asyncio subprocess; it is killed if the timeout
+        expires or the awaiting task is cancelled.
+
+        Args:
+            input_path: Path to .mmd file
+            output_path: Path to output image file
+            timeout: Seconds allowed for the render (default: the renderer's timeout)
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            mermaid_code = Path(input_path).read_text(encoding='utf-8')
+        except OSError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return False
+
+        return await self._arender_code(mermaid_code, output_path, timeout)
+
+    async def arender_from_string(
+        self,
+        mermaid_code: str,
+        output_path: Path,
+        timeout: Optional[float] = None
+    ) -> bool:
+        """Asynchronously render a Mermaid code string (see arender)."""
+        return await self._arender_code(mermaid_code, output_path, timeout)
+
+    async def arender_many(
+        self,
+        items: Iterable[Tuple[Union[Path, str], Path]],
+        jobs: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> List[bool]:
+        """
+        Asynchronously render many diagrams with bounded concurrency.
+
+        Cancelling the call cancels every pending render and kills the
+        running mmdc processes.
+
+        Args:
+            items: (source, output_path) pairs; a Path source is a .mmd file,
+                a str source is Mermaid code
+            jobs: Maximum concurrent renders (default: CPU count)
+            timeout: Seconds allowed per diagram (default: the renderer's timeout)
+
+        Returns:
+            Success flag for each item, in order
+        """
+        semaphore = asyncio.Semaphore(max(1, jobs or os.cpu_count() or 1))
+
+        async def render_one(source, output_path):
+            async with semaphore:
+                if isinstance(source, str):
+                    return await self.arender_from_string(source, output_path, timeout)
+                return await self.arender(source, output_path, timeout)
 
+        tasks = [asyncio.ensure_future(render_one(source, output)) for source, output in items]
         try:
-            success = self.render(temp_input, output_path)
-            return success
-        finally:
+            return list(await asyncio.gather(*tasks))
+        except asyncio.CancelledError:
+            # Wait until every task has killed its mmdc before propagating
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    async def _arender_code(self, mermaid_code: str, output_path: Path, timeout: Optional[float]) -> bool:
+        """Async counterpart of _render_code."""
+        data = await self.arender_bytes(mermaid_code, self._format_for(output_path), timeout)
+        if data is None:
+            return False
+        output_path.write_bytes(data)
+        return True
+
+    async def arender_bytes(
+        self,
+        mermaid_code: str,
+        output_format: str = 'svg',
+        timeout: Optional[float] = None
+    ) -> Optional[bytes]:
+        """Asynchronous render_bytes(); mmdc is killed on timeout or cancellation."""
+        timeout = self.timeout if timeout is None else timeout
+        output_format = output_format if output_format in self.VALID_FORMATS else 'png'
+
+        cache_key = self._cache_key(mermaid_code, output_format)
+        if cache_key is not None:
+            data = self.cache.get(cache_key)
+            if data:
+                return data
+
+        data = None
+        server = self._get_server()
+        if server is not None:
+            # The server client blocks on a queue; wait for it on a worker thread
+            loop = asyncio.get_running_loop()
+            data = await loop.run_in_executor(
+                None, self._render_with_server, server, mermaid_code, output_format, timeout
+            )
+
+        if data is None:
             try:
-                temp_input.unlink()
-            except:
-                pass
+                result = await arun_mmdc(
+                    self._mmdc_args('-', '-', output_format),
+                    timeout=timeout,
+                    input_data=mermaid_code.encode('utf-8')
+                )
+            except subprocess.TimeoutExpired:
+                print(f"ERROR: Rendering timed out after {timeout:g} seconds", file=sys.stderr)
+                return None
+            except OSError as e:
+                print(f"ERROR: {e}", file=sys.stderr)
+                return None
+            data = self._check_pipe_output(result)
+
+        if not data:
+            return None
+        if cache_key is not None:
+            self.cache.put(cache_key, data)
+        return data
 
     def batch_render(
         self,
         input_dir: Path,
         output_dir: Path,
-        output_format: str = 'png',
-        recursive: bool = False
+        output_format: Union[str, List[str]] = 'png',
+        recursive: bool = False,
+        jobs: Optional[int] = None,
+        files: Optional[List[Path]] = None
     ) -> tuple[int, int]:
         """
         Batch render all .mmd files in a directory.
 
+        Diagrams are rendered concurrently by a bounded thread pool; progress
+        lines are still printed in input order.
+
         Args:
             input_dir: Directory containing .mmd files
             output_dir: Output directory for images
-            output_format: Output format (png, svg, pdf)
+            output_format: Output format (png, svg, pdf), or a list of formats
+                all exported from a single render of each diagram
             recursive: Recursively search subdirectories
+            jobs: Maximum concurrent renders (default: CPU count, 1 = serial)
+            files: Render only these .mmd files of input_dir (as --watch
+                does after a save) instead of searching it
 
         Returns:
             Tuple of (success_count, total_count)
@@ -175,50 +578,338 @@ class MermaidRenderer:
         output_dir.mkdir(parents=True, exist_ok=True)
 
         # Find all .mmd files
-        if recursive:
-            mmd_files = list(input_dir.rglob('*.mmd'))
+        if files is not None:
+            mmd_files = sorted(files)
+        elif recursive:
+            mmd_files = sorted(input_dir.rglob('*.mmd'))
         else:
-            mmd_files = list(input_dir.glob('*.mmd'))
+            mmd_files = sorted(input_dir.glob('*.mmd'))
 
         if not mmd_files:
             print(f"No .mmd files found in {input_dir}")
             return 0, 0
 
-        print(f"Found {len(mmd_files)} diagram(s) to render\n")
-
-        success_count = 0
+        formats = [output_format] if isinstance(output_format, str) else list(output_format)
+        tasks = []
         for input_file in mmd_files:
-            # Determine output path
-            if recursive:
-                relative_path = input_file.relative_to(input_dir)
-                output_file = output_dir / relative_path.with_suffix(f'.{output_format}')
-                output_file.parent.mkdir(parents=True, exist_ok=True)
+            outputs = self.batch_outputs(input_file, input_dir, output_dir, formats, recursive)
+            outputs[0].parent.mkdir(parents=True, exist_ok=True)
+            if len(formats) == 1:
+                tasks.append((input_file.name, outputs[0], partial(self.render, input_file, outputs[0])))
             else:
-                output_file = output_dir / input_file.with_suffix(f'.{output_format}').name
+                tasks.append((input_file.name, self._display_path(outputs[0].with_suffix(''), formats),
+                              partial(self.render_to_files, input_file, outputs)))
 
-            print(f"  Rendering: {input_file.name} -> {output_file.name}...", end=" ")
+        return self._run_batch(tasks, jobs)
 
-            if self.render(input_file, output_file):
-                print("✅")
-                success_count += 1
+    def batch_render_records(
+        self,
+        records: Iterable[dict],
+        output_dir: Path,
+        output_format: Union[str, List[str]] = 'png',
+        jobs: Optional[int] = None
+    ) -> tuple[int, int]:
+        """
+        Batch render diagram records produced by extract_mermaid.py --jsonl.
+
+        Each image is written to <output_dir>/<markdown path without suffix>/
+        diagram-<index>-<hash>.<format>, mirroring the scanned docs tree.
+        Identical diagrams are rendered once and written to every location.
+
+        Args:
+            records: Dicts with file, index, hash and content keys
+            output_dir: Output directory for images
+            output_format: Output format (png, svg, pdf), or a list of formats
+                all exported from a single render of each diagram
+            jobs: Maximum concurrent renders (default: CPU count, 1 = serial)
+
+        Returns:
+            Tuple of (success_count, total_count) over distinct diagrams
+        """
+        formats = [output_format] if isinstance(output_format, str) else list(output_format)
+        # Diagram source -> [(label, output_file without suffix)] for every occurrence
+        occurrences: Dict[str, List[Tuple[str, Path]]] = {}
+        for record in records:
+            source = Path(record['file'])
+            if source.is_absolute() or '..' in source.parts:
+                subdir = Path(source.stem)
             else:
-                print("❌")
+                subdir = source.with_suffix('')
+            output_file = output_dir / subdir / f"diagram-{record['index']:03d}-{record['hash']}"
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            label = f"{source.name}#{record['index']}"
+            occurrences.setdefault(record['content'], []).append((label, output_file))
+
+        tasks = []
+        for mermaid_code, targets in occurrences.items():
+            label, output_file = targets[0]
+            if len(targets) > 1:
+                label += f" (+{len(targets) - 1} duplicate(s))"
+            outputs = [path.with_name(f"{path.name}.{fmt}") for _, path in targets for fmt in formats]
+            tasks.append((label, self._display_path(output_file, formats),
+                          partial(self.render_to_files, mermaid_code, outputs)))
+
+        if not tasks:
+            print("No diagram records to render")
+            return 0, 0
 
-        print(f"\n✓ Successfully rendered {success_count}/{len(mmd_files)} diagram(s)")
-        return success_count, len(mmd_files)
+        return self._run_batch(tasks, jobs)
 
     @staticmethod
-    def _check_mmdc_installed() -> bool:
-        """Check if mermaid-cli (mmdc) is installed."""
+    def batch_outputs(
+        input_file: Path,
+        input_dir: Path,
+        output_dir: Path,
+        formats: List[str],
+        recursive: bool = False
+    ) -> List[Path]:
+        """Image files batch_render() writes for input_file, one per format."""
+        if recursive:
+            output_file = output_dir / input_file.relative_to(input_dir)
+        else:
+            output_file = output_dir / input_file.name
+        base = output_file.with_suffix('')
+        return [base.with_name(f"{base.name}.{fmt}") for fmt in formats]
+
+    @staticmethod
+    def _display_path(base: Path, formats: List[str]) -> Path:
+        """Output path shown in progress lines, e.g. diagram.{png,svg}."""
+        suffix = formats[0] if len(formats) == 1 else '{' + ','.join(formats) + '}'
+        return base.with_name(f"{base.name}.{suffix}")
+
+    def _run_batch(
+        self,
+        tasks: List[Tuple[str, Path, Callable[[], bool]]],
+        jobs: Optional[int] = None
+    ) -> tuple[int, int]:
+        """
+        Run render tasks on a bounded thread pool, reporting in input order.
+
+        Args:
+            tasks: (label, output_file, render callable) tuples
+            jobs: Maximum concurrent renders (default: CPU count)
+
+        Returns:
+            Tuple of (success_count, total_count)
+        """
+        jobs = max(1, min(jobs or os.cpu_count() or 1, len(tasks)))
+        print(f"Found {len(tasks)} diagram(s) to render ({jobs} job(s))\n")
+
+        success_count = 0
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(render) for _, _, render in tasks]
+
+            # Report in submission order so output is deterministic
+            for (label, output_file, _), future in zip(tasks, futures):
+                print(f"  Rendering: {label} -> {output_file.name}...", end=" ", flush=True)
+
+                if future.result():
+                    print("✅")
+                    success_count += 1
+                else:
+                    print("❌")
+
+        print(f"\n✓ Successfully rendered {success_count}/{len(tasks)} diagram(s)")
+        if self.cache is not None:
+            hits, misses = self.cache.stats()
+            print(f"  Cache: {hits} hit(s), {misses} miss(es)")
+        return success_count, len(tasks)
+
+    def _get_server(self):
+        """Return the shared render server, or None to render with mmdc."""
+        if not self.use_server or self._config_data is None:
+            return None
+        return get_shared_server()
+
+    def _render_with_server(
+        self,
+        server,
+        mermaid_code: str,
+        output_format: str,
+        timeout: float
+    ) -> Optional[bytes]:
+        """
+        Render through the persistent render server.
+
+        Returns:
+            Image bytes (empty on failure), or None if the server went away
+            and the caller should fall back to mmdc
+        """
         try:
-            result = subprocess.run(
-                ['mmdc', '--version'],
-                capture_output=True,
-                timeout=5
+            data = server.render(
+                mermaid_code,
+                output_format=output_format,
+                theme=self.theme,
+                background=self.background,
+                width=self.width,
+                height=self.height,
+                scale=self.scale,
+                config=self._config_data,
+                timeout=timeout
             )
-            return result.returncode == 0
-        except (FileNotFoundError, subprocess.TimeoutExpired):
+        except RenderServerUnavailable:
+            return None
+        except RenderServerError as e:
+            print(f"ERROR: render server failed: {e}", file=sys.stderr)
+            return b''
+
+        if not data:
+            print("ERROR: render server produced no output", file=sys.stderr)
+            return b''
+
+        return data
+
+    def _render_formats_with_server(
+        self,
+        server,
+        mermaid_code: str,
+        output_formats: List[str],
+        timeout: float
+    ) -> Optional[Dict[str, bytes]]:
+        """
+        Render several formats through the render server in one request.
+
+        Returns:
+            Images by format (empty on failure), or None if the server is
+            unavailable and the caller should fall back to mmdc
+        """
+        try:
+            return server.render_formats(
+                mermaid_code,
+                output_formats,
+                theme=self.theme,
+                background=self.background,
+                width=self.width,
+                height=self.height,
+                scale=self.scale,
+                config=self._config_data,
+                timeout=timeout
+            )
+        except RenderServerUnavailable:
+            return None
+        except RenderServerError as e:
+            print(f"ERROR: render server failed: {e}", file=sys.stderr)
+            return {}
+
+    def _cache_key(self, mermaid_code: str, output_format: str) -> Optional[str]:
+        """Cache key for rendering mermaid_code to output_format, or None without a cache."""
+        if self.cache is None:
+            return None
+        return self.cache.make_key(
+            mermaid_code,
+            output_format=output_format,
+            theme=self.theme,
+            background=self.background,
+            width=self.width,
+            height=self.height,
+            scale=self.scale,
+            config_file=self.config_file
+        )
+
+    def _format_for(self, output_path: Path) -> str:
+        """Infer the output format from the output file extension."""
+        output_format = output_path.suffix.lstrip('.').lower()
+        return output_format if output_format in self.VALID_FORMATS else 'png'
+
+    @staticmethod
+    def _load_config(config_file: Optional[Path]) -> Optional[dict]:
+        """
+        Load a Mermaid JSON config file for the render server.
+
+        Returns:
+            Parsed config ({} when no file), or None if the file is not plain
+            JSON, in which case rendering is left to mmdc
+        """
+        if not config_file or not config_file.exists():
+            return {}
+        try:
+            config = json.loads(config_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        return config if isinstance(config, dict) else None
+
+
+def watch_and_render(
+    renderer: MermaidRenderer,
+    input_path: Path,
+    output_path: Path,
+    output_formats: List[str],
+    recursive: bool = False,
+    jobs: Optional[int] = None,
+    debounce: float = 0.3,
+    poll: bool = False
+):
+    """
+    Render a .mmd file or directory, then re-render diagrams as they are saved.
+
+    The renderer (and its render server) stays warm for the whole session.
+    Only saved files whose content changed are rendered again; images of
+    deleted .mmd files are removed. Runs until Ctrl+C.
+
+    Args:
+        renderer: Renderer used for every render
+        input_path: .mmd file or directory of .mmd files
+        output_path: Output image (single file) or directory
+        output_formats: Formats to write
+        recursive: Watch and render subdirectories of input_path
+        jobs: Maximum concurrent renders per batch
+        debounce: Seconds of quiet that end a burst of saves
+        poll: Poll for changes instead of using inotify
+    """
+    from mermaid_watch import FileWatcher, watch_loop
+
+    single = input_path.is_file()
+    if single:
+        outputs = [output_path] if len(output_formats) == 1 else [
+            output_path.with_suffix(f'.{fmt}') for fmt in output_formats
+        ]
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+    digests: Dict[Path, str] = {}
+
+    def content_changed(mmd_file: Path) -> bool:
+        try:
+            digest = hashlib.md5(mmd_file.read_bytes()).hexdigest()
+        except OSError:
             return False
+        changed = digests.get(mmd_file) != digest
+        digests[mmd_file] = digest
+        return changed
+
+    def render_single():
+        print(f"  Rendering: {input_path} -> {', '.join(o.name for o in outputs)}...", end=" ", flush=True)
+        print("✅" if renderer.render_to_files(input_path, outputs) else "❌")
+
+    def on_change(changed: List[Path]):
+        if single:
+            if input_path.exists() and content_changed(input_path):
+                render_single()
+            return
+
+        for mmd_file in changed:
+            if not mmd_file.exists():
+                digests.pop(mmd_file, None)
+                for image in renderer.batch_outputs(mmd_file, input_path, output_path, output_formats, recursive):
+                    if image.exists():
+                        image.unlink()
+                        print(f"  Removed: {image}")
+        updated = [f for f in changed if f.exists() and content_changed(f)]
+        if updated:
+            renderer.batch_render(
+                input_path, output_path, output_format=output_formats,
+                recursive=recursive, jobs=jobs, files=updated
+            )
+
+    watcher = FileWatcher([input_path], suffixes=('.mmd',), recursive=recursive, use_inotify=not poll)
+    if single:
+        content_changed(input_path)
+        render_single()
+    else:
+        mmd_files = input_path.rglob('*.mmd') if recursive else input_path.glob('*.mmd')
+        for mmd_file in mmd_files:
+            content_changed(mmd_file)
+        renderer.batch_render(input_path, output_path, output_format=output_formats,
+                              recursive=recursive, jobs=jobs)
+    watch_loop(watcher, on_change, debounce)
 
 
 def main():
@@ -236,9 +927,15 @@ Examples:
   # Batch convert directory
   python mermaid_to_image.py diagrams/ output/ --format png
 
+  # PNG and SVG from a single render of each diagram
+  python mermaid_to_image.py diagrams/ output/ --format png,svg
+
   # From stdin
   echo "graph TD; A-->B" | python mermaid_to_image.py - output.png
 
+  # Watch a directory and re-render diagrams on save
+  python mermaid_to_image.py diagrams/ output/ --watch
+
 Themes:
   default, forest, dark, neutral, base
         """
@@ -247,7 +944,7 @@ Themes:
     parser.add_argument('input', type=str,
                         help='Input file (.mmd), directory, or "-" for stdin')
     parser.add_argument('output', type=str,
-                        help='Output file or directory')
+                        help='Output file or directory, or "-" to write the image to stdout')
 
     # Rendering options
     parser.add_argument('--theme', '-t', choices=MermaidRenderer.VALID_THEMES,
@@ -264,13 +961,38 @@ Themes:
                         help='Path to custom Mermaid config file')
 
     # Batch options
-    parser.add_argument('--format', '-f', choices=MermaidRenderer.VALID_FORMATS,
-                        default='png', help='Output format for batch conversion (default: png)')
+    parser.add_argument('--format', '-f', type=parse_formats, default=['png'],
+                        help='Output format(s) for batch conversion and stdout output, comma-separated '
+                             '(e.g. png,svg: every format is exported from one render; default: png). '
+                             'With several formats, a single output file gets one file per format')
     parser.add_argument('--recursive', '-r', action='store_true',
                         help='Recursively process subdirectories')
+    parser.add_argument('--jsonl', action='store_true',
+                        help='Input is JSONL diagram records from extract_mermaid.py (file or "-")')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help='Concurrent renders for batch conversion (default: CPU count)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always re-render instead of reusing cached output of unchanged diagrams')
+    parser.add_argument('--cache-dir', type=Path,
+                        help='Render cache directory (default: $MERMAID_CACHE_DIR or user cache dir)')
+    parser.add_argument('--no-server', action='store_true',
+                        help='Render each diagram with its own mmdc process instead of the persistent render server')
+    parser.add_argument('--timeout', type=float, default=60,
+                        help='Seconds allowed per diagram (default: 60)')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and re-render .mmd files whenever they are saved')
+    parser.add_argument('--debounce', type=float, default=0.3,
+                        help='With --watch, seconds of quiet that end a burst of saves (default: 0.3)')
+    parser.add_argument('--poll', action='store_true',
+                        help='With --watch, poll for changes instead of using inotify')
 
     args = parser.parse_args()
 
+    if args.watch and (args.jsonl or '-' in (args.input, args.output)):
+        parser.error('--watch needs an input file or directory and an output path')
+
+    cache = None if args.no_cache else RenderCache(args.cache_dir)
+
     # Initialize renderer
     renderer = MermaidRenderer(
         theme=args.theme,
@@ -278,9 +1000,44 @@ Themes:
         width=args.width,
         height=args.height,
         scale=args.scale,
-        config_file=args.config
+        config_file=args.config,
+        use_server=not args.no_server,
+        cache=cache,
+        timeout=args.timeout
     )
 
+    # Handle JSONL diagram records
+    if args.jsonl:
+        source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+        with source:
+            records = [json.loads(line) for line in source if line.strip()]
+        success, total = renderer.batch_render_records(
+            records,
+            Path(args.output),
+            output_format=args.format,
+            jobs=args.jobs
+        )
+        sys.exit(0 if success == total else 1)
+
+    # Write the image to stdout without touching disk
+    if args.output == '-':
+        if len(args.format) > 1:
+            print("ERROR: Only one --format can be written to stdout", file=sys.stderr)
+            sys.exit(1)
+        try:
+            mermaid_code = sys.stdin.read() if args.input == '-' else Path(args.input).read_text(encoding='utf-8')
+        except OSError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+
+        data = renderer.render_bytes(mermaid_code, args.format[0])
+        if data is None:
+            print("❌ Failed", file=sys.stderr)
+            sys.exit(1)
+        sys.stdout.buffer.write(data)
+        sys.stdout.flush()
+        sys.exit(0)
+
     # Handle stdin input
     if args.input == '-':
         if not sys.stdin.isatty():
@@ -288,8 +1045,16 @@ Themes:
             output_path = Path(args.output)
             print(f"Rendering from stdin to {output_path}...")
 
-            if renderer.render_from_string(mermaid_code, output_path):
-                print(f"✅ Success: {output_path}")
+            if len(args.format) > 1:
+                outputs = [output_path.with_suffix(f'.{fmt}') for fmt in args.format]
+                rendered = renderer.render_to_files(mermaid_code, outputs)
+            else:
+                outputs = [output_path]
+                rendered = renderer.render_from_string(mermaid_code, output_path)
+
+            if rendered:
+                for output in outputs:
+                    print(f"✅ Success: {output}")
                 sys.exit(0)
             else:
                 print("❌ Failed", file=sys.stderr)
@@ -301,13 +1066,27 @@ Themes:
     input_path = Path(args.input)
     output_path = Path(args.output)
 
+    if args.watch and input_path.exists():
+        watch_and_render(
+            renderer,
+            input_path,
+            output_path,
+            args.format,
+            recursive=args.recursive,
+            jobs=args.jobs,
+            debounce=args.debounce,
+            poll=args.poll
+        )
+        sys.exit(0)
+
     # Handle directory (batch mode)
     if input_path.is_dir():
         success, total = renderer.batch_render(
             input_path,
             output_path,
             output_format=args.format,
-            recursive=args.recursive
+            recursive=args.recursive,
+            jobs=args.jobs
         )
         sys.exit(0 if success == total else 1)
 
@@ -318,9 +1097,17 @@ Themes:
         # Ensure output directory exists
         output_path.parent.mkdir(parents=True, exist_ok=True)
 
-        if renderer.render(input_path, output_path):
-            print(f"✅ Success: {output_path}")
-            print(f"   Size: {output_path.stat().st_size:,} bytes")
+        if len(args.format) > 1:
+            outputs = [output_path.with_suffix(f'.{fmt}') for fmt in args.format]
+            rendered = renderer.render_to_files(input_path, outputs)
+        else:
+            outputs = [output_path]
+            rendered = renderer.render(input_path, output_path)
+
+        if rendered:
+            for output in outputs:
+                print(f"✅ Success: {output}")
+                print(f"   Size: {output.stat().st_size:,} bytes")
             sys.exit(0)
         else:
             print("❌ Failed", file=sys.stderr)
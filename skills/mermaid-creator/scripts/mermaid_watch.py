@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Watch a docs tree for saved files.
+
+Used by the --watch modes of extract_mermaid.py and mermaid_to_image.py,
+which keep one process (and one warm renderer) alive and re-render only
+what changed after each save. On Linux changes are reported by inotify
+(through libc, no extra packages); elsewhere, or if inotify is unavailable,
+the watched files are polled by mtime and size.
+
+Bursts of events (an editor writing a temp file, renaming it and touching
+the directory; a `git checkout` rewriting many files) are debounced: a batch
+is reported once no further change arrived for the debounce interval.
+
+Usage:
+    watcher = FileWatcher([Path('docs')], suffixes=('.md',))
+    for changed in watcher.changes(debounce=0.3):
+        print(sorted(changed))  # files saved, created or deleted
+
+    # Print changes from the command line
+    python mermaid_watch.py docs/ --suffix .md --poll
+
+Requirements:
+    - Python 3.7+ (stdlib only, no external dependencies)
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct('iIII')
+
+# Directories never worth watching in a docs tree
+SKIP_DIRS = frozenset({'.git', '.hg', '.svn', 'node_modules', '__pycache__', '.venv', 'venv'})
+
+
+class FileWatcher:
+    """
+    Report files that changed under a set of paths.
+
+    Only files whose suffix is in suffixes are reported. A watched path may
+    be a directory (watched recursively unless recursive is False) or a
+    single file (its directory is watched and other files are ignored).
+    """
+
+    def __init__(
+        self,
+        paths: Iterable[Path],
+        suffixes: Tuple[str, ...] = ('.md',),
+        recursive: bool = True,
+        poll_interval: float = 1.0,
+        use_inotify: bool = True
+    ):
+        """
+        Initialize watcher.
+
+        Args:
+            paths: Directories and files to watch
+            suffixes: File suffixes to report (e.g. ('.md',))
+            recursive: Watch subdirectories of watched directories
+            poll_interval: Seconds between scans when polling
+            use_inotify: Use inotify when available (False forces polling)
+        """
+        self.paths = [Path(p) for p in paths]
+        self.suffixes = tuple(s.lower() for s in suffixes)
+        self.recursive = recursive
+        self.poll_interval = poll_interval
+        self.files = {p.resolve() for p in self.paths if p.is_file()}
+        self._fd: Optional[int] = None
+        self._dirs: Dict[int, Path] = {}
+        # True when more inotify events were already queued after a read
+        self._pending = False
+        self._snapshot: Dict[Path, Tuple[int, int]] = {}
+
+        if use_inotify and sys.platform.startswith('linux'):
+            self._fd = _inotify_init()
+        if self._fd is not None:
+            for root in self._roots():
+                self._add_tree(root)
+        else:
+            self._snapshot = self._scan()
+
+    @property
+    def backend(self) -> str:
+        return 'inotify' if self._fd is not None else 'polling'
+
+    def changes(self, debounce: float = 0.3) -> Iterator[Set[Path]]:
+        """
+        Yield sets of changed files, forever.
+
+        Each set holds the files saved, created or deleted during one burst
+        of activity; it is yielded after debounce seconds without events.
+        """
+        while True:
+            if self._fd is not None:
+                changed = self._read_inotify(None)
+                while True:
+                    more = self._read_inotify(debounce)
+                    if not more and not self._pending:
+                        break
+                    changed |= more
+            else:
+                changed = self._poll_until_change()
+                while True:
+                    time.sleep(debounce)
+                    more = self._poll_once()
+                    if not more:
+                        break
+                    changed |= more
+            if changed:
+                yield changed
+
+    def close(self):
+        """Release the inotify descriptor."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self) -> 'FileWatcher':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _roots(self) -> List[Path]:
+        roots = []
+        for path in self.paths:
+            root = path if path.is_dir() else path.parent
+            if root not in roots:
+                roots.append(root)
+        return roots
+
+    def _wanted(self, path: Path) -> bool:
+        if path.suffix.lower() not in self.suffixes:
+            return False
+        if self.files and not any(p.is_dir() for p in self.paths):
+            return path.resolve() in self.files
+        return True
+
+    # Polling backend
+
+    def _scan(self) -> Dict[Path, Tuple[int, int]]:
+        snapshot = {}
+        for root in self._roots():
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS] if self.recursive else []
+                for name in filenames:
+                    path = Path(dirpath) / name
+                    if not self._wanted(path):
+                        continue
+                    try:
+                        stat = path.stat()
+                    except OSError:
+                        continue
+                    snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def _poll_once(self) -> Set[Path]:
+        snapshot = self._scan()
+        changed = {p for p, sig in snapshot.items() if self._snapshot.get(p) != sig}
+        changed |= set(self._snapshot) - set(snapshot)
+        self._snapshot = snapshot
+        return changed
+
+    def _poll_until_change(self) -> Set[Path]:
+        while True:
+            changed = self._poll_once()
+            if changed:
+                return changed
+            time.sleep(self.poll_interval)
+
+    # inotify backend
+
+    def _add_tree(self, root: Path) -> Set[Path]:
+        """Watch root (and its subdirectories); return the wanted files in them."""
+        found = set()
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS] if self.recursive else []
+            wd = _inotify_add_watch(self._fd, dirpath, WATCH_MASK)
+            if wd >= 0:
+                self._dirs[wd] = Path(dirpath)
+            found.update(Path(dirpath) / name for name in filenames if self._wanted(Path(dirpath) / name))
+        return found
+
+    def _read_inotify(self, timeout: Optional[float]) -> Set[Path]:
+        """Wait up to timeout (None: forever) for events; return the files they touch."""
+        self._pending = False
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].split(b'\0', 1)[0].decode('utf-8', 'surrogateescape')
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped: report everything that is watched
+                for root in self._roots():
+                    changed |= self._add_tree(root)
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = directory / name
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and self.recursive and name not in SKIP_DIRS:
+                    changed |= self._add_tree(path)
+                continue
+            if self._wanted(path):
+                changed.add(path)
+        # Another read may already be waiting (large bursts span several reads)
+        self._pending = bool(select.select([self._fd], [], [], 0)[0])
+        return changed
+
+
+_libc = None
+
+
+def _inotify_init() -> Optional[int]:
+    """Return an inotify descriptor, or None if inotify is unavailable."""
+    global _libc
+    try:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    return fd if fd >= 0 else None
+
+
+def _inotify_add_watch(fd: int, path: str, mask: int) -> int:
+    return _libc.inotify_add_watch(fd, os.fsencode(path), ctypes.c_uint32(mask))
+
+
+def watch_loop(
+    watcher: FileWatcher,
+    on_change: Callable[[List[Path]], None],
+    debounce: float = 0.3
+):
+    """
+    Call on_change with each debounced batch of changed files until Ctrl+C.
+
+    Deleted files are included; on_change checks existence itself.
+    """
+    targets = ', '.join(str(p) for p in watcher.paths)
+    print(f"\n👀 Watching {targets} ({watcher.backend}, Ctrl+C to stop)", flush=True)
+    try:
+        for changed in watcher.changes(debounce):
+            print(f"\n🔄 {len(changed)} file(s) changed at {time.strftime('%H:%M:%S')}", flush=True)
+            started = time.perf_counter()
+            on_change(sorted(changed))
+            print(f"   Done in {time.perf_counter() - started:.2f}s", flush=True)
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+    finally:
+        watcher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print files as they change under a docs tree')
+    parser.add_argument('paths', nargs='+', type=Path, help='Directories or files to watch')
+    parser.add_argument('--suffix', action='append', default=None,
+                        help='File suffix to report (repeatable, default: .md)')
+    parser.add_argument('--debounce', type=float, default=0.3,
+                        help='Seconds of quiet that end a burst of changes (default: 0.3)')
+    parser.add_argument('--poll', action='store_true', help='Poll instead of using inotify')
+    args = parser.parse_args()
+
+    missing = [p for p in args.paths if not p.exists()]
+    if missing:
+        print(f"ERROR: Not found: {missing[0]}", file=sys.stderr)
+        sys.exit(1)
+
+    def report(changed: List[Path]):
+        for path in changed:
+            print(f"  {'✓' if path.exists() else '✗ deleted:'} {path}")
+
+    watcher = FileWatcher(args.paths, suffixes=tuple(args.suffix or ['.md']), use_inotify=not args.poll)
+    watch_loop(watcher, report, args.debounce)
+
+
+if __name__ == '__main__':
+    main()
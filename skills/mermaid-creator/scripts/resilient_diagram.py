@@ -27,22 +27,46 @@ Usage:
     cat diagram.mmd | python resilient_diagram.py --stdin \\
         --markdown-file doc --diagram-num 2 --title "flow" --json
 
+    # Oversized flowcharts render per subgraph plus an index image
+    # (--no-chunk renders them whole with raised maxTextSize/maxEdges)
+    python resilient_diagram.py --mmd-file huge.mmd --json
+
+    # Append per-stage timings to a JSONL metrics log
+    python resilient_diagram.py --mmd-file diagram.mmd --metrics-file metrics.jsonl
+
+    # From asyncio code
+    result = await ResilientDiagramGenerator().agenerate(
+        code, "design_doc", 1, "overview", Path("diagrams"), timeout=30)
+
 Requirements:
     - mermaid-cli (npm install -g @mermaid-js/mermaid-cli)
     - Python 3.7+ (stdlib only, no external dependencies)
+
+Environment:
+    MERMAID_METRICS_FILE  Default for --metrics-file
 """
 
 import argparse
+import asyncio
+import hashlib
 import json
+import math
 import os
 import re
+import shutil
 import subprocess
 import sys
 import tempfile
-from dataclasses import dataclass, asdict, field
+import time
+from dataclasses import dataclass, asdict, field, replace
 from enum import Enum
 from pathlib import Path
-from typing import Optional, List, Dict, Tuple, Any
+from typing import Optional, List, Dict, Tuple, Any, Union
+
+from mermaid_cli import arun_mmdc, check_mmdc_installed, mmdc_command, parse_formats
+from mermaid_complexity import estimate_complexity, limits_config_file, render_limits, split_flowchart
+from mermaid_render_cache import RenderCache, default_cache_dir
+from mermaid_render_server import RenderServerError, RenderServerUnavailable, get_shared_server
 
 
 class DiagramType(Enum):
@@ -63,6 +87,50 @@ class DiagramType(Enum):
     UNKNOWN = "unknown"
 
 
+# Diagram headers as one alternation with a named group per DiagramType
+# value, tried in order, so detection is a single precompiled match.
+# [^\S\n] is whitespace other than a newline: matches never leave the header line
+DIAGRAM_TYPE_PATTERN = re.compile(
+    r'(?P<flowchart>(?:flowchart|graph)[^\S\n]+(?:TB|TD|BT|RL|LR))'
+    r'|(?P<sequence>sequenceDiagram)'
+    r'|(?P<class>classDiagram)'
+    r'|(?P<state>stateDiagram(?:-v2)?)'
+    r'|(?P<er>erDiagram)'
+    r'|(?P<gantt>gantt)'
+    r'|(?P<pie>pie)'
+    r'|(?P<mindmap>mindmap)'
+    r'|(?P<timeline>timeline)'
+    r'|(?P<quadrant>quadrantChart)'
+    r'|(?P<requirement>requirementDiagram)'
+    r'|(?P<journey>journey)'
+    r'|(?P<c4>C4(?:Context|Container|Component|Deployment))',
+    re.IGNORECASE
+)
+
+# Start of the first line that is neither blank nor a %% comment
+FIRST_LINE_PATTERN = re.compile(r'^[^\S\n]*(?!%%)(?=\S)', re.MULTILINE)
+
+
+def detect_diagram_type(mermaid_code: str) -> DiagramType:
+    """
+    Detect diagram type from Mermaid code.
+
+    Only the first non-blank, non-comment line is examined, in place: the
+    code is never split or copied, so tagging every scanned diagram is cheap.
+
+    Args:
+        mermaid_code: Raw Mermaid diagram code
+
+    Returns:
+        DiagramType enum value
+    """
+    first_line = FIRST_LINE_PATTERN.search(mermaid_code)
+    if first_line is None:
+        return DiagramType.UNKNOWN
+    match = DIAGRAM_TYPE_PATTERN.match(mermaid_code, first_line.end())
+    return DiagramType(match.lastgroup) if match else DiagramType.UNKNOWN
+
+
 @dataclass
 class TroubleshootingMatch:
     """A matching entry from troubleshooting guide."""
@@ -74,6 +142,7 @@ class TroubleshootingMatch:
     incorrect_example: str
     correct_example: str
     error_messages: List[str]
+    score: float = 0.0
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -82,10 +151,25 @@ class TroubleshootingMatch:
             "severity": self.severity,
             "diagram_types": self.diagram_types,
             "problem": self.problem,
-            "correct_example": self.correct_example
+            "correct_example": self.correct_example,
+            "score": self.score
         }
 
 
+@dataclass
+class RenderAttempt:
+    """One render (or auto-repair) attempt within generate()."""
+    attempt: int
+    fixes: List[str]
+    rendered: bool
+    success: bool
+    error_message: Optional[str]
+    duration_ms: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
 @dataclass
 class DiagramResult:
     """Result of diagram generation attempt."""
@@ -97,22 +181,176 @@ class DiagramResult:
     troubleshooting_matches: List[Dict] = field(default_factory=list)
     suggested_fix: Optional[str] = None
     search_recommendation: Optional[str] = None
+    attempts: List[Dict] = field(default_factory=list)
+    repaired: bool = False
+    # Wall-clock milliseconds per workflow stage, in execution order
+    timings: Dict[str, float] = field(default_factory=dict)
+    # Every rendered image by format; image_path is the first requested format
+    image_paths: Dict[str, str] = field(default_factory=dict)
+    # Node/edge counts measured before rendering, and the limits used
+    complexity: Dict[str, Any] = field(default_factory=dict)
+    # Subgraph partials of a chunked flowchart (image_paths is then the index)
+    parts: List[Dict[str, Any]] = field(default_factory=list)
 
     def to_dict(self) -> Dict[str, Any]:
         return {
             "success": self.success,
             "mmd_path": self.mmd_path,
             "image_path": self.image_path,
+            "image_paths": self.image_paths,
             "diagram_type": self.diagram_type,
             "error_message": self.error_message,
             "troubleshooting_matches": self.troubleshooting_matches,
             "suggested_fix": self.suggested_fix,
-            "search_recommendation": self.search_recommendation
+            "search_recommendation": self.search_recommendation,
+            "attempts": self.attempts,
+            "repaired": self.repaired,
+            "timings": self.timings,
+            "complexity": self.complexity,
+            "parts": self.parts
+        }
+
+    def metrics_record(self, image_format: str) -> Dict[str, Any]:
+        """Compact record of this result for the metrics log."""
+        return {
+            "timestamp": round(time.time(), 3),
+            "diagram_type": self.diagram_type,
+            "format": image_format,
+            "success": self.success,
+            "repaired": self.repaired,
+            "attempts": len(self.attempts),
+            "error": self.error_message.strip().splitlines()[0][:200] if self.error_message else None,
+            "complexity": self.complexity,
+            "parts": len(self.parts),
+            "timings": self.timings
         }
 
 
+def append_metrics(metrics_file: Path, record: Dict[str, Any]):
+    """
+    Append one JSON record to a JSONL metrics file.
+
+    The line is written with a single O_APPEND write, so concurrent
+    processes sharing the file do not interleave records.
+    """
+    line = (json.dumps(record) + '\n').encode('utf-8')
+    metrics_file.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(metrics_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+def _lap(timings: Dict[str, float], stage: str, started: float) -> float:
+    """Record the milliseconds since started under stage; return the current time."""
+    now = time.perf_counter()
+    timings[stage] = round((now - started) * 1000, 3)
+    return now
+
+
+# Noise stripped from mmdc errors before matching them against the guide
+ANSI_ESCAPE_PATTERN = re.compile(r'\x1b\[[0-9;?]*[ -/]*[@-~]')
+STACK_FRAME_PATTERN = re.compile(r'^\s*at .*$', re.MULTILINE)
+FILE_PATH_PATTERN = re.compile(r'(?:[a-zA-Z]:|file://)?(?:[\\/][\w.@~%+-]+){2,}(?::\d+)*')
+NUMBER_PATTERN = re.compile(r'\d+')
+TOKEN_PATTERN = re.compile(r'[a-z][a-z0-9_]+')
+MAX_ERROR_CHARS = 2000
+
+# English stop words plus vocabulary shared by every Mermaid parser error
+STOP_WORDS = frozenset(
+    'a an and are as at be by for from in into is it its not of on or so '
+    'that the this to was were when with you your x '
+    'error parse line expecting got'.split()
+)
+
+
+def normalize_error(error_message: str) -> str:
+    """
+    Normalize an error message for matching.
+
+    Removes ANSI color codes, stack frames, file paths and numbers (so
+    "line 12" and "line X" compare equal), collapses whitespace, lowercases
+    and truncates long stack traces to MAX_ERROR_CHARS.
+    """
+    text = ANSI_ESCAPE_PATTERN.sub('', error_message)
+    text = STACK_FRAME_PATTERN.sub('', text)
+    text = FILE_PATH_PATTERN.sub(' ', text)
+    text = NUMBER_PATTERN.sub('x', text)
+    text = re.sub(r'\s+', ' ', text).strip().lower()
+    return text[:MAX_ERROR_CHARS]
+
+
+def tokenize_error(text: str) -> List[str]:
+    """Split text into lowercase search tokens, dropping stop words."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+class _SubstringMatcher:
+    """
+    Aho-Corasick automaton reporting which patterns occur in a text.
+
+    Every pattern is found in a single pass over the text, so looking up all
+    known error messages and keywords costs the same as scanning the error
+    once instead of once per pattern.
+    """
+
+    def __init__(self, patterns: List[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        self.patterns = patterns
+
+        for pattern_id, pattern in enumerate(patterns):
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(pattern_id)
+
+        # Breadth-first construction of failure links
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text: str) -> set:
+        """Return the ids of all patterns that occur in text."""
+        found = set()
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
 class TroubleshootingParser:
-    """Parse troubleshooting.md into searchable entries."""
+    """
+    Parse troubleshooting.md into searchable entries.
+
+    Parsing the guide and building its search index happens once; the result
+    is persisted next to the render cache and reused until the guide changes
+    (detected by mtime and size, confirmed with a content hash).
+    """
+
+    INDEX_VERSION = 2
 
     # Pattern to match error sections
     ERROR_PATTERN = re.compile(
@@ -127,25 +365,170 @@ class TroubleshootingParser:
         re.DOTALL
     )
 
-    def __init__(self, troubleshooting_path: Path):
+    # Pattern to find the reserved word list of the "Reserved Words" error
+    RESERVED_WORDS_PATTERN = re.compile(
+        r'\*\*Reserved Words Include:\*\*\s*\n((?:- .+\n?)+)'
+    )
+
+    # Per-section patterns
+    SECTION_SPLIT_PATTERN = re.compile(r'(?=### ❌ Error \d+:)')
+    HEADER_PATTERN = re.compile(r'### ❌ Error (\d+): (.+)')
+    SEVERITY_PATTERN = re.compile(r'\*\*Severity:\*\* (🔴|🟠|🟡|🟢) (\w+)')
+    PROBLEM_PATTERN = re.compile(r'\*\*Problem:\*\* (.+?)(?:\n\n|\*\*)', re.DOTALL)
+    TYPES_PATTERN = re.compile(r'\*\*Diagram Types Affected:\*\* (.+)')
+    ERROR_MESSAGES_PATTERN = re.compile(r'\*\*Error Message[s]?:\*\*\s*\n((?:- `.+`\n?)+)')
+    INLINE_MESSAGE_PATTERN = re.compile(r'\*\*Error Message:\*\*\s*`?(.+?)`?\n')
+    BACKTICK_PATTERN = re.compile(r'`(.+)`')
+    RESERVED_WORD_PATTERN = re.compile(r'`([^`]+)`')
+
+    SECTION_HEADING_PATTERN = re.compile(r'^## (.+)$', re.MULTILINE)
+
+    # BM25 parameters and per-field term weights
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+    FIELD_WEIGHTS = {
+        'title': 3.0,
+        'error_messages': 3.0,
+        'problem': 1.5,
+        'incorrect_example': 0.5,
+        'correct_example': 0.25,
+    }
+
+    # Score added for a known error message found verbatim in the error
+    EXACT_MESSAGE_BONUS = 8.0
+    # Score added when the entry applies to the failing diagram type
+    TYPE_BONUS = 1.5
+    ALL_TYPES_BONUS = 0.5
+    # Raw score mapped to a confidence of 0.5 (confidence = s / (s + half))
+    SCORE_HALF_POINT = 8.0
+
+    # Parsed guides shared by every parser in this process
+    _memo: Dict[Tuple[str, int, int], Dict[str, Any]] = {}
+
+    def __init__(self, troubleshooting_path: Path, index_path: Optional[Path] = None):
+        """
+        Initialize parser.
+
+        Args:
+            troubleshooting_path: Path to troubleshooting.md
+            index_path: Persisted index file (default: next to the render cache;
+                MERMAID_NO_INDEX_CACHE=1 disables persistence)
+        """
         self.path = troubleshooting_path
+        self.index_path = index_path or self._default_index_path()
         self.entries: List[TroubleshootingMatch] = []
+        self.reserved_words: List[str] = []
+        self._index: Dict[str, Any] = {}
+        self._matcher: Optional[_SubstringMatcher] = None
         if self.path and self.path.exists():
-            self._parse()
+            self._load()
+
+    def _default_index_path(self) -> Optional[Path]:
+        if not self.path or os.environ.get('MERMAID_NO_INDEX_CACHE'):
+            return None
+        path_hash = hashlib.sha256(str(Path(self.path).resolve()).encode('utf-8')).hexdigest()[:16]
+        return default_cache_dir().parent / f"troubleshooting-{path_hash}.json"
+
+    def _load(self):
+        """Load entries and index from memory, the index file, or by parsing."""
+        stat = self.path.stat()
+        memo_key = (str(self.path.resolve()), stat.st_mtime_ns, stat.st_size)
+        data = self._memo.get(memo_key)
+
+        if data is None:
+            data = self._read_index_file(stat)
+        if data is None:
+            content = self.path.read_text(encoding='utf-8')
+            data = self._read_index_file(stat, content)
+            if data is None:
+                data = self._build(content, stat)
+                self._write_index_file(data)
+
+        if 'matcher' not in data:
+            data['matcher'] = _SubstringMatcher(data['index']['patterns'])
+            self._memo[memo_key] = data
+        self.entries = [TroubleshootingMatch(**entry) for entry in data['entries']]
+        self.reserved_words = list(data['reserved_words'])
+        self._index = data['index']
+        self._matcher = data['matcher']
+
+    def _read_index_file(self, stat: os.stat_result, content: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Return the persisted index if it is still valid for the guide.
 
-    def _parse(self):
-        """Parse the troubleshooting.md file."""
-        content = self.path.read_text(encoding='utf-8')
+        Without content only mtime and size are compared; with content the
+        stored hash decides (so a touched but unchanged guide is not re-parsed).
+        """
+        if not self.index_path:
+            return None
+        try:
+            data = json.loads(self.index_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != self.INDEX_VERSION:
+            return None
+
+        if content is None:
+            if data.get('mtime_ns') != stat.st_mtime_ns or data.get('size') != stat.st_size:
+                return None
+        elif data.get('sha256') != hashlib.sha256(content.encode('utf-8')).hexdigest():
+            return None
+        else:
+            data['mtime_ns'] = stat.st_mtime_ns
+            data['size'] = stat.st_size
+            self._write_index_file(data)
+        return data
+
+    def _write_index_file(self, data: Dict[str, Any]):
+        if not self.index_path:
+            return
+        persisted = {key: value for key, value in data.items() if key != 'matcher'}
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=self.index_path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(persisted, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_name, self.index_path)
+        except OSError:
+            pass
+
+    def _build(self, content: str, stat: os.stat_result) -> Dict[str, Any]:
+        """Parse the guide and build its search index."""
+        reserved_words: List[str] = []
+        reserved_match = self.RESERVED_WORDS_PATTERN.search(content)
+        if reserved_match:
+            reserved_words = self.RESERVED_WORD_PATTERN.findall(reserved_match.group(1))
+
+        entries = self._parse(content)
+        return {
+            'version': self.INDEX_VERSION,
+            'guide': str(self.path),
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': hashlib.sha256(content.encode('utf-8')).hexdigest(),
+            'entries': [asdict(entry) for entry in entries],
+            'reserved_words': reserved_words,
+            'index': self._build_index(entries),
+        }
+
+    def _parse(self, content: str) -> List[TroubleshootingMatch]:
+        """Parse troubleshooting.md content into entries."""
+        entries = []
+        heading = ""
 
         # Split by error sections
-        sections = re.split(r'(?=### ❌ Error \d+:)', content)
+        for section in self.SECTION_SPLIT_PATTERN.split(content):
+            section_heading = heading
+            headings = self.SECTION_HEADING_PATTERN.findall(section)
+            if headings:
+                # A "## ..." heading at the end of a section opens the next group
+                heading = headings[-1].strip()
 
-        for section in sections:
             if not section.strip() or '### ❌ Error' not in section:
                 continue
 
             # Extract error number and title
-            header_match = re.search(r'### ❌ Error (\d+): (.+)', section)
+            header_match = self.HEADER_PATTERN.search(section)
             if not header_match:
                 continue
 
@@ -153,20 +536,23 @@ class TroubleshootingParser:
             title = header_match.group(2).strip()
 
             # Extract severity
-            severity_match = re.search(r'\*\*Severity:\*\* (🔴|🟠|🟡|🟢) (\w+)', section)
+            severity_match = self.SEVERITY_PATTERN.search(section)
             severity = severity_match.group(2) if severity_match else "Unknown"
 
             # Extract problem description
-            problem_match = re.search(r'\*\*Problem:\*\* (.+?)(?:\n\n|\*\*)', section, re.DOTALL)
+            problem_match = self.PROBLEM_PATTERN.search(section)
             problem = problem_match.group(1).strip() if problem_match else ""
 
             # Extract diagram types affected
-            types_match = re.search(r'\*\*Diagram Types Affected:\*\* (.+)', section)
+            types_match = self.TYPES_PATTERN.search(section)
             diagram_types = []
             if types_match:
                 types_text = types_match.group(1)
                 # Parse types like "All diagrams", "Flowcharts, state diagrams"
                 diagram_types = [t.strip().lower() for t in types_text.split(',')]
+            elif section_heading:
+                # Otherwise the entry applies to its group, e.g. "Sequence Diagrams"
+                diagram_types = [section_heading.lower()]
 
             # Extract incorrect/correct examples
             incorrect = ""
@@ -181,19 +567,19 @@ class TroubleshootingParser:
 
             # Extract error messages
             error_messages = []
-            error_msg_match = re.search(r'\*\*Error Message[s]?:\*\*\s*\n((?:- `.+`\n?)+)', section)
+            error_msg_match = self.ERROR_MESSAGES_PATTERN.search(section)
             if error_msg_match:
                 for line in error_msg_match.group(1).split('\n'):
-                    msg_match = re.search(r'`(.+)`', line)
+                    msg_match = self.BACKTICK_PATTERN.search(line)
                     if msg_match:
                         error_messages.append(msg_match.group(1))
 
             # Also look for inline error messages
-            inline_msg = re.search(r'\*\*Error Message:\*\*\s*`?(.+?)`?\n', section)
+            inline_msg = self.INLINE_MESSAGE_PATTERN.search(section)
             if inline_msg and not error_messages:
                 error_messages.append(inline_msg.group(1).strip('`'))
 
-            entry = TroubleshootingMatch(
+            entries.append(TroubleshootingMatch(
                 error_number=error_num,
                 title=title,
                 severity=severity,
@@ -202,59 +588,121 @@ class TroubleshootingParser:
                 incorrect_example=incorrect,
                 correct_example=correct,
                 error_messages=error_messages
-            )
-            self.entries.append(entry)
+            ))
+
+        return entries
+
+    def _build_index(self, entries: List[TroubleshootingMatch]) -> Dict[str, Any]:
+        """
+        Build the BM25 index used by search().
+
+        Each entry is a document whose fields are weighted (FIELD_WEIGHTS);
+        postings store the precomputed BM25 term weight of every token in
+        every entry, so a query only sums postings. Known error messages are
+        kept as exact phrases, and diagram-type bonuses are precomputed.
+        """
+        documents: List[Dict[str, float]] = []
+        for entry in entries:
+            term_freqs: Dict[str, float] = {}
+            for field_name, weight in self.FIELD_WEIGHTS.items():
+                value = getattr(entry, field_name)
+                text = ' '.join(value) if isinstance(value, list) else value
+                for token in tokenize_error(text):
+                    term_freqs[token] = term_freqs.get(token, 0.0) + weight
+            documents.append(term_freqs)
+
+        doc_count = len(documents)
+        lengths = [sum(doc.values()) for doc in documents]
+        avg_length = (sum(lengths) / doc_count) if doc_count else 1.0
+        doc_freqs: Dict[str, int] = {}
+        for doc in documents:
+            for token in doc:
+                doc_freqs[token] = doc_freqs.get(token, 0) + 1
+
+        k1, b = self.BM25_K1, self.BM25_B
+        postings: Dict[str, List[List[float]]] = {}
+        for entry_id, doc in enumerate(documents):
+            norm = k1 * (1 - b + b * lengths[entry_id] / avg_length)
+            for token, tf in doc.items():
+                df = doc_freqs[token]
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                weight = idf * tf * (k1 + 1) / (tf + norm)
+                postings.setdefault(token, []).append([entry_id, round(weight, 4)])
+
+        patterns: List[str] = []
+        exact: Dict[str, List[int]] = {}
+        for entry_id, entry in enumerate(entries):
+            for known_error in entry.error_messages:
+                phrase = normalize_error(known_error)
+                if phrase not in patterns:
+                    patterns.append(phrase)
+                exact.setdefault(str(patterns.index(phrase)), []).append(entry_id)
+
+        types: Dict[str, Dict[str, float]] = {}
+        for entry_id, entry in enumerate(entries):
+            type_words = set(re.findall(r'[a-z0-9]+', ' '.join(entry.diagram_types)))
+            for diagram_type in DiagramType:
+                if any(word.startswith(diagram_type.value) for word in type_words):
+                    bonus = self.TYPE_BONUS
+                elif 'all' in type_words:
+                    bonus = self.ALL_TYPES_BONUS
+                else:
+                    continue
+                types.setdefault(diagram_type.value, {})[str(entry_id)] = bonus
+
+        return {
+            'postings': postings,
+            'patterns': patterns,
+            'exact': exact,
+            'types': types,
+        }
 
     def search(self, error_message: str, diagram_type: DiagramType) -> List[TroubleshootingMatch]:
         """
         Search for matching troubleshooting entries.
 
+        The error is normalized (ANSI codes, stack frames, file paths and
+        numbers removed, then truncated) and scored against every entry with
+        BM25, plus a bonus for known error messages found verbatim and for
+        entries that apply to the diagram type.
+
         Args:
             error_message: Error message from mmdc
             diagram_type: Type of diagram that failed
 
         Returns:
-            List of matching entries, ranked by relevance
+            List of matching entries, ranked by relevance, with score set to
+            a calibrated confidence in [0, 1)
         """
-        matches = []
-        error_lower = error_message.lower()
-        type_name = diagram_type.value.lower()
+        if not self.entries:
+            return []
 
-        for entry in self.entries:
-            score = 0
-
-            # Check error message matches
-            for known_error in entry.error_messages:
-                if known_error.lower() in error_lower:
-                    score += 10
-                elif any(word in error_lower for word in known_error.lower().split()):
-                    score += 3
+        index = self._index
+        normalized = normalize_error(error_message)
+        scores: Dict[int, float] = {}
 
-            # Check diagram type matches
-            if "all" in ' '.join(entry.diagram_types).lower():
-                score += 2
-            elif any(type_name in t for t in entry.diagram_types):
-                score += 5
+        for token in set(tokenize_error(normalized)):
+            for entry_id, weight in index['postings'].get(token, ()):
+                scores[entry_id] = scores.get(entry_id, 0.0) + weight
 
-            # Check problem keywords
-            problem_keywords = entry.problem.lower().split()
-            for keyword in ['reserved', 'missing', 'invalid', 'incorrect', 'error', 'syntax']:
-                if keyword in error_lower and keyword in problem_keywords:
-                    score += 2
+        for pattern in self._matcher.find(normalized):
+            for entry_id in index['exact'].get(str(pattern), ()):
+                scores[entry_id] = scores.get(entry_id, 0.0) + self.EXACT_MESSAGE_BONUS
 
-            # Check title keywords
-            title_keywords = entry.title.lower().split()
-            for keyword in title_keywords:
-                if keyword in error_lower:
-                    score += 2
+        for entry_id, bonus in index['types'].get(diagram_type.value, {}).items():
+            entry_id = int(entry_id)
+            scores[entry_id] = scores.get(entry_id, 0.0) + bonus
 
-            if score > 0:
-                matches.append((score, entry))
-
-        # Sort by score descending
-        matches.sort(key=lambda x: x[0], reverse=True)
+        # Sort by score descending, ties in guide order
+        matches = sorted(
+            ((score, entry_id) for entry_id, score in scores.items() if score > 0),
+            key=lambda x: (-x[0], x[1])
+        )
 
-        return [entry for _, entry in matches[:5]]  # Return top 5 matches
+        return [
+            replace(self.entries[entry_id], score=round(score / (score + self.SCORE_HALF_POINT), 3))
+            for score, entry_id in matches[:5]  # Return top 5 matches
+        ]
 
 
 class ResilientDiagramGenerator:
@@ -270,33 +718,22 @@ class ResilientDiagramGenerator:
     6. Return structured result with recovery info
     """
 
-    # Patterns to detect diagram type from first line
-    DIAGRAM_TYPE_PATTERNS = {
-        DiagramType.FLOWCHART: [
-            r'^flowchart\s+(TB|TD|BT|RL|LR)',
-            r'^graph\s+(TB|TD|BT|RL|LR)',
-        ],
-        DiagramType.SEQUENCE: [r'^sequenceDiagram'],
-        DiagramType.CLASS: [r'^classDiagram'],
-        DiagramType.STATE: [r'^stateDiagram(-v2)?'],
-        DiagramType.ER: [r'^erDiagram'],
-        DiagramType.GANTT: [r'^gantt'],
-        DiagramType.PIE: [r'^pie'],
-        DiagramType.MINDMAP: [r'^mindmap'],
-        DiagramType.TIMELINE: [r'^timeline'],
-        DiagramType.QUADRANT: [r'^quadrantChart'],
-        DiagramType.REQUIREMENT: [r'^requirementDiagram'],
-        DiagramType.JOURNEY: [r'^journey'],
-        DiagramType.C4: [r'^C4Context', r'^C4Container', r'^C4Component', r'^C4Deployment'],
-    }
+    # Below this troubleshooting confidence also recommend an external search
+    MIN_MATCH_CONFIDENCE = 0.25
 
-    def __init__(self, troubleshooting_path: Optional[Path] = None):
+    def __init__(
+        self,
+        troubleshooting_path: Optional[Path] = None,
+        cache: Optional[RenderCache] = None
+    ):
         """
         Initialize generator.
 
         Args:
             troubleshooting_path: Path to troubleshooting.md guide (auto-detected if not provided)
+            cache: Render cache to reuse output of unchanged diagrams (None disables)
         """
+        self.cache = cache
         self.troubleshooting_path = troubleshooting_path or self._find_troubleshooting_guide()
         self.troubleshooting = TroubleshootingParser(self.troubleshooting_path) if self.troubleshooting_path else None
 
@@ -316,21 +753,7 @@ class ResilientDiagramGenerator:
         Returns:
             DiagramType enum value
         """
-        # Get first non-empty, non-comment line
-        lines = mermaid_code.strip().split('\n')
-        first_line = ""
-        for line in lines:
-            stripped = line.strip()
-            if stripped and not stripped.startswith('%%'):
-                first_line = stripped
-                break
-
-        for diagram_type, patterns in self.DIAGRAM_TYPE_PATTERNS.items():
-            for pattern in patterns:
-                if re.match(pattern, first_line, re.IGNORECASE):
-                    return diagram_type
-
-        return DiagramType.UNKNOWN
+        return detect_diagram_type(mermaid_code)
 
     def generate_filename(
         self,
@@ -391,7 +814,9 @@ class ResilientDiagramGenerator:
     def render_image(
         self,
         mmd_path: Path,
-        image_format: str = "png"
+        image_format: str = "png",
+        timeout: float = 60,
+        config_file: Optional[Path] = None
     ) -> Tuple[bool, Optional[Path], Optional[str]]:
         """
         Render diagram to image using mmdc.
@@ -399,53 +824,233 @@ class ResilientDiagramGenerator:
         Args:
             mmd_path: Path to .mmd file
             image_format: Output format (png, svg, pdf)
+            timeout: Seconds allowed for mmdc
+            config_file: Mermaid config file (e.g. raised limits from limits_config_file())
 
         Returns:
             Tuple of (success, image_path, error_message)
         """
         image_path = mmd_path.with_suffix(f".{image_format}")
+        cache_key, hit = self._lookup_cache(mmd_path, image_path, image_format, config_file)
+        if hit:
+            return True, image_path, None
 
         # Check mmdc is installed
-        if not self._check_mmdc_installed():
+        if not check_mmdc_installed():
             return False, None, "mmdc not found. Install with: npm install -g @mermaid-js/mermaid-cli"
 
         try:
             result = subprocess.run(
-                ['mmdc', '-i', str(mmd_path), '-o', str(image_path), '-b', 'transparent'],
+                mmdc_command() + self._mmdc_args(mmd_path, image_path, config_file),
                 capture_output=True,
                 text=True,
-                timeout=60
+                timeout=timeout
             )
+            return self._finish_render(result.returncode, result.stderr, result.stdout, image_path, cache_key)
 
-            if result.returncode != 0:
-                error_msg = result.stderr.strip() or result.stdout.strip() or "Unknown rendering error"
-                return False, None, error_msg
-
-            if not image_path.exists():
-                return False, None, f"Output file not created: {image_path}"
+        except subprocess.TimeoutExpired:
+            return False, None, f"Rendering timed out after {timeout:g} seconds"
+        except Exception as e:
+            return False, None, str(e)
 
-            if image_path.stat().st_size == 0:
-                return False, None, f"Output file is empty: {image_path}"
+    async def arender_image(
+        self,
+        mmd_path: Path,
+        image_format: str = "png",
+        timeout: float = 60,
+        config_file: Optional[Path] = None
+    ) -> Tuple[bool, Optional[Path], Optional[str]]:
+        """
+        Asynchronously render diagram to image (see render_image).
 
+        mmdc runs as an asyncio subprocess and is killed if the timeout
+        expires or the awaiting task is cancelled.
+        """
+        image_path = mmd_path.with_suffix(f".{image_format}")
+        cache_key, hit = self._lookup_cache(mmd_path, image_path, image_format, config_file)
+        if hit:
             return True, image_path, None
 
+        if not check_mmdc_installed():
+            return False, None, "mmdc not found. Install with: npm install -g @mermaid-js/mermaid-cli"
+
+        try:
+            result = await arun_mmdc(self._mmdc_args(mmd_path, image_path, config_file), timeout=timeout)
+            return self._finish_render(
+                result.returncode,
+                result.stderr.decode('utf-8', 'replace'),
+                result.stdout.decode('utf-8', 'replace'),
+                image_path,
+                cache_key
+            )
+
         except subprocess.TimeoutExpired:
-            return False, None, "Rendering timed out after 60 seconds"
-        except Exception as e:
+            return False, None, f"Rendering timed out after {timeout:g} seconds"
+        except OSError as e:
             return False, None, str(e)
 
-    @staticmethod
-    def _check_mmdc_installed() -> bool:
-        """Check if mermaid-cli (mmdc) is installed."""
+    def render_images(
+        self,
+        mmd_path: Path,
+        image_formats: List[str],
+        timeout: float = 60,
+        config_file: Optional[Path] = None
+    ) -> Tuple[bool, Dict[str, Path], Optional[str]]:
+        """
+        Render diagram to several image formats.
+
+        When the persistent render server is available the diagram is
+        rendered once and every format is exported from that render.
+        Otherwise each format is rendered by render_image(), stopping at the
+        first failure.
+
+        Args:
+            mmd_path: Path to .mmd file
+            image_formats: Output formats (png, svg, pdf)
+            timeout: Seconds allowed per render
+            config_file: Mermaid config file passed to every render
+
+        Returns:
+            Tuple of (success, image paths by format, error_message)
+        """
+        if len(image_formats) > 1:
+            done = self._render_formats_with_server(mmd_path, image_formats, timeout, config_file)
+            if done is not None:
+                return done
+
+        images = {}
+        for image_format in image_formats:
+            success, image_path, error_message = self.render_image(mmd_path, image_format, timeout, config_file)
+            if not success:
+                return False, {}, error_message
+            images[image_format] = image_path
+        return True, images, None
+
+    async def arender_images(
+        self,
+        mmd_path: Path,
+        image_formats: List[str],
+        timeout: float = 60,
+        config_file: Optional[Path] = None
+    ) -> Tuple[bool, Dict[str, Path], Optional[str]]:
+        """Asynchronous render_images()."""
+        if len(image_formats) > 1:
+            # The server client blocks on a queue; wait for it on a worker thread
+            loop = asyncio.get_running_loop()
+            done = await loop.run_in_executor(
+                None, self._render_formats_with_server, mmd_path, image_formats, timeout, config_file
+            )
+            if done is not None:
+                return done
+
+        images = {}
+        for image_format in image_formats:
+            success, image_path, error_message = await self.arender_image(
+                mmd_path, image_format, timeout, config_file
+            )
+            if not success:
+                return False, {}, error_message
+            images[image_format] = image_path
+        return True, images, None
+
+    def _render_formats_with_server(
+        self,
+        mmd_path: Path,
+        image_formats: List[str],
+        timeout: float,
+        config_file: Optional[Path] = None
+    ) -> Optional[Tuple[bool, Dict[str, Path], Optional[str]]]:
+        """
+        Export every format from one render-server render.
+
+        Returns:
+            render_images() result, or None if the server is unavailable
+        """
+        images = {}
+        cache_keys = {}
+        for image_format in image_formats:
+            image_path = mmd_path.with_suffix(f".{image_format}")
+            cache_keys[image_format], hit = self._lookup_cache(mmd_path, image_path, image_format, config_file)
+            if hit:
+                images[image_format] = image_path
+
+        missing = [fmt for fmt in image_formats if fmt not in images]
+        if not missing:
+            return True, images, None
+
+        server = get_shared_server()
+        if server is None:
+            return None
+
         try:
-            result = subprocess.run(
-                ['mmdc', '--version'],
-                capture_output=True,
-                timeout=5
+            rendered = server.render_formats(
+                mmd_path.read_text(encoding='utf-8'),
+                missing,
+                background='transparent',
+                config=json.loads(config_file.read_text(encoding='utf-8')) if config_file else None,
+                timeout=timeout
             )
-            return result.returncode == 0
-        except (FileNotFoundError, subprocess.TimeoutExpired):
-            return False
+        except RenderServerUnavailable:
+            return None
+        except RenderServerError as e:
+            return False, {}, str(e)
+
+        for image_format, data in rendered.items():
+            image_path = mmd_path.with_suffix(f".{image_format}")
+            image_path.write_bytes(data)
+            if cache_keys[image_format] is not None:
+                self.cache.put(cache_keys[image_format], data)
+            images[image_format] = image_path
+        return True, {fmt: images[fmt] for fmt in image_formats}, None
+
+    @staticmethod
+    def _mmdc_args(mmd_path: Path, image_path: Path, config_file: Optional[Path]) -> List[str]:
+        """Build the mmdc arguments (without the executable) for a render."""
+        args = ['-i', str(mmd_path), '-o', str(image_path), '-b', 'transparent']
+        if config_file:
+            args.extend(['-c', str(config_file)])
+        return args
+
+    def _lookup_cache(
+        self,
+        mmd_path: Path,
+        image_path: Path,
+        image_format: str,
+        config_file: Optional[Path] = None
+    ) -> Tuple[Optional[str], bool]:
+        """Return (cache key, hit); on a hit the cached image is written to image_path."""
+        if self.cache is None:
+            return None, False
+        cache_key = self.cache.make_key(
+            mmd_path.read_text(encoding='utf-8'),
+            output_format=image_format,
+            config_file=config_file
+        )
+        return cache_key, self.cache.get_to_file(cache_key, image_path)
+
+    def _finish_render(
+        self,
+        returncode: int,
+        stderr: str,
+        stdout: str,
+        image_path: Path,
+        cache_key: Optional[str]
+    ) -> Tuple[bool, Optional[Path], Optional[str]]:
+        """Turn a finished mmdc run into (success, image_path, error_message)."""
+        if returncode != 0:
+            error_msg = stderr.strip() or stdout.strip() or "Unknown rendering error"
+            return False, None, error_msg
+
+        if not image_path.exists():
+            return False, None, f"Output file not created: {image_path}"
+
+        if image_path.stat().st_size == 0:
+            return False, None, f"Output file is empty: {image_path}"
+
+        if cache_key is not None:
+            self.cache.put_file(cache_key, image_path)
+
+        return True, image_path, None
 
     def get_search_recommendation(
         self,
@@ -477,7 +1082,11 @@ class ResilientDiagramGenerator:
         diagram_num: int,
         title: str,
         output_dir: Path,
-        image_format: str = "png"
+        image_format: Union[str, List[str]] = "png",
+        auto_repair: bool = False,
+        max_attempts: int = 3,
+        timeout: float = 60,
+        chunk: bool = True
     ) -> DiagramResult:
         """
         Execute full resilient generation workflow.
@@ -488,32 +1097,153 @@ class ResilientDiagramGenerator:
             diagram_num: Diagram number
             title: Diagram title
             output_dir: Output directory
-            image_format: png, svg, or pdf
+            image_format: png, svg, or pdf, or a list of formats exported
+                from a single render (image_path is the first one)
+            auto_repair: On failure, apply mechanical fixes from the
+                troubleshooting guide and retry
+            max_attempts: Maximum repair attempts when auto_repair is set
+            timeout: Seconds allowed per mmdc render of an ordinary diagram;
+                large diagrams get more (see mermaid_complexity.render_limits)
+            chunk: Render oversized flowcharts as one image per top-level
+                subgraph plus an index image
 
         Returns:
             DiagramResult with full status and error recovery info
         """
+        steps = self._generate_steps(
+            mermaid_code, markdown_file, diagram_num, title, output_dir,
+            image_format, auto_repair, max_attempts, timeout, chunk
+        )
+        try:
+            request = next(steps)
+            while True:
+                request = steps.send(self.render_images(*request))
+        except StopIteration as done:
+            return done.value
+
+    async def agenerate(
+        self,
+        mermaid_code: str,
+        markdown_file: str,
+        diagram_num: int,
+        title: str,
+        output_dir: Path,
+        image_format: Union[str, List[str]] = "png",
+        auto_repair: bool = False,
+        max_attempts: int = 3,
+        timeout: float = 60,
+        chunk: bool = True
+    ) -> DiagramResult:
+        """
+        Asynchronous generate(): same workflow, renders with asyncio subprocesses.
+
+        Cancelling the task kills the running mmdc process.
+        """
+        steps = self._generate_steps(
+            mermaid_code, markdown_file, diagram_num, title, output_dir,
+            image_format, auto_repair, max_attempts, timeout, chunk
+        )
+        try:
+            request = next(steps)
+            while True:
+                request = steps.send(await self.arender_images(*request))
+        except StopIteration as done:
+            return done.value
+
+    def _generate_steps(
+        self,
+        mermaid_code: str,
+        markdown_file: str,
+        diagram_num: int,
+        title: str,
+        output_dir: Path,
+        image_format: Union[str, List[str]],
+        auto_repair: bool,
+        max_attempts: int,
+        timeout: float,
+        chunk: bool
+    ):
+        """
+        The generation workflow, independent of how images are rendered.
+
+        Yields (mmd_path, image_formats, timeout, config_file) whenever a
+        render is needed and expects the render_images() result to be sent
+        back; generate() and agenerate() drive it with sync and async renders
+        respectively. Returns the DiagramResult.
+        """
+        image_formats = [image_format] if isinstance(image_format, str) else list(image_format)
+        timings: Dict[str, float] = {}
+        workflow_started = clock = time.perf_counter()
+
         # Step 1: Detect diagram type
         diagram_type = self.detect_diagram_type(mermaid_code)
+        clock = _lap(timings, 'detect_type', clock)
+
+        # Step 1a: Size the render from the diagram's complexity
+        complexity = estimate_complexity(mermaid_code, diagram_type.value)
+        limits = render_limits(complexity, timeout)
+        config_file = limits_config_file(limits)
+        split = None
+        if chunk and complexity.oversized and diagram_type == DiagramType.FLOWCHART:
+            split = split_flowchart(mermaid_code)
+        measured = dict(complexity.to_dict(), **limits.to_dict(), chunked=split is not None)
+        clock = _lap(timings, 'complexity', clock)
 
         # Step 2: Generate filename
         base_filename = self.generate_filename(
             markdown_file, diagram_num, diagram_type.value, title
         )
+        clock = _lap(timings, 'filename', clock)
 
         # Step 3: Save .mmd file
         mmd_path = self.save_mmd_file(mermaid_code, output_dir, base_filename)
+        clock = _lap(timings, 'write_mmd', clock)
+
+        # Locate mmdc up front so its probe is not counted as render time
+        check_mmdc_installed()
+        clock = _lap(timings, 'mmdc_probe', clock)
 
-        # Step 4: Render image
-        success, image_path, error_message = self.render_image(mmd_path, image_format)
+        # Step 4: Render image (oversized flowcharts per subgraph)
+        parts: List[Dict[str, Any]] = []
+        if split is not None:
+            success, images, parts, error_message = yield from self._render_chunked(
+                mmd_path, split, image_formats, timeout
+            )
+        else:
+            success, images, error_message = yield mmd_path, image_formats, limits.timeout, config_file
+        attempts = [RenderAttempt(
+            attempt=0,
+            fixes=[],
+            rendered=True,
+            success=success,
+            error_message=error_message,
+            duration_ms=round((time.perf_counter() - clock) * 1000, 1)
+        )]
+        clock = _lap(timings, 'render', clock)
+
+        # Step 4a: Optionally repair mechanically and retry
+        if not success and auto_repair and split is None:
+            success, images, error_message = yield from self._auto_repair(
+                mermaid_code, diagram_type, mmd_path, image_formats,
+                error_message, max_attempts, attempts, limits.timeout, config_file
+            )
+            clock = _lap(timings, 'auto_repair', clock)
 
+        repaired = len(attempts) > 1 and success
         if success:
+            _lap(timings, 'total', workflow_started)
             return DiagramResult(
                 success=True,
                 mmd_path=str(mmd_path),
-                image_path=str(image_path),
+                image_path=str(images[image_formats[0]]),
                 diagram_type=diagram_type.value,
-                error_message=None
+                error_message=None,
+                attempts=[attempt.to_dict() for attempt in attempts],
+                repaired=repaired,
+                timings=timings,
+                image_paths={fmt: str(path) for fmt, path in images.items()},
+                complexity=measured,
+                parts=parts
             )
 
         # Step 5: On error, search troubleshooting guide
@@ -532,8 +1262,10 @@ class ResilientDiagramGenerator:
 
         # Step 6: Generate search recommendation if no good matches
         search_rec = None
-        if not matches or (matches and matches[0].get('error_number', 0) == 0):
+        if not matches or matches[0].get('score', 0) < self.MIN_MATCH_CONFIDENCE:
             search_rec = self.get_search_recommendation(error_message, diagram_type)
+        _lap(timings, 'troubleshooting', clock)
+        _lap(timings, 'total', workflow_started)
 
         return DiagramResult(
             success=False,
@@ -543,9 +1275,137 @@ class ResilientDiagramGenerator:
             error_message=error_message,
             troubleshooting_matches=matches,
             suggested_fix=suggested_fix,
-            search_recommendation=search_rec
+            search_recommendation=search_rec,
+            attempts=[attempt.to_dict() for attempt in attempts],
+            timings=timings,
+            complexity=measured,
+            parts=parts
         )
 
+    def _render_chunked(
+        self,
+        mmd_path: Path,
+        split: Tuple[str, List[Any]],
+        image_formats: List[str],
+        base_timeout: float
+    ):
+        """
+        Render an oversized flowchart as subgraph partials plus an index.
+
+        Each part is saved beside mmd_path as <base>_partNN_<subgraph>.mmd
+        and sized by its own complexity; the index diagram linking the
+        subgraphs is saved as <base>_index.mmd. Stops at the first failure.
+        Renders are requested like in _generate_steps().
+
+        Returns:
+            Tuple of (success, index images by format, part records, error_message)
+        """
+        index_code, parts = split
+        records = []
+        for num, part in enumerate(parts, 1):
+            part_path = mmd_path.with_name(f"{mmd_path.stem}_part{num:02d}_{part.name}.mmd")
+            part_path.write_text(part.code, encoding='utf-8')
+            complexity = estimate_complexity(part.code, DiagramType.FLOWCHART.value)
+            limits = render_limits(complexity, base_timeout)
+            success, images, error_message = yield (
+                part_path, image_formats, limits.timeout, limits_config_file(limits)
+            )
+            if not success:
+                return False, {}, records, f"Subgraph '{part.title}' failed: {error_message}"
+            records.append({
+                "name": part.name,
+                "title": part.title,
+                "mmd_path": str(part_path),
+                "image_paths": {fmt: str(path) for fmt, path in images.items()},
+                "complexity": complexity.to_dict()
+            })
+
+        index_path = mmd_path.with_name(f"{mmd_path.stem}_index.mmd")
+        index_path.write_text(index_code, encoding='utf-8')
+        success, images, error_message = yield index_path, image_formats, base_timeout, None
+        if not success:
+            return False, {}, records, f"Index diagram failed: {error_message}"
+        return True, images, records, None
+
+    def _auto_repair(
+        self,
+        mermaid_code: str,
+        diagram_type: DiagramType,
+        mmd_path: Path,
+        image_formats: List[str],
+        error_message: Optional[str],
+        max_attempts: int,
+        attempts: List[RenderAttempt],
+        timeout: float,
+        config_file: Optional[Path]
+    ) -> Tuple[bool, Dict[str, Path], Optional[str]]:
+        """
+        Apply troubleshooting fixes until the diagram renders.
+
+        Each attempt rewrites the code for the current lint issues and top
+        troubleshooting matches, re-validates with the lint and renders only
+        when the lint finds no errors. The .mmd file is updated only when a
+        repaired diagram renders. Renders are requested like in
+        _generate_steps().
+
+        Returns:
+            Tuple of (success, image paths by format, error_message)
+        """
+        from mermaid_lint import MermaidLinter
+        from mermaid_repair import MermaidRepairer
+
+        repairer = MermaidRepairer(MermaidLinter(self))
+        linter = repairer.linter
+        code = mermaid_code
+
+        for attempt in range(1, max_attempts + 1):
+            started = time.perf_counter()
+            matches = []
+            if self.troubleshooting and error_message:
+                matches = self.troubleshooting.search(error_message, diagram_type)[:3]
+            rules = repairer.rules_for(linter.lint(code), matches)
+            repaired_code, fixes = repairer.repair(code, rules)
+            if not fixes or repaired_code == code:
+                break
+            code = repaired_code
+
+            issues = linter.lint(code)
+            if linter.has_errors(issues):
+                error_message = '; '.join(str(issue) for issue in issues if issue.level == 'error')
+                attempts.append(RenderAttempt(
+                    attempt=attempt,
+                    fixes=fixes,
+                    rendered=False,
+                    success=False,
+                    error_message=error_message,
+                    duration_ms=round((time.perf_counter() - started) * 1000, 1)
+                ))
+                continue
+
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                candidate = Path(tmp_dir) / mmd_path.name
+                candidate.write_text(code, encoding='utf-8')
+                success, images, error_message = yield candidate, image_formats, timeout, config_file
+                if success:
+                    mmd_path.write_text(code, encoding='utf-8')
+                    for image_format, image_path in images.items():
+                        final_path = mmd_path.with_suffix(f".{image_format}")
+                        shutil.move(str(image_path), str(final_path))
+                        images[image_format] = final_path
+
+            attempts.append(RenderAttempt(
+                attempt=attempt,
+                fixes=fixes,
+                rendered=True,
+                success=success,
+                error_message=error_message,
+                duration_ms=round((time.perf_counter() - started) * 1000, 1)
+            ))
+            if success:
+                return True, images, None
+
+        return False, {}, error_message
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -565,6 +1425,12 @@ Examples:
   cat diagram.mmd | python resilient_diagram.py --stdin \\
       --markdown-file doc --diagram-num 2 --title "sequence" --json
 
+  # PNG and SVG from one render
+  python resilient_diagram.py --mmd-file diagram.mmd --format png,svg --json
+
+  # Huge generated flowchart: render whole with raised limits (no subgraph split)
+  python resilient_diagram.py --mmd-file huge.mmd --timeout 120 --no-chunk
+
   # Full options with custom output directory
   python resilient_diagram.py --code "sequenceDiagram..." \\
       --markdown-file api_design --diagram-num 1 --title "auth_flow" \\
@@ -602,13 +1468,35 @@ Error Recovery:
                         help='Diagram number (default: 1)')
     parser.add_argument('--title', '-t', type=str, default='diagram',
                         help='Diagram title for filename')
-    parser.add_argument('--format', '-f', choices=['png', 'svg', 'pdf'], default='png',
-                        help='Image format (default: png)')
+    parser.add_argument('--format', '-f', type=parse_formats, default=['png'],
+                        help='Image format(s), comma-separated (e.g. png,svg: all exported from '
+                             'one render; default: png)')
 
     # Output format
     parser.add_argument('--json', '-j', action='store_true',
                         help='Output result as JSON (recommended for programmatic use)')
 
+    # Automatic repair
+    parser.add_argument('--auto-repair', action='store_true',
+                        help='On failure, apply mechanical fixes from troubleshooting.md and retry')
+    parser.add_argument('--max-attempts', type=int, default=3,
+                        help='Maximum auto-repair attempts (default: 3)')
+    parser.add_argument('--timeout', type=float, default=60,
+                        help='Seconds allowed per mmdc render of an ordinary diagram; raised '
+                             'automatically for large diagrams (default: 60)')
+    parser.add_argument('--no-chunk', action='store_true',
+                        help='Render oversized flowcharts whole instead of per subgraph plus an index')
+    parser.add_argument('--metrics-file', type=Path,
+                        default=os.environ.get('MERMAID_METRICS_FILE') or None,
+                        help='Append a JSONL record with per-stage timings to this file '
+                             '(default: $MERMAID_METRICS_FILE)')
+
+    # Render cache
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always re-render instead of reusing cached output of unchanged diagrams')
+    parser.add_argument('--cache-dir', type=Path,
+                        help='Render cache directory (default: $MERMAID_CACHE_DIR or user cache dir)')
+
     # Troubleshooting guide override
     parser.add_argument('--troubleshooting', type=Path,
                         help='Path to troubleshooting.md (auto-detected if not specified)')
@@ -631,7 +1519,10 @@ Error Recovery:
         sys.exit(1)
 
     # Initialize generator
-    generator = ResilientDiagramGenerator(troubleshooting_path=args.troubleshooting)
+    generator = ResilientDiagramGenerator(
+        troubleshooting_path=args.troubleshooting,
+        cache=None if args.no_cache else RenderCache(args.cache_dir)
+    )
 
     # Generate diagram
     result = generator.generate(
@@ -640,9 +1531,19 @@ Error Recovery:
         diagram_num=args.diagram_num,
         title=args.title,
         output_dir=args.output_dir,
-        image_format=args.format
+        image_format=args.format,
+        auto_repair=args.auto_repair,
+        max_attempts=args.max_attempts,
+        timeout=args.timeout,
+        chunk=not args.no_chunk
     )
 
+    if args.metrics_file:
+        try:
+            append_metrics(args.metrics_file, result.metrics_record(','.join(args.format)))
+        except OSError as e:
+            print(f"WARNING: Could not write metrics: {e}", file=sys.stderr)
+
     # Output result
     if args.json:
         print(json.dumps(result.to_dict(), indent=2))
@@ -650,17 +1551,32 @@ Error Recovery:
         if result.success:
             print(f"SUCCESS: Generated diagram")
             print(f"  MMD file:   {result.mmd_path}")
-            print(f"  Image file: {result.image_path}")
+            for image_path in result.image_paths.values():
+                print(f"  Image file: {image_path}")
             print(f"  Type:       {result.diagram_type}")
+            print(f"  Size:       {result.complexity['nodes']} nodes, {result.complexity['edges']} edges")
+            if result.parts:
+                print(f"  Chunked into {len(result.parts)} subgraph image(s) (image above is the index):")
+                for part in result.parts:
+                    for image_path in part['image_paths'].values():
+                        print(f"    ✓ {image_path}")
+            if result.repaired:
+                print(f"  Repaired after {len(result.attempts) - 1} attempt(s):")
+                for attempt in result.attempts[1:]:
+                    for fix in attempt['fixes']:
+                        print(f"    ✓ {fix}")
         else:
             print(f"FAILED: {result.error_message}", file=sys.stderr)
             print(f"  MMD file: {result.mmd_path}")
             print(f"  Type:     {result.diagram_type}")
+            if len(result.attempts) > 1:
+                print(f"  Auto-repair attempts: {len(result.attempts) - 1} (no valid diagram)")
 
             if result.troubleshooting_matches:
                 print(f"\nTroubleshooting matches found ({len(result.troubleshooting_matches)}):")
                 for match in result.troubleshooting_matches[:3]:
-                    print(f"  - Error {match['error_number']}: {match['title']} ({match['severity']})")
+                    print(f"  - Error {match['error_number']}: {match['title']} "
+                          f"({match['severity']}, score {match['score']:.2f})")
 
                 if result.suggested_fix:
                     print(f"\nSuggested fix (from Error {result.troubleshooting_matches[0]['error_number']}):")
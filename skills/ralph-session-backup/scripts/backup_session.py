@@ -4,31 +4,79 @@ Ralph Session Backup Script with Versioning
 
 Copies a specific session folder from .ralph-sessions to GoogleDrive SwarmSessions
 with versioning support. Each session gets its own folder containing timestamped backups.
+
+With --store, backups are deduplicated snapshots instead of full copies: file
+contents are split into chunks stored once by SHA-256 under <session>/.store,
+and each backup is a small backup_YYMMDD-HHMMSS.manifest.json listing them.
+
+Older directory backups are compressed by a background process (--foreground
+to wait for it), in blocks spread over a process pool: deflate (.zip, the
+default), lzma (.tar.xz) or zstd (.tar.zst, needs Python 3.14+ or the
+zstandard package).
 """
 
+import hashlib
+import json
+import lzma
+import math
 import os
 import shutil
+import stat
+import struct
 import sys
 import platform
+import re
 import subprocess
+import tarfile
+import tempfile
+import time
 import zipfile
+import zlib
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from datetime import datetime
 
+# Snapshot store layout inside the session folder
+STORE_DIR = ".store"
+MANIFEST_SUFFIX = ".manifest.json"
+# Fixed-size chunks: appending to a log only adds chunks after the old tail
+CHUNK_SIZE = 4 * 1024 * 1024
+# Complete versions only; in-progress writes use other names (.staging, .partial, .tmp).
+# A -N suffix separates backups made within the same second
+VERSION_PATTERN = re.compile(r"^backup_\d{6}-\d{6}(?:-\d+)?$")
+STAGING_SUFFIX = ".staging"
+# Held (OS file lock) by the run writing backup_<ts>.staging until it is renamed
+STAGING_LOCK_SUFFIX = ".staging.lock"
+# File indexes of directory backups (<session>/.index/backup_YYMMDD-HHMMSS.json)
+INDEX_DIR = ".index"
+# Archive formats of compressed versions, by --compress algorithm
+ARCHIVE_SUFFIXES = {"deflate": ".zip", "lzma": ".tar.xz", "zstd": ".tar.zst"}
+DEFAULT_LEVELS = {"deflate": 6, "lzma": 6, "zstd": 3}
+# Background compression bookkeeping inside the session folder
+COMPRESS_LOCK = ".compress.lock"
+COMPRESS_LOG = ".compress.log"
+# A lock older than this belongs to a compressor that died
+STALE_LOCK_SECONDS = 6 * 60 * 60
+# Files stored without compression in zips: already-compressed formats, SQLite
+# databases, and files whose first ENTROPY_SAMPLE_SIZE bytes look random
+INCOMPRESSIBLE_EXTENSIONS = frozenset({
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".heic", ".ico",
+    ".mp3", ".mp4", ".m4a", ".mov", ".mkv", ".webm", ".ogg", ".opus",
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z", ".rar", ".lz4",
+    ".jar", ".whl", ".docx", ".xlsx", ".pptx", ".woff", ".woff2",
+    ".db", ".sqlite", ".sqlite3",
+})
+ENTROPY_SAMPLE_SIZE = 8 * 1024
+# Bits per byte above which deflate gains next to nothing
+ENTROPY_THRESHOLD = 7.5
+
 def get_current_timestamp():
     """Generate timestamp in YYMMDD-HHMMSS format"""
     return datetime.now().strftime("%y%m%d-%H%M%S")
 
-def create_cross_platform_links(session_folder, backup_dest, backup_name):
-    """
-    Create platform-specific link variants for cross-platform accessibility:
-    - latest-win: Windows junction point (always a link, never a copy)
-    - latest-linux: Linux symlink (always a link, never a copy)
-    """
-    latest_win = os.path.join(session_folder, "latest-win")
-    latest_linux = os.path.join(session_folder, "latest-linux")
-
-    # Clean up existing links
-    for link_path in [latest_win, latest_linux]:
+def remove_latest_links(session_folder):
+    """Remove the latest-win/latest-linux links of a session folder"""
+    for link_path in [os.path.join(session_folder, "latest-win"), os.path.join(session_folder, "latest-linux")]:
         try:
             if os.path.islink(link_path):
                 os.unlink(link_path)
@@ -40,6 +88,18 @@ def create_cross_platform_links(session_folder, backup_dest, backup_name):
         except OSError:
             pass
 
+def create_cross_platform_links(session_folder, backup_dest, backup_name):
+    """
+    Create platform-specific link variants for cross-platform accessibility:
+    - latest-win: Windows junction point (always a link, never a copy)
+    - latest-linux: Linux symlink (always a link, never a copy)
+    """
+    latest_win = os.path.join(session_folder, "latest-win")
+    latest_linux = os.path.join(session_folder, "latest-linux")
+
+    # Clean up existing links
+    remove_latest_links(session_folder)
+
     # Create Windows junction (always try link first, fallback to error)
     try:
         import subprocess
@@ -58,53 +118,970 @@ def create_cross_platform_links(session_folder, backup_dest, backup_name):
     except OSError:
         print(f"Warning: Could not create Linux symlink: {latest_linux}")
 
-def create_versioned_backup(source, dest_base, session_name, repo_name):
+def index_path(session_folder, version):
+    """Path of the file index recorded for a directory backup"""
+    return os.path.join(session_folder, INDEX_DIR, version + ".json")
+
+def load_index(session_folder, version):
+    """Read a directory backup's file index, or None if it has none"""
+    try:
+        with open(index_path(session_folder, version), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def file_digests(file_path):
+    """(SHA-256, CRC-32, size) of a file, read in CHUNK_SIZE blocks"""
+    digest = hashlib.sha256()
+    crc = size = 0
+    with open(file_path, 'rb') as f:
+        for data in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(data)
+            crc = zlib.crc32(data, crc)
+            size += len(data)
+    return digest.hexdigest(), crc, size
+
+def copy_file_with_digests(src_path, dest_path):
+    """
+    Copy a file with its metadata (like shutil.copy2), computing its
+    SHA-256 and CRC-32 from the same read. Returns (sha256, crc32, size)
+    """
+    digest = hashlib.sha256()
+    crc = size = 0
+    with open(src_path, 'rb') as src, open(dest_path, 'wb') as dest:
+        for data in iter(lambda: src.read(CHUNK_SIZE), b''):
+            digest.update(data)
+            crc = zlib.crc32(data, crc)
+            size += len(data)
+            dest.write(data)
+    shutil.copystat(src_path, dest_path)
+    return digest.hexdigest(), crc, size
+
+def new_backup_name(session_folder):
+    """
+    Name for a new version: backup_YYMMDD-HHMMSS, plus -1, -2, ... if a
+    version (or a backup in progress) from the same second already exists
+    """
+    base_name = f"backup_{get_current_timestamp()}"
+    backup_name = base_name
+    suffixes = [""] + list(ARCHIVE_SUFFIXES.values()) + [MANIFEST_SUFFIX, STAGING_SUFFIX, STAGING_LOCK_SUFFIX]
+    counter = 0
+    while any(os.path.exists(os.path.join(session_folder, backup_name + suffix)) for suffix in suffixes):
+        counter += 1
+        backup_name = f"{base_name}-{counter}"
+    return backup_name
+
+def try_lock_file(path):
+    """
+    Open path and take an exclusive, non-blocking OS lock on it. Returns the
+    open file (closing it releases the lock), or None if another process
+    holds the lock. The OS drops the lock when its owner exits or crashes.
+    """
+    f = open(path, 'a+')
+    try:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+def release_staging_lock(lock_file, lock_path):
+    """Release and delete a staging lock"""
+    lock_file.close()
+    try:
+        os.remove(lock_path)
+    except OSError:
+        pass
+
+def remove_stale_staging(session_folder):
+    """
+    Delete backup folders left in staging by an interrupted run. A staging
+    folder whose lock is still held belongs to a backup in progress and is
+    left alone.
+    """
+    stale = set()
+    for item in os.listdir(session_folder):
+        if item.startswith("backup_") and item.endswith(STAGING_LOCK_SUFFIX):
+            stale.add(item[:-len(STAGING_LOCK_SUFFIX)])
+        elif item.startswith("backup_") and item.endswith(STAGING_SUFFIX):
+            stale.add(item[:-len(STAGING_SUFFIX)])
+
+    for backup_name in sorted(stale):
+        lock_path = os.path.join(session_folder, backup_name + STAGING_LOCK_SUFFIX)
+        lock_file = try_lock_file(lock_path)
+        if lock_file is None:
+            continue  # Owner still running
+        staging_path = os.path.join(session_folder, backup_name + STAGING_SUFFIX)
+        if os.path.isdir(staging_path):
+            print(f"Removing incomplete backup: {backup_name + STAGING_SUFFIX}")
+            shutil.rmtree(staging_path, ignore_errors=True)
+        release_staging_lock(lock_file, lock_path)
+
+def find_incremental_base(session_folder, full_every):
+    """
+    Return (version, index) of the backup an incremental backup can link
+    against, or (None, None) when the next backup must be a full copy: no
+    unzipped directory backup with an index, or full_every versions since
+    the last full backup.
+    """
+    versions = sorted(
+        (item for item in os.listdir(session_folder)
+         if VERSION_PATTERN.match(item) and os.path.isdir(os.path.join(session_folder, item))),
+        reverse=True
+    )
+    if not versions:
+        return None, None
+    index = load_index(session_folder, versions[0])
+    if index is None or index.get("chain", 0) + 1 >= full_every:
+        return None, None
+    return versions[0], index
+
+def create_versioned_backup(source, dest_base, session_name, repo_name, incremental=False, full_every=10, use_hash=False):
     """
     Create a versioned backup structure:
     dest_base/repo_name/session_name/backup_YYMMDD-HHMMSS
     Also creates cross-platform latest links
+
+    The copy is made under a .staging name and renamed once complete, so an
+    interrupted run never leaves a partial version. Every backup records a
+    file index (size, mtime, mode, SHA-256 and CRC-32 computed while copying)
+    under .index/. With incremental=True, files whose size and mtime match the previous
+    backup's index are hard-linked from it instead of copied (use_hash also
+    compares contents, so touched-but-identical files are linked too), and
+    every full_every-th version is a full copy again.
     """
     # Create session-specific folder
     session_folder = os.path.join(dest_base, repo_name, session_name)
     os.makedirs(session_folder, exist_ok=True)
+    remove_stale_staging(session_folder)
+
+    base_version, base_index = None, None
+    if incremental:
+        base_version, base_index = find_incremental_base(session_folder, full_every)
+    base_files = base_index["files"] if base_index else {}
 
-    # Generate backup timestamp
-    backup_timestamp = get_current_timestamp()
-    backup_name = f"backup_{backup_timestamp}"
+    # Pick an unused version name. Its staging lock is taken before the
+    # staging folder exists and held until the rename, so no other run ever
+    # sees the folder without a live owner
+    while True:
+        backup_name = new_backup_name(session_folder)
+        lock_path = os.path.join(session_folder, backup_name + STAGING_LOCK_SUFFIX)
+        lock_file = try_lock_file(lock_path)
+        if lock_file is None:
+            continue  # Another run reserved this name first
+        try:
+            os.mkdir(os.path.join(session_folder, backup_name + STAGING_SUFFIX))
+            break
+        except FileExistsError:
+            lock_file.close()  # Leftover staging folder: take the next name
+    backup_timestamp = backup_name[len("backup_"):]
     backup_dest = os.path.join(session_folder, backup_name)
 
-    print(f"Creating versioned backup: {backup_dest}")
+    if base_version:
+        print(f"Creating incremental backup: {backup_dest} (base: {base_version})")
+    else:
+        print(f"Creating versioned backup: {backup_dest}")
+
+    # Copy the session to a staging folder, linking unchanged files
+    staging_dest = backup_dest + STAGING_SUFFIX
+    started = datetime.now()
+    files = {}
+    linked_count = copied_count = copied_bytes = 0
+    try:
+        for root, dirs, filenames in os.walk(source):
+            dirs.sort()
+            rel_root = os.path.relpath(root, source)
+            os.makedirs(os.path.join(staging_dest, rel_root), exist_ok=True)
+            for name in sorted(filenames):
+                src_path = os.path.join(root, name)
+                rel_path = os.path.relpath(src_path, source).replace(os.sep, '/')
+                dest_path = os.path.join(staging_dest, *rel_path.split('/'))
+                file_stat = os.stat(src_path)
+                entry = {"size": file_stat.st_size, "mtime_ns": file_stat.st_mtime_ns, "mode": stat.S_IMODE(file_stat.st_mode)}
+
+                base_entry = base_files.get(rel_path)
+                base_path = os.path.join(session_folder, base_version, *rel_path.split('/')) if base_entry else None
+                unchanged = False
+                if base_entry and base_entry["size"] == entry["size"] and os.path.isfile(base_path):
+                    if "sha256" not in base_entry or "crc32" not in base_entry:
+                        # Base indexed before checksums were recorded
+                        base_entry["sha256"], base_entry["crc32"], _ = file_digests(base_path)
+                    if use_hash:
+                        unchanged = file_digests(src_path)[0] == base_entry["sha256"]
+                    else:
+                        unchanged = base_entry["mtime_ns"] == entry["mtime_ns"] and base_entry["mode"] == entry["mode"]
+
+                if unchanged:
+                    try:
+                        os.link(base_path, dest_path)
+                        linked_count += 1
+                        # The link keeps the base file's metadata and contents
+                        for key in ("mtime_ns", "mode", "sha256", "crc32"):
+                            entry[key] = base_entry[key]
+                        files[rel_path] = entry
+                        continue
+                    except OSError:
+                        pass  # No hard links on this filesystem: copy instead
+                entry["sha256"], entry["crc32"], entry["size"] = copy_file_with_digests(src_path, dest_path)
+                copied_count += 1
+                copied_bytes += entry["size"]
+                files[rel_path] = entry
+
+        # Every indexed file must have made it into staging before publishing
+        incomplete = [
+            rel_path for rel_path, entry in files.items()
+            if not os.path.isfile(os.path.join(staging_dest, *rel_path.split('/')))
+            or os.path.getsize(os.path.join(staging_dest, *rel_path.split('/'))) != entry["size"]
+        ]
+        if incomplete:
+            raise OSError(f"Staging copy is incomplete ({len(incomplete)} file(s) missing or truncated, "
+                          f"e.g. {incomplete[0]}); backup not published")
+        if os.path.exists(backup_dest):
+            raise FileExistsError(f"Backup {backup_name} already exists; not replacing it")
+        os.makedirs(os.path.join(session_folder, INDEX_DIR), exist_ok=True)
+        write_json_atomic(index_path(session_folder, backup_name), {
+            "created": backup_timestamp,
+            "base": base_version,
+            "chain": base_index.get("chain", 0) + 1 if base_version else 0,
+            "files": files,
+        })
+        try:
+            os.replace(staging_dest, backup_dest)
+        except OSError as e:
+            raise OSError(f"Could not move the finished backup into place as {backup_name}: {e}") from e
+    except BaseException:
+        shutil.rmtree(staging_dest, ignore_errors=True)
+        raise
+    finally:
+        release_staging_lock(lock_file, lock_path)
 
-    # Copy the session to the versioned backup
-    shutil.copytree(source, backup_dest, dirs_exist_ok=True)
+    elapsed = (datetime.now() - started).total_seconds()
+    print(f"Copied {copied_count} file(s) ({copied_bytes:,} bytes), linked {linked_count} unchanged in {elapsed:.2f}s")
 
-    # Create cross-platform latest links
-    create_cross_platform_links(session_folder, backup_dest, backup_name)
+    # Create cross-platform latest links (unless a concurrent run already
+    # published a newer version)
+    if list_session_versions(dest_base, repo_name, session_name)[0] == backup_name:
+        create_cross_platform_links(session_folder, backup_dest, backup_name)
 
     return backup_dest
 
-def zip_directory(directory_path, zip_path):
-    """Zips a directory and removes the original directory if successful"""
-    print(f"Zipping {directory_path} to {zip_path}...")
+def store_object_path(session_folder, digest):
+    """Path of a chunk in the snapshot store"""
+    return os.path.join(session_folder, STORE_DIR, "objects", digest[:2], digest)
+
+def store_chunk(session_folder, data):
+    """Store a chunk once under its SHA-256. Returns (digest, bytes newly written)"""
+    digest = hashlib.sha256(data).hexdigest()
+    object_path = store_object_path(session_folder, digest)
+    if os.path.exists(object_path):
+        return digest, 0
+
+    os.makedirs(os.path.dirname(object_path), exist_ok=True)
+    tmp_path = f"{object_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, object_path)
+    return digest, len(data)
+
+def write_json_atomic(path, data):
+    """Write JSON to a temporary file and rename it into place"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp_path, path)
+
+def create_snapshot_backup(source, dest_base, session_name, repo_name):
+    """
+    Create a deduplicated snapshot backup:
+    dest_base/repo_name/session_name/backup_YYMMDD-HHMMSS.manifest.json
+
+    Every file is read once and split into CHUNK_SIZE chunks; chunks already
+    in the store (unchanged files, the old part of growing logs) are not
+    written again, so each backup costs only what changed plus its manifest.
+    """
+    session_folder = os.path.join(dest_base, repo_name, session_name)
+    os.makedirs(session_folder, exist_ok=True)
+
+    backup_name = new_backup_name(session_folder)
+    backup_timestamp = backup_name[len("backup_"):]
+    manifest_path = os.path.join(session_folder, backup_name + MANIFEST_SUFFIX)
+
+    print(f"Creating snapshot backup: {manifest_path}")
+
+    files = []
+    empty_dirs = []
+    total_bytes = new_bytes = 0
+    for root, dirs, filenames in os.walk(source):
+        dirs.sort()
+        rel_root = os.path.relpath(root, source)
+        if rel_root != '.' and not dirs and not filenames:
+            empty_dirs.append(rel_root.replace(os.sep, '/'))
+        for name in sorted(filenames):
+            file_path = os.path.join(root, name)
+            file_stat = os.stat(file_path)
+            chunks = []
+            size = 0
+            with open(file_path, 'rb') as f:
+                while True:
+                    data = f.read(CHUNK_SIZE)
+                    if not data:
+                        break
+                    digest, written = store_chunk(session_folder, data)
+                    chunks.append(digest)
+                    size += len(data)
+                    new_bytes += written
+            total_bytes += size
+            files.append({
+                "path": os.path.relpath(file_path, source).replace(os.sep, '/'),
+                "size": size,
+                "mtime": file_stat.st_mtime,
+                "mode": stat.S_IMODE(file_stat.st_mode),
+                "chunks": chunks,
+            })
+
+    write_json_atomic(manifest_path, {
+        "format": "ralph-snapshot",
+        "version": 1,
+        "created": backup_timestamp,
+        "chunk_size": CHUNK_SIZE,
+        "files": files,
+        "empty_dirs": empty_dirs,
+    })
+    print(f"Stored {new_bytes:,} new bytes for {total_bytes:,} bytes in {len(files)} file(s)")
+
+    # The latest links only ever point at directory backups
+    remove_latest_links(session_folder)
+
+    return manifest_path
+
+def load_manifest(manifest_path):
+    """Read a snapshot manifest"""
+    with open(manifest_path, encoding='utf-8') as f:
+        return json.load(f)
+
+def restore_snapshot(session_folder, manifest_path, target):
+    """Rebuild the files of a snapshot in target, checking every chunk's hash"""
+    manifest = load_manifest(manifest_path)
+    os.makedirs(target, exist_ok=True)
+    for rel_dir in manifest.get("empty_dirs", []):
+        os.makedirs(os.path.join(target, *rel_dir.split('/')), exist_ok=True)
+
+    for entry in manifest["files"]:
+        file_path = os.path.join(target, *entry["path"].split('/'))
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'wb') as out:
+            for digest in entry["chunks"]:
+                with open(store_object_path(session_folder, digest), 'rb') as f:
+                    data = f.read()
+                if hashlib.sha256(data).hexdigest() != digest:
+                    raise ValueError(f"Corrupt chunk {digest} in {entry['path']}")
+                out.write(data)
+        os.chmod(file_path, entry["mode"])
+        os.utime(file_path, (entry["mtime"], entry["mtime"]))
+
+def checkout_folder(repo_name, session_name):
+    """System temp folder holding snapshot checkouts of a session"""
+    return os.path.join(tempfile.gettempdir(), "ralph-session-backup", repo_name, session_name)
+
+def checkout_snapshot(session_folder, repo_name, session_name, version):
+    """
+    Materialize a snapshot outside the synced drive and return its path.
+
+    Checkouts are kept in the system temp folder and reused until the
+    snapshot they came from is deleted by cleanup_old_versions().
+    """
+    target = os.path.join(checkout_folder(repo_name, session_name), version)
+    if os.path.isdir(target):
+        return target
+
+    staging = f"{target}.{os.getpid()}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    restore_snapshot(session_folder, os.path.join(session_folder, version + MANIFEST_SUFFIX), staging)
+    os.replace(staging, target)
+    return target
+
+def restore_version(dest_base, repo_name, session_name, version, target):
+    """Restore a directory, zip or snapshot version into target (which must not exist)"""
+    session_folder = os.path.join(dest_base, repo_name, session_name)
+    version_path = os.path.join(session_folder, version)
+
+    if os.path.isdir(version_path):
+        shutil.copytree(version_path, target)
+    elif os.path.exists(version_path + MANIFEST_SUFFIX):
+        restore_snapshot(session_folder, version_path + MANIFEST_SUFFIX, target)
+    elif find_archive(version_path):
+        # Archive members are stored under the backup_YYMMDD-HHMMSS/ folder name
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(target))) as tmp_dir:
+            extract_archive(find_archive(version_path), tmp_dir)
+            extracted = os.path.join(tmp_dir, version)
+            if not os.path.isdir(extracted):
+                os.makedirs(extracted)
+            shutil.move(extracted, target)
+    else:
+        raise FileNotFoundError(f"Version '{version}' not found")
+
+def collect_store_garbage(session_folder):
+    """Delete stored chunks that no remaining snapshot manifest references"""
+    objects_dir = os.path.join(session_folder, STORE_DIR, "objects")
+    if not os.path.isdir(objects_dir):
+        return 0
+
+    referenced = set()
+    for item in os.listdir(session_folder):
+        if item.startswith("backup_") and item.endswith(MANIFEST_SUFFIX):
+            for entry in load_manifest(os.path.join(session_folder, item))["files"]:
+                referenced.update(entry["chunks"])
+
+    removed = 0
+    for prefix in os.listdir(objects_dir):
+        prefix_dir = os.path.join(objects_dir, prefix)
+        for name in os.listdir(prefix_dir):
+            if name not in referenced:
+                os.remove(os.path.join(prefix_dir, name))
+                removed += 1
+    return removed
+
+def load_zstd():
+    """Return a zstd module (Python 3.14+ compression.zstd or zstandard), or None"""
     try:
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(directory_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, os.path.dirname(directory_path))
-                    zipf.write(file_path, arcname)
-        
-        # Verify zip file exists and has size before deleting original
-        if os.path.exists(zip_path) and os.path.getsize(zip_path) > 0:
-            shutil.rmtree(directory_path)
-            print(f"Successfully zipped and removed original: {directory_path}")
+        from compression import zstd
+        return zstd
+    except ImportError:
+        pass
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+def compress_block(job):
+    """
+    Compress one block in a worker process. Blocks are compressed
+    independently, so their outputs concatenate into one valid stream:
+    full-flushed raw deflate (as pigz does), xz streams or zstd frames.
+    """
+    algorithm, level, data, final = job
+    if algorithm == "deflate":
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_FULL_FLUSH)
+    if algorithm == "lzma":
+        return lzma.compress(data, format=lzma.FORMAT_XZ, preset=level)
+    zstd = load_zstd()
+    if zstd.__name__ == "zstandard":
+        return zstd.ZstdCompressor(level=level).compress(data)
+    return zstd.compress(data, level=level)
+
+def compress_blocks(jobs):
+    """Compress several blocks in one worker call, one round trip for many small files"""
+    return [compress_block(job) for job in jobs]
+
+class SerialPool:
+    """Stand-in for a process pool that compresses in the calling process"""
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+class BlockCompressor:
+    """Compress a stream block by block across a process pool, keeping output order"""
+
+    def __init__(self, pool, algorithm, level, jobs):
+        self.pool = pool
+        self.algorithm = algorithm
+        self.level = level
+        # Blocks in flight: enough to keep every worker busy, bounded for memory
+        self.window = 2 * jobs
+        self.pending = deque()
+
+    def submit(self, data, final=False):
+        """Queue a block; return the compressed bytes that are ready, in order"""
+        self.pending.append(self.pool.submit(compress_block, (self.algorithm, self.level, data, final)))
+        ready = []
+        while len(self.pending) > self.window:
+            ready.append(self.pending.popleft().result())
+        return b"".join(ready)
+
+    def finish(self):
+        """Wait for all queued blocks and return the rest of the output"""
+        ready = b"".join(future.result() for future in self.pending)
+        self.pending.clear()
+        return ready
+
+class CompressedStreamWriter:
+    """Write-only file object for tarfile that feeds a BlockCompressor"""
+
+    def __init__(self, out, compressor):
+        self.out = out
+        self.compressor = compressor
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= CHUNK_SIZE:
+            self.out.write(self.compressor.submit(bytes(self.buffer[:CHUNK_SIZE])))
+            del self.buffer[:CHUNK_SIZE]
+        return len(data)
+
+    def close(self):
+        self.out.write(self.compressor.submit(bytes(self.buffer), final=True))
+        self.out.write(self.compressor.finish())
+        self.buffer.clear()
+
+def dos_datetime(mtime):
+    """Zip (MS-DOS) time and date fields for a timestamp"""
+    t = time.localtime(max(mtime, 315532800))  # Zip dates start in 1980
+    return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+def list_archive_files(directory_path):
+    """(file path, archive name) for every file of a backup directory, sorted"""
+    members = []
+    for root, dirs, files in os.walk(directory_path):
+        dirs.sort()
+        for file in sorted(files):
+            file_path = os.path.join(root, file)
+            arcname = os.path.relpath(file_path, os.path.dirname(directory_path)).replace(os.sep, '/')
+            members.append((file_path, arcname))
+    return members
+
+def is_incompressible(file_path):
+    """
+    True for files deflate would barely shrink: known compressed formats, or
+    a first ENTROPY_SAMPLE_SIZE bytes with Shannon entropy above ENTROPY_THRESHOLD
+    """
+    if os.path.splitext(file_path)[1].lower() in INCOMPRESSIBLE_EXTENSIONS:
+        return True
+    with open(file_path, 'rb') as f:
+        sample = f.read(ENTROPY_SAMPLE_SIZE)
+    if len(sample) < ENTROPY_SAMPLE_SIZE:
+        return False  # Small files: nothing to gain either way
+    entropy = -sum(count / len(sample) * math.log2(count / len(sample)) for count in Counter(sample).values())
+    return entropy > ENTROPY_THRESHOLD
+
+class ParallelZipWriter:
+    """
+    Write a deflate zip in one pass while a BlockCompressor's pool compresses
+    it. Small files are batched into jobs of about CHUNK_SIZE bytes and large
+    files are split into CHUNK_SIZE blocks; up to the compressor's window of
+    jobs is in flight while earlier members are written out in order. Sizes
+    and CRC of deflated members follow them in a data descriptor; stored
+    members get theirs patched into the local header, as readers such as
+    Java's ZipInputStream only accept descriptors on deflated entries. Only
+    for archives below the 4 GiB / 65535 member zip limits (no zip64).
+    """
+
+    def __init__(self, out, compressor):
+        self.out = out
+        self.compressor = compressor
+        # Archive output in member order: ("header" | "end" | "stored", member)
+        # or ("block", member, batch, index in batch)
+        self.steps = deque()
+        self.batch = None
+        self.in_flight = 0
+        self.central = []
+        self.stored_files = self.stored_bytes = 0
+
+    def add(self, file_path, arcname):
+        """Queue a file; incompressible files are stored as-is"""
+        file_stat = os.stat(file_path)
+        member = {"path": file_path, "name": arcname.encode('utf-8'), "mode": file_stat.st_mode,
+                  "time": dos_datetime(file_stat.st_mtime), "crc": 0, "size": 0, "compressed_size": 0}
+        if is_incompressible(file_path):
+            self.steps.append(("stored", member))
+            return
+        self.steps.append(("header", member))
+        with open(file_path, 'rb') as f:
+            data = f.read(CHUNK_SIZE)
+            while True:
+                next_data = f.read(CHUNK_SIZE) if data else b''
+                member["crc"] = zlib.crc32(data, member["crc"])
+                member["size"] += len(data)
+                self.add_block(member, data, final=not next_data)
+                if not next_data:
+                    break
+                data = next_data
+        self.steps.append(("end", member))
+
+    def add_block(self, member, data, final):
+        """Add a block to the current batch, submitting the batch once it is full"""
+        if self.batch is None:
+            self.batch = {"jobs": [], "size": 0, "future": None, "output": None}
+        self.steps.append(("block", member, self.batch, len(self.batch["jobs"])))
+        self.batch["jobs"].append((self.compressor.algorithm, self.compressor.level, data, final))
+        self.batch["size"] += len(data)
+        if self.batch["size"] >= CHUNK_SIZE:
+            self.submit_batch()
+            while self.in_flight > self.compressor.window:
+                self.write_step()
+
+    def submit_batch(self):
+        self.batch["future"] = self.compressor.pool.submit(compress_blocks, self.batch["jobs"])
+        self.batch = None
+        self.in_flight += 1
+
+    @staticmethod
+    def flags(method):
+        # UTF-8 name (0x800), plus data descriptor (0x08) for deflated members
+        return 0x800 if method == 0 else 0x808
+
+    def write_header(self, member, method):
+        member["offset"] = self.out.tell()
+        dos_time, dos_date = member["time"]
+        self.out.write(struct.pack('<IHHHHHIIIHH', 0x04034b50, 20, self.flags(method), method, dos_time, dos_date,
+                                   0, 0, 0, len(member["name"]), 0))
+        self.out.write(member["name"])
+
+    def write_end(self, member, method):
+        if method == 0:
+            # Seek back to fill in the local header's CRC and sizes
+            end = self.out.tell()
+            self.out.seek(member["offset"] + 14)
+            self.out.write(struct.pack('<III', member["crc"], member["compressed_size"], member["size"]))
+            self.out.seek(end)
+        else:
+            self.out.write(struct.pack('<IIII', 0x08074b50, member["crc"], member["compressed_size"], member["size"]))
+        dos_time, dos_date = member["time"]
+        self.central.append(struct.pack(
+            '<IHHHHHHIIIHHHHHII', 0x02014b50, (3 << 8) | 20, 20, self.flags(method), method, dos_time, dos_date,
+            member["crc"], member["compressed_size"], member["size"], len(member["name"]),
+            0, 0, 0, 0, (member["mode"] & 0xFFFF) << 16, member["offset"]
+        ) + member["name"])
+
+    def write_step(self):
+        """Write the next queued step, waiting for its batch if needed"""
+        step = self.steps.popleft()
+        kind, member = step[0], step[1]
+        if kind == "header":
+            self.write_header(member, 8)  # 8 = deflate
+        elif kind == "block":
+            batch, index = step[2], step[3]
+            if batch["output"] is None:
+                batch["output"] = batch["future"].result()
+                self.in_flight -= 1
+            output = batch["output"][index]
+            batch["output"][index] = None
+            self.out.write(output)
+            member["compressed_size"] += len(output)
+        elif kind == "end":
+            self.write_end(member, 8)
+        else:
+            self.write_header(member, 0)  # 0 = stored
+            with open(member["path"], 'rb') as f:
+                while True:
+                    data = f.read(CHUNK_SIZE)
+                    if not data:
+                        break
+                    member["crc"] = zlib.crc32(data, member["crc"])
+                    member["size"] += len(data)
+                    self.out.write(data)
+            member["compressed_size"] = member["size"]
+            self.write_end(member, 0)
+            self.stored_files += 1
+            self.stored_bytes += member["size"]
+
+    def close(self):
+        """Wait for the remaining batches and write the central directory"""
+        if self.batch is not None:
+            self.submit_batch()
+        while self.steps:
+            self.write_step()
+        central_offset = self.out.tell()
+        for record in self.central:
+            self.out.write(record)
+        self.out.write(struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, len(self.central), len(self.central),
+                                   self.out.tell() - central_offset, central_offset, 0))
+
+def write_parallel_zip(members, out, compressor):
+    """
+    Write a deflate zip of members to out with a ParallelZipWriter.
+    Returns (stored file count, stored bytes).
+    """
+    writer = ParallelZipWriter(out, compressor)
+    for file_path, arcname in members:
+        writer.add(file_path, arcname)
+    writer.close()
+    return writer.stored_files, writer.stored_bytes
+
+def compress_directory(directory_path, algorithm="deflate", level=None, pool=None, jobs=1):
+    """
+    Compress a backup directory into backup_YYMMDD-HHMMSS.zip / .tar.xz /
+    .tar.zst next to it and remove the directory. The archive is written to
+    a .partial name and renamed once complete, so an interrupted run never
+    leaves a half-written archive that looks like a version.
+    """
+    if level is None:
+        level = DEFAULT_LEVELS[algorithm]
+    archive_path = directory_path + ARCHIVE_SUFFIXES[algorithm]
+    partial_path = archive_path + ".partial"
+    print(f"Compressing {directory_path} to {archive_path} ({algorithm}, level {level})...")
+    started = time.monotonic()
+    try:
+        members = list_archive_files(directory_path)
+        total_size = sum(os.path.getsize(file_path) for file_path, _ in members)
+        compressor = BlockCompressor(pool, algorithm, level, jobs) if pool else None
+        stored_files = stored_bytes = 0
+
+        if algorithm == "deflate" and (pool is None or total_size >= 0xFFFFFFFF or len(members) >= 0xFFFF):
+            # Large archives need zip64, which zipfile handles (on one core)
+            with zipfile.ZipFile(partial_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=level) as zipf:
+                for file_path, arcname in members:
+                    if is_incompressible(file_path):
+                        zipf.write(file_path, arcname, compress_type=zipfile.ZIP_STORED)
+                        stored_files += 1
+                        stored_bytes += os.path.getsize(file_path)
+                    else:
+                        zipf.write(file_path, arcname)
+        elif algorithm == "deflate":
+            with open(partial_path, 'wb') as out:
+                stored_files, stored_bytes = write_parallel_zip(members, out, compressor)
         else:
-            print(f"Warning: Zip file {zip_path} seems empty or failed. Original directory kept.")
+            with open(partial_path, 'wb') as out:
+                writer = CompressedStreamWriter(out, compressor or BlockCompressor(SerialPool(), algorithm, level, 1))
+                with tarfile.open(fileobj=writer, mode='w|', format=tarfile.PAX_FORMAT) as tar:
+                    tar.add(directory_path, arcname=os.path.basename(directory_path))
+                writer.close()
+
+        # Check the archive before the directory, possibly the only other copy, is deleted
+        version = os.path.basename(directory_path)
+        index = load_index(os.path.dirname(directory_path), version)
+        if index:
+            expected = index["files"]
+        else:
+            expected = {arcname[len(version) + 1:]: {"size": os.path.getsize(file_path)} for file_path, arcname in members}
+        problems = compare_to_manifest(read_archive_contents(partial_path, version), expected)
+        if problems:
+            raise ValueError(f"archive verification failed: {'; '.join(problems[:3])}")
+
+        os.replace(partial_path, archive_path)
+        shutil.rmtree(directory_path)
+        archive_size = os.path.getsize(archive_path)
+        elapsed = time.monotonic() - started
+        print(f"Compressed {total_size:,} -> {archive_size:,} bytes in {elapsed:.2f}s; removed original: {directory_path}")
+        if stored_files:
+            # Estimate the time saved from this run's own compression throughput
+            compressed_bytes = total_size - stored_bytes
+            saved_seconds = stored_bytes * elapsed / compressed_bytes if compressed_bytes else 0
+            print(f"Stored {stored_files} incompressible file(s) uncompressed: skipped compressing "
+                  f"{stored_bytes:,} bytes (~{saved_seconds:.2f}s saved)")
+        return archive_path
     except Exception as e:
-        print(f"Error zipping directory {directory_path}: {e}")
+        print(f"Error compressing directory {directory_path}: {e}. Original directory kept.")
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        return None
+
+def find_archive(version_path):
+    """Path of the archive holding a compressed version, or None"""
+    for suffix in ARCHIVE_SUFFIXES.values():
+        if os.path.exists(version_path + suffix):
+            return version_path + suffix
+    return None
+
+def extract_archive(archive_path, dest_dir):
+    """Extract a .zip, .tar.xz or .tar.zst version archive into dest_dir"""
+    extract_filter = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+    if archive_path.endswith(".zip"):
+        with zipfile.ZipFile(archive_path) as zipf:
+            zipf.extractall(dest_dir)
+    elif archive_path.endswith(".tar.xz"):
+        with tarfile.open(archive_path, 'r:xz') as tar:
+            tar.extractall(dest_dir, **extract_filter)
+    else:
+        zstd = load_zstd()
+        if zstd is None:
+            raise ValueError(f"{archive_path} needs Python 3.14+ or the 'zstandard' package")
+        with open(archive_path, 'rb') as f:
+            if zstd.__name__ == "zstandard":
+                reader = zstd.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+            else:
+                reader = zstd.ZstdFile(f)
+            with tarfile.open(fileobj=reader, mode='r|') as tar:
+                tar.extractall(dest_dir, **extract_filter)
+
+def compare_to_manifest(actual, files):
+    """
+    Compare {path: (size, crc32, sha256 or None)} found in a version with
+    the files recorded in its manifest. Returns a list of problems.
+    """
+    problems = [f"missing: {path}" for path in sorted(set(files) - set(actual))]
+    problems += [f"unexpected: {path}" for path in sorted(set(actual) - set(files))]
+    for path in sorted(set(files) & set(actual)):
+        size, crc, sha256 = actual[path]
+        expected = files[path]
+        if size != expected["size"]:
+            problems.append(f"size mismatch: {path} ({size} != {expected['size']})")
+        elif "crc32" in expected and crc != expected["crc32"]:
+            problems.append(f"CRC mismatch: {path}")
+        elif sha256 and "sha256" in expected and sha256 != expected["sha256"]:
+            problems.append(f"SHA-256 mismatch: {path}")
+    return problems
+
+def read_archive_contents(archive_path, version):
+    """
+    {path: (size, crc32, sha256)} of the files in a version archive. Zips
+    are CRC-tested and read from the central directory (no SHA-256); tar
+    archives are decompressed and hashed.
+    """
+    prefix = version + "/"
+    actual = {}
+    if ".zip" in os.path.basename(archive_path):
+        with zipfile.ZipFile(archive_path) as zipf:
+            bad_member = zipf.testzip()
+            if bad_member:
+                raise ValueError(f"CRC test failed for {bad_member}")
+            for info in zipf.infolist():
+                if not info.is_dir():
+                    actual[info.filename[len(prefix):]] = (info.file_size, info.CRC, None)
+        return actual
+
+    if ".tar.xz" in os.path.basename(archive_path):
+        tar_file = open(archive_path, 'rb')
+        stream = lzma.LZMAFile(tar_file)
+    else:
+        zstd = load_zstd()
+        if zstd is None:
+            raise ValueError(f"{archive_path} needs Python 3.14+ or the 'zstandard' package")
+        tar_file = open(archive_path, 'rb')
+        stream = zstd.ZstdDecompressor().stream_reader(tar_file, read_across_frames=True) if zstd.__name__ == "zstandard" else zstd.ZstdFile(tar_file)
+    try:
+        with tarfile.open(fileobj=stream, mode='r|') as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                digest = hashlib.sha256()
+                crc = 0
+                f = tar.extractfile(member)
+                for data in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    digest.update(data)
+                    crc = zlib.crc32(data, crc)
+                actual[member.name[len(prefix):]] = (member.size, crc, digest.hexdigest())
+    finally:
+        tar_file.close()
+    return actual
+
+def verify_version(session_folder, version):
+    """
+    Check a version against its manifest. Returns (problems, what was checked).
+
+    Zips are checked quickly: a CRC test of every member, then names, sizes
+    and CRCs against the file index. Directories and tar archives are read
+    and compared by SHA-256; snapshots have every chunk re-hashed.
+    """
+    version_path = os.path.join(session_folder, version)
+    index = load_index(session_folder, version)
+    files = index["files"] if index else None
+
+    if os.path.exists(version_path + MANIFEST_SUFFIX):
+        problems = []
+        checked = set()
+        for entry in load_manifest(version_path + MANIFEST_SUFFIX)["files"]:
+            for digest in entry["chunks"]:
+                if digest in checked:
+                    continue
+                checked.add(digest)
+                try:
+                    with open(store_object_path(session_folder, digest), 'rb') as f:
+                        if hashlib.sha256(f.read()).hexdigest() != digest:
+                            problems.append(f"corrupt chunk {digest} ({entry['path']})")
+                except OSError:
+                    problems.append(f"missing chunk {digest} ({entry['path']})")
+        return problems, f"snapshot, {len(checked)} chunk(s)"
+
+    if os.path.isdir(version_path):
+        if files is None:
+            return [], "directory, no manifest"
+        actual = {}
+        for file_path, arcname in list_archive_files(version_path):
+            sha256, crc, size = file_digests(file_path)
+            actual[arcname[len(version) + 1:]] = (size, crc, sha256)
+        return compare_to_manifest(actual, files), f"directory, {len(files)} file(s)"
+
+    archive_path = find_archive(version_path)
+    if archive_path is None:
+        return [f"version '{version}' not found"], "missing"
+    kind = os.path.basename(archive_path)[len(version) + 1:]
+    try:
+        actual = read_archive_contents(archive_path, version)
+    except (OSError, ValueError, EOFError, zipfile.BadZipFile, tarfile.TarError, lzma.LZMAError) as e:
+        return [str(e)], kind
+    if files is None:
+        return [], f"{kind}, integrity only (no manifest)"
+    return compare_to_manifest(actual, files), f"{kind}, {len(files)} file(s)"
+
+def pending_compression(dest_base, repo_name, session_name):
+    """Unzipped backup directories other than the newest version"""
+    session_folder = os.path.join(dest_base, repo_name, session_name)
+    versions = list_session_versions(dest_base, repo_name, session_name)
+    return [
+        os.path.join(session_folder, version) for version in versions[1:]
+        if os.path.isdir(os.path.join(session_folder, version))
+        and not find_archive(os.path.join(session_folder, version))
+    ]
+
+def compress_pending_versions(dest_base, repo_name, session_name, algorithm="deflate", level=None, jobs=None):
+    """
+    Compress every older unzipped version of a session. A lock file in the
+    session folder keeps concurrent runs from compressing the same versions.
+    """
+    session_folder = os.path.join(dest_base, repo_name, session_name)
+    pending = pending_compression(dest_base, repo_name, session_name)
+    if not pending:
+        return 0
+
+    lock_path = os.path.join(session_folder, COMPRESS_LOCK)
+    try:
+        if time.time() - os.path.getmtime(lock_path) > STALE_LOCK_SECONDS:
+            os.remove(lock_path)
+    except OSError:
+        pass
+    try:
+        lock_fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        print("Another compression is already running for this session; skipping")
+        return 0
+
+    compressed = 0
+    try:
+        os.write(lock_fd, str(os.getpid()).encode())
+        for item in os.listdir(session_folder):
+            if item.startswith("backup_") and item.endswith(".partial"):
+                print(f"Removing incomplete archive: {item}")
+                os.remove(os.path.join(session_folder, item))
+        jobs = jobs or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for directory_path in pending:
+                if os.path.isdir(directory_path) and compress_directory(directory_path, algorithm, level, pool, jobs):
+                    compressed += 1
+    finally:
+        os.close(lock_fd)
+        os.remove(lock_path)
+    return compressed
+
+def start_background_compression(session_name, session_folder, algorithm, level, jobs):
+    """Compress older versions in a detached process that outlives this one"""
+    args = [sys.executable, os.path.abspath(__file__), session_name, "--compress-pending", f"--compress={algorithm}"]
+    if level is not None:
+        args.append(f"--level={level}")
+    if jobs:
+        args.append(f"--jobs={jobs}")
+    if os.name == 'nt':
+        detach = {"creationflags": subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP}
+    else:
+        detach = {"start_new_session": True}
+
+    log_path = os.path.join(session_folder, COMPRESS_LOG)
+    with open(log_path, 'a') as log:
+        subprocess.Popen(args, cwd=os.getcwd(), stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT, **detach)
+    return log_path
 
 def list_session_versions(dest_base, repo_name, session_name):
-    """List all versions of a session (both directories and zip files)"""
+    """List all versions of a session (directories, archives and snapshot manifests)"""
     session_folder = os.path.join(dest_base, repo_name, session_name)
     if not os.path.exists(session_folder):
         return []
@@ -112,11 +1089,16 @@ def list_session_versions(dest_base, repo_name, session_name):
     versions = set()
     for item in os.listdir(session_folder):
         if item.startswith("backup_"):
-            # Remove .zip extension for version comparison
-            version_name = item
-            if item.endswith(".zip"):
-                version_name = item[:-4]
-            versions.add(version_name)
+            # Remove archive / manifest extension for version comparison;
+            # anything else (.staging, .partial, .tmp) is an unfinished write
+            for suffix in list(ARCHIVE_SUFFIXES.values()) + [MANIFEST_SUFFIX]:
+                if item.endswith(suffix):
+                    if VERSION_PATTERN.match(item[:-len(suffix)]):
+                        versions.add(item[:-len(suffix)])
+                    break
+            else:
+                if VERSION_PATTERN.match(item) and os.path.isdir(os.path.join(session_folder, item)):
+                    versions.add(item)
 
     return sorted(list(versions), reverse=True)  # Most recent first
 
@@ -137,12 +1119,14 @@ def get_latest_session_path(dest_base, repo_name, session_name):
         versions = list_session_versions(dest_base, repo_name, session_name)
         if versions:
             latest_backup = os.path.join(session_folder, versions[0])
+            if not os.path.isdir(latest_backup) and os.path.exists(latest_backup + MANIFEST_SUFFIX):
+                return checkout_snapshot(session_folder, repo_name, session_name, versions[0])
             return os.path.abspath(latest_backup)
         else:
             return None
 
 def cleanup_old_versions(dest_base, repo_name, session_name, keep_count=5):
-    """Keep only the most recent N versions (handles both directories and zip files)"""
+    """Keep only the most recent N versions (directories, archives and snapshots)"""
     session_folder = os.path.join(dest_base, repo_name, session_name)
     versions = list_session_versions(dest_base, repo_name, session_name)
 
@@ -153,9 +1137,9 @@ def cleanup_old_versions(dest_base, repo_name, session_name, keep_count=5):
     deleted_count = 0
 
     for version in versions_to_delete:
-        # Check for both directory and zip file
+        # Check for directory, archives and snapshot manifest
         dir_path = os.path.join(session_folder, version)
-        zip_path = dir_path + ".zip"
+        manifest_path = dir_path + MANIFEST_SUFFIX
         
         deleted = False
         if os.path.isdir(dir_path):
@@ -165,38 +1149,135 @@ def cleanup_old_versions(dest_base, repo_name, session_name, keep_count=5):
             except OSError as e:
                 print(f"Warning: Could not delete directory {version}: {e}")
         
-        if os.path.exists(zip_path):
+        for suffix in ARCHIVE_SUFFIXES.values():
+            if os.path.exists(dir_path + suffix):
+                try:
+                    os.remove(dir_path + suffix)
+                    deleted = True
+                except OSError as e:
+                    print(f"Warning: Could not delete archive {version}{suffix}: {e}")
+
+        if os.path.exists(manifest_path):
             try:
-                os.remove(zip_path)
+                os.remove(manifest_path)
                 deleted = True
             except OSError as e:
-                print(f"Warning: Could not delete zip {version}: {e}")
+                print(f"Warning: Could not delete snapshot {version}: {e}")
+
+        if os.path.exists(index_path(session_folder, version)):
+            os.remove(index_path(session_folder, version))
         
         if deleted:
             deleted_count += 1
             print(f"Cleaned up old version: {version}")
 
+    # Drop indexes and snapshot checkouts of versions that are gone
+    # (deleted, or never completed)
+    remaining = set(list_session_versions(dest_base, repo_name, session_name))
+    index_dir = os.path.join(session_folder, INDEX_DIR)
+    if os.path.isdir(index_dir):
+        for item in os.listdir(index_dir):
+            if item.endswith(".json") and item[:-len(".json")] not in remaining:
+                os.remove(os.path.join(index_dir, item))
+    checkouts = checkout_folder(repo_name, session_name)
+    if os.path.isdir(checkouts):
+        for item in os.listdir(checkouts):
+            if VERSION_PATTERN.match(item) and item not in remaining:
+                shutil.rmtree(os.path.join(checkouts, item), ignore_errors=True)
+                print(f"Removed checkout of deleted snapshot: {item}")
+
+    if deleted_count:
+        removed_chunks = collect_store_garbage(session_folder)
+        if removed_chunks:
+            print(f"Removed {removed_chunks} unreferenced chunk(s) from the snapshot store")
+
     return deleted_count
 
 def main():
     if len(sys.argv) < 2:
-        print("Usage: python backup_session.py <session_name> [--cleanup N] [--list] [--get-latest-path]")
+        print("Usage: python backup_session.py <session_name> [--cleanup N] [--list] [--verify] [--get-latest-path]")
+        print("                                 [--store] [--restore[=VERSION]] [--target=DIR]")
+        print("                                 [--incremental] [--full-every=N] [--hash]")
+        print("                                 [--compress=ALGO] [--level=N] [--jobs=N] [--foreground]")
         print("  --cleanup N: Keep only the last N versions (default: 5)")
         print("  --list: List existing versions for the session")
+        print("  --verify: Check every version against its manifest (CRC test for zips)")
         print("  --get-latest-path: Print the path to the latest session version")
+        print("  --store: Back up as a deduplicated snapshot (chunks stored once by hash)")
+        print("  --incremental: Hard-link files unchanged since the previous backup instead of copying")
+        print("  --full-every=N: With --incremental, make every Nth backup a full copy (default: 10)")
+        print("  --hash: With --incremental, compare file contents instead of size/mtime")
+        print("  --compress=ALGO: Compress older versions with deflate (.zip, default), lzma (.tar.xz) or zstd (.tar.zst)")
+        print("  --level=N: Compression level (default: 6 for deflate/lzma, 3 for zstd)")
+        print("  --jobs=N: Compression worker processes (default: CPU count)")
+        print("  --foreground: Wait for older versions to be compressed instead of compressing in the background")
+        print("  --restore[=VERSION]: Restore a version (default: latest) to --target")
+        print("  --target=DIR: Restore destination (default: .ralph-sessions/<session_name>, must not exist)")
         sys.exit(1)
 
     session_name = sys.argv[1]
     cleanup_count = 5  # Default to keep 5 versions
     list_only = False
+    verify = False
     get_latest_path = False
+    use_store = False
+    incremental = False
+    full_every = 10
+    use_hash = False
+    algorithm = "deflate"
+    level = None
+    jobs = None
+    foreground = False
+    compress_only = False
+    restore = None
+    restore_target = None
 
     # Parse additional arguments
     for arg in sys.argv[2:]:
         if arg == "--list":
             list_only = True
+        elif arg == "--verify":
+            verify = True
         elif arg == "--get-latest-path":
             get_latest_path = True
+        elif arg == "--store":
+            use_store = True
+        elif arg == "--incremental":
+            incremental = True
+        elif arg == "--hash":
+            use_hash = True
+        elif arg == "--foreground":
+            foreground = True
+        elif arg == "--compress-pending":
+            # Internal: run by the background compression process
+            compress_only = True
+        elif arg.startswith("--compress="):
+            algorithm = arg.split("=", 1)[1]
+            if algorithm not in ARCHIVE_SUFFIXES:
+                print(f"Error: --compress must be one of: {', '.join(ARCHIVE_SUFFIXES)}")
+                sys.exit(1)
+        elif arg.startswith("--level=") or arg.startswith("--jobs="):
+            try:
+                value = int(arg.split("=")[1])
+            except (ValueError, IndexError):
+                print(f"Error: {arg.split('=')[0]} requires a number")
+                sys.exit(1)
+            if arg.startswith("--level="):
+                level = value
+            else:
+                jobs = value
+        elif arg.startswith("--full-every="):
+            try:
+                full_every = int(arg.split("=")[1])
+            except (ValueError, IndexError):
+                print("Error: --full-every requires a number")
+                sys.exit(1)
+        elif arg == "--restore":
+            restore = "latest"
+        elif arg.startswith("--restore="):
+            restore = arg.split("=", 1)[1]
+        elif arg.startswith("--target="):
+            restore_target = arg.split("=", 1)[1]
         elif arg.startswith("--cleanup="):
             try:
                 cleanup_count = int(arg.split("=")[1])
@@ -239,12 +1320,65 @@ def main():
             sys.exit(1)
         return
 
+    if algorithm == "zstd" and load_zstd() is None:
+        print("Warning: zstd needs Python 3.14+ or the 'zstandard' package; using deflate")
+        algorithm = "deflate"
+        level = None
+
+    if compress_only:
+        compressed = compress_pending_versions(dest_base, repo_name, session_name, algorithm, level, jobs)
+        print(f"Compressed {compressed} older version(s)")
+        return
+
+    if restore:
+        versions = list_session_versions(dest_base, repo_name, session_name)
+        version = versions[0] if restore == "latest" and versions else restore
+        target = restore_target or source
+        if os.path.exists(target):
+            print(f"Error: Restore target already exists: {target} (use --target=DIR)")
+            sys.exit(1)
+        try:
+            restore_version(dest_base, repo_name, session_name, version, target)
+        except (OSError, ValueError, zipfile.BadZipFile, tarfile.TarError, lzma.LZMAError) as e:
+            print(f"Error restoring {version}: {e}")
+            sys.exit(1)
+        print(f"Restored {version} to {target}")
+        return
+
+    if verify:
+        versions = list_session_versions(dest_base, repo_name, session_name)
+        session_folder = os.path.join(dest_base, repo_name, session_name)
+        if not versions:
+            print(f"\nNo versions found for {session_name}")
+            return
+        failed = 0
+        print(f"\nVerifying versions of {session_name}:")
+        for version in versions:
+            problems, checked = verify_version(session_folder, version)
+            if problems:
+                failed += 1
+                print(f"  {version}: FAILED ({checked})")
+                for problem in problems[:10]:
+                    print(f"    {problem}")
+                if len(problems) > 10:
+                    print(f"    ... and {len(problems) - 10} more")
+            else:
+                print(f"  {version}: OK ({checked})")
+        if failed:
+            print(f"Error: {failed} of {len(versions)} version(s) failed verification")
+            sys.exit(1)
+        return
+
     if list_only:
         versions = list_session_versions(dest_base, repo_name, session_name)
+        session_folder = os.path.join(dest_base, repo_name, session_name)
         if versions:
             print(f"\nExisting versions for {session_name}:")
             for version in versions:
-                print(f"  {version}")
+                if os.path.exists(os.path.join(session_folder, version + MANIFEST_SUFFIX)):
+                    print(f"  {version} (snapshot)")
+                else:
+                    print(f"  {version}")
         else:
             print(f"\nNo versions found for {session_name}")
         return
@@ -258,18 +1392,12 @@ def main():
         sys.exit(1)
 
     try:
-        # Zip existing backups before creating a new one
-        versions = list_session_versions(dest_base, repo_name, session_name)
-        session_folder = os.path.join(dest_base, repo_name, session_name)
-        for version in versions:
-            version_path = os.path.join(session_folder, version)
-            if os.path.isdir(version_path):
-                zip_path = version_path + ".zip"
-                if not os.path.exists(zip_path):
-                    zip_directory(version_path, zip_path)
-
         # Create versioned backup
-        backup_path = create_versioned_backup(source, dest_base, session_name, repo_name)
+        if use_store:
+            backup_path = create_snapshot_backup(source, dest_base, session_name, repo_name)
+        else:
+            backup_path = create_versioned_backup(source, dest_base, session_name, repo_name,
+                                                  incremental, full_every, use_hash)
         print(f"Successfully created versioned backup: {backup_path}")
 
         # Cleanup old versions (default: keep 5)
@@ -277,6 +1405,15 @@ def main():
         if deleted > 0:
             print(f"Cleaned up {deleted} old version(s)")
 
+        # Compress older backups (after the new one, which may hard-link from them)
+        pending = pending_compression(dest_base, repo_name, session_name)
+        if pending and foreground:
+            compress_pending_versions(dest_base, repo_name, session_name, algorithm, level, jobs)
+        elif pending:
+            session_folder = os.path.join(dest_base, repo_name, session_name)
+            log_path = start_background_compression(session_name, session_folder, algorithm, level, jobs)
+            print(f"Compressing {len(pending)} older version(s) in the background (log: {log_path})")
+
         # List current versions
         versions = list_session_versions(dest_base, repo_name, session_name)
         print(f"\nCurrent versions ({len(versions)} total):")